@@ -0,0 +1,85 @@
+"""Time from a click on a trade to its comment repainted.
+
+A :class:`LookupComment` is put in queue, like a click on graph does,
+and the time is taken once the comment is set and repainted in the
+gui thread. Compared with the former loop, which polled the queue
+every 50 ms. Run from the repository root::
+
+    python -m benchmarks.comments
+"""
+
+import queue
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from PyQt5 import QtCore, QtWidgets
+
+from report_tool.qt.thread import LookupComment, SaveComment, UpdateCommentsThread
+from report_tool.utils.comment_store import CommentStore
+
+
+class PollingCommentsThread(UpdateCommentsThread):
+
+    """Checks the queue every 50 ms, as the thread did before"""
+
+    def run(self):
+        while True:
+            while not self.comments_queue.empty():
+                command = self.comments_queue.get()
+                if type(command) not in self.handlers:  # stop
+                    return
+                self.handlers[type(command)](command)
+
+            time.sleep(0.05)
+
+
+def bench_click(thread_cls: type, nb_clicks: int = 40) -> None:
+    comments_queue: queue.Queue = queue.Queue()
+    widget = QtWidgets.QTextEdit()
+    widget.show()
+    widget.setPlainText("warm up")
+    widget.repaint()  # first paint loads fonts, not part of a click
+    loop = QtCore.QEventLoop()
+    repainted = []
+
+    def update_comments(comment):
+        widget.setPlainText(comment[0])
+        widget.repaint()
+        repainted.append(time.perf_counter())
+        loop.quit()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = CommentStore(
+            Path(tmp_dir) / "report_tool.db", Path(tmp_dir) / "comments.json"
+        )
+        thread = thread_cls(comments_queue, update_comments, store=store)
+        thread.start()
+
+        for index in range(nb_clicks):
+            comments_queue.put(SaveComment(f"DIAAAA{index}", [f"comment {index}", 2]))
+
+        rnd = random.Random(0)
+        latencies = []
+        for index in range(nb_clicks):
+            clicked = time.perf_counter()
+            comments_queue.put(LookupComment(f"DIAAAA{index}"))
+            loop.exec_()
+            latencies.append((repainted[-1] - clicked) * 1000)
+            time.sleep(rnd.uniform(0, 0.05))  # clicks don't follow the polling
+
+        thread.stop()
+
+    print(
+        f"{thread_cls.__name__}: click to repaint over {nb_clicks} clicks, "
+        f"median {statistics.median(latencies):.2f} ms, "
+        f"max {max(latencies):.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    bench_click(PollingCommentsThread)
+    bench_click(UpdateCommentsThread)
@@ -0,0 +1,124 @@
+"""Paint an equity curve of 1M points, lay out comments while panning.
+
+A plain PlotDataItem is compared to the DecimatedCurveItem, which must
+still paint the extremes of the visible points. Comments are laid out
+on 20k trades, panned 200 trades wide. Run from the repository root::
+
+    python -m benchmarks.equity_chart [nb points]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtWidgets
+
+from report_tool.qt.equity_chart import EquityChart
+from report_tool.qt.graphics_items import DecimatedCurveItem
+
+
+def random_walk(count: int) -> tuple:
+    """Dates and values of a random walk, like a cumulated pnl."""
+    rnd = np.random.default_rng(0)
+    return np.arange(count, dtype=float), np.cumsum(rnd.normal(0, 10, count))
+
+
+def frame_times(curve_class, dates, values, views) -> tuple:
+    chart = EquityChart()
+    chart.resize(1200, 400)
+    chart.show()
+
+    curve = curve_class(x=np.array([]), y=np.array([]), pen=pg.mkPen("b"))
+    chart.addItem(curve)
+
+    start = time.perf_counter()
+    curve.setData(x=dates, y=values)
+    set_data = time.perf_counter() - start
+
+    times = []
+    for x_min, x_max in views:
+        chart.setXRange(x_min, x_max, padding=0)
+        start = time.perf_counter()
+        chart.grab()  # paints the chart
+        times.append(time.perf_counter() - start)
+
+        if curve_class is DecimatedCurveItem:  # extremes are painted
+            painted = curve.curve.yData
+            visible = values[x_min:x_max]
+            assert painted.max() >= visible.max()
+            assert painted.min() <= visible.min()
+
+    chart.close()
+    return set_data, np.array(times) * 1000
+
+
+def bench_paint(count: int = 1_000_000) -> None:
+    dates, values = random_walk(count)
+
+    # whole curve, then zoomed in and panned
+    views = [(0, count)] * 5
+    for i in range(10):
+        views.append((count // 3 + i * count // 100, count // 2 + i * count // 100))
+    for i in range(10):
+        views.append((count // 2 + i * 50, count // 2 + i * 50 + 2000))
+
+    for name, curve_class in (
+        ("full", pg.PlotDataItem),
+        ("decimated", DecimatedCurveItem),
+    ):
+        set_data, times = frame_times(curve_class, dates, values, views)
+        print(
+            f"{name:>9}: {count} points, setData {set_data * 1000:.0f} ms, "
+            f"frame median {np.median(times):.1f} ms, max {times.max():.1f} ms"
+        )
+
+
+def pan_times(comment_count: int, trade_count: int = 20_000) -> np.ndarray:
+    """Layout time of comments when panning a 200 trades wide view"""
+    dates, values = random_walk(trade_count)
+    rnd = np.random.default_rng(0)
+
+    chart = EquityChart()
+    chart.resize(1200, 400)
+    chart.show()
+
+    curve = chart.plot_curve("#0000ff", 1, "Solid")
+    chart.update_curve(
+        curve,
+        values,
+        dates,
+        ec_color="#0000ff",
+        ec_size=1,
+        ec_style="Solid",
+        graph="benchmark",
+    )
+    chart._set_deal_id_plotted([f"DEAL{i}" for i in range(trade_count)])
+
+    for i in rnd.choice(trade_count, comment_count, replace=False):
+        chart.add_text_item(curve, [f"comment {i}", 2], f"DEAL{i}", "benchmark")
+
+    times = []
+    for i in range(50):
+        chart.setXRange(5000 + i * 10, 5200 + i * 10, padding=0)
+        start = time.perf_counter()
+        chart.update_text_item([True, True])  # as sigRangeChangedManually
+        times.append(time.perf_counter() - start)
+
+    chart.close()
+    return np.array(times) * 1000
+
+
+def bench_pan() -> None:
+    for comment_count in (100, 1000, 5000):
+        times = pan_times(comment_count)
+        print(
+            f"{comment_count:>5} comments: pan median {np.median(times):.2f} ms, "
+            f"max {times.max():.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    app = QtWidgets.QApplication(sys.argv)
+    bench_paint(1_000_000 if len(sys.argv) < 2 else int(sys.argv[1]))
+    bench_pan()
@@ -0,0 +1,79 @@
+"""Fetch a long history from a local stand-in of the IG REST API.
+
+Compare one request for the whole range, monthly requests and the
+transaction store, cold and warm. Replays a history recorded from
+``/history/transactions`` if given, else fakes three years of trades.
+Run from the repository root::
+
+    python -m benchmarks.history [recorded.json]
+"""
+
+import datetime
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from report_tool.communications.history_fetcher import (
+    RateLimiter,
+    fetch_history,
+    format_date_range,
+)
+from report_tool.communications.ig_rest_api import IGAPI
+from report_tool.communications.transaction_store import (
+    TransactionStore,
+    sync_transactions,
+    trade_date,
+)
+from tests.rest_replay import RestReplayServer, fake_history, load_history
+
+
+def bench_fetch(history: list) -> None:
+    today = datetime.date.today()
+    first_day = min(trade_date(transaction) for transaction in history)
+    date_range = format_date_range(first_day, today)
+
+    with RestReplayServer(history, latency=0.05, bandwidth=2e6) as replay:
+        session = IGAPI(
+            {
+                "base_url": replay.base_url,
+                "headers": {},
+                "proxies": {},
+                "payload": "{}",
+            }
+        )
+        session.create_session()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = TransactionStore(Path(tmp_dir) / "bench.db")
+
+            unlimited = RateLimiter(rate=1e6, burst=1000)
+            timings = {
+                "no store": lambda: session.get_transactions(date_range),
+                "monthly": lambda: fetch_history(
+                    session, first_day, today, rate_limiter=unlimited
+                ),
+                "store, cold": lambda: sync_transactions(session, store, date_range),
+                "store, warm": lambda: sync_transactions(session, store, date_range),
+            }
+
+            def read(fetch):  # transactions may be an iterator
+                return list(fetch()["transactions"])
+
+            for name, fetch in timings.items():
+                replay.requests.clear()
+                duration = timeit.timeit(lambda: read(fetch), number=1)
+                print(
+                    f"{name:>12}: {len(history)} transactions in {duration:.3f}s, "
+                    f"{sum(replay.requests.values())} request(s)"
+                )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        history = load_history(Path(sys.argv[1]))
+    else:
+        today = datetime.date.today()
+        history = fake_history(today - datetime.timedelta(days=3 * 365), today, 20)
+
+    bench_fetch(history)
@@ -0,0 +1,90 @@
+"""Build a TradeLedger, compute summary columns and step through trades.
+
+Run from the repository root::
+
+    python -m benchmarks.ledger
+"""
+
+import timeit
+from collections import OrderedDict
+from copy import deepcopy
+from decimal import Decimal
+
+import numpy as np
+
+from report_tool.calculate.ledger import TradeLedger, TypeCode, type_codes
+
+
+def fake_transactions(pnl: np.ndarray) -> OrderedDict:
+    """Transactions like TransactionThread builds, a fee every 10 rows."""
+    return OrderedDict(
+        (
+            f"DIAAAA{i}_0",
+            {
+                "type": "DEAL" if i % 10 else "CHART",
+                "date": "19/06/15",
+                "open_size": "1",
+                "points": value * 2,
+                "points_lot": value * 2,
+                "pnl": value,
+            },
+        )
+        for i, value in enumerate(pnl)
+    )
+
+
+def bench_build() -> None:
+    codes = type_codes(["DEAL"])
+
+    for nb_rows in (10_000, 100_000, 1_000_000):
+        rng = np.random.default_rng(0)
+        fake = fake_transactions(rng.integers(-5000, 5000, nb_rows) / 100)
+        ledger = TradeLedger.from_transactions(fake, codes)
+        build = timeit.timeit(
+            lambda: TradeLedger.from_transactions(fake, codes), number=1
+        )
+        summary = timeit.timeit(
+            lambda: (
+                ledger.pnl[ledger.is_order & (ledger.pnl > 0)].sum(),
+                ledger.total(TypeCode.CHART),
+                ledger.growth(Decimal(1000)),
+            ),
+            number=10,
+        )
+        print(f"{nb_rows:>9} rows: build {build:.3f}s, summary {summary / 10:.4f}s")
+
+
+def bench_stepping(nb_rows: int = 50_000) -> None:
+    """Step through the trades like the arrow keys do on the chart."""
+    fake = fake_transactions(np.ones(nb_rows))
+    ledger = TradeLedger.from_transactions(fake, type_codes(["DEAL"]))
+
+    def copy_and_pop(position: int) -> str:
+        """Find the trade at an x position as update_trade_details did."""
+        trades = deepcopy(fake)
+        for deal_id in list(trades.keys()):
+            if trades[deal_id]["type"] == "CHART":
+                trades.pop(deal_id)
+        return list(trades.keys())[position - 1]
+
+    rows = ledger.rows(TypeCode.ORDER)  # built once per dict
+
+    def lookup(position: int) -> str:
+        return ledger.deal_ids[rows[position - 1]]
+
+    steps = range(1, len(rows) + 1)
+    assert all(copy_and_pop(x) == lookup(x) for x in (1, 2, 1000, len(rows)))
+
+    old = timeit.timeit(lambda: copy_and_pop(len(rows) // 2), number=3) / 3
+    build = timeit.timeit(lambda: ledger.rows(TypeCode.ORDER), number=10) / 10
+    new = timeit.timeit(lambda: [lookup(x) for x in steps], number=3) / 3
+    print(
+        f"{nb_rows} rows: step to a trade {old * 1000:.1f} ms with copy, "
+        f"{new / len(steps) * 1e6:.2f} us with rows ({build * 1000:.2f} ms to build), "
+        f"{len(steps)} steps in {new * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    bench_build()
+    bench_stepping()
@@ -0,0 +1,111 @@
+"""Read a Lightstreamer stream served locally, decode the updates of a table.
+
+Run from the repository root::
+
+    python -m benchmarks.lightstreamer
+"""
+
+import threading
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from report_tool.communications.ig_lightstreamer import (
+    MODE_MERGE,
+    LineReader,
+    LsClient,
+    Table,
+)
+
+
+def fake_stream(nb_updates: int = 20_000) -> bytes:
+    """A bind_session.txt answer: session headers, then price updates."""
+    header = b"OK\r\nSessionId:S1\r\nKeepaliveMillis:5000\r\n\r\n"
+    updates = b"".join(
+        b"1,%d|%d.5|%d.0|$|#||EUR\r\n" % (index % 7 + 1, 10000 + index, 9999 + index)
+        for index in range(nb_updates)
+    )
+    return header + updates + b"LOOP\r\n"
+
+
+def bench_read_stream() -> None:
+    body = fake_stream()
+
+    class FakeLightstreamer(BaseHTTPRequestHandler):
+        """Answer every POST with the same stream."""
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLightstreamer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/lightstreamer/bind_session.txt" % server.server_port
+
+    readers = {
+        "iter_lines(chunk_size=1)": lambda req: req.iter_lines(
+            chunk_size=1, decode_unicode=True
+        ),
+        "LineReader": LineReader.from_stream,
+    }
+
+    for name, reader in readers.items():
+
+        def read_stream():
+            with requests.post(url, data="LS_session=S1", stream=True) as req:
+                return sum(1 for line in reader(req) if line)
+
+        count = read_stream()
+        duration = min(timeit.repeat(read_stream, number=1, repeat=3))
+        print(
+            f"{name:>25}: {count} lines in {duration:.3f}s, "
+            f"{count / duration / 1000:.0f}k lines/s, "
+            f"{len(body) / duration / 1e6:.1f} MB/s"
+        )
+
+    server.shutdown()
+
+
+def bench_decode() -> None:
+    """100k MERGE updates of 20 items, parsed and decoded like received."""
+    client = LsClient("http://127.0.0.1/lightstreamer/", work_queue=object())
+    table = Table(client, "MARKET:X", mode=MODE_MERGE, schema="BID OFFER STATE NAME")
+    received = []
+    table.on_update.listen(lambda item_ids, fields: received.append(fields))
+    lines = [
+        "%d,%d|%s|%s|%s|%s"
+        % (
+            table.table_id,
+            index % 20 + 1,
+            "%d.5" % (10000 + index),
+            "" if index % 3 else "%d.0" % (10001 + index),
+            "$" if index % 11 == 0 else "#" if index % 13 == 0 else "",
+            "Caf\\u00e9 %d" % index if index % 50 == 0 else "",
+        )
+        for index in range(100_000)
+    ]
+
+    duration = min(
+        timeit.repeat(
+            lambda: [client._dispatch_update(line) for line in lines],
+            number=1,
+            repeat=3,
+        )
+    )
+    print(
+        f"{'RowDecoder':>25}: {len(lines) / duration / 1000:.0f}k updates/s, "
+        f"{10_000 * duration / len(lines):.1%} of a core at 10k updates/s"
+    )
+
+
+if __name__ == "__main__":
+    bench_read_stream()
+    bench_decode()
@@ -0,0 +1,97 @@
+"""Record a Lightstreamer session, then replay it faster.
+
+Replays a recording if given, else 3 seconds of 10k balance updates/s.
+The recording is replayed at 10x and as fast as possible, both must
+deliver the updates received while recording. Run from the repository
+root::
+
+    python -m benchmarks.ls_replay [session.lsrec.gz]
+"""
+
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from report_tool.communications.ig_lightstreamer import (
+    MODE_MERGE,
+    STATE_DISCONNECTED,
+    LsClient,
+    Table,
+)
+from report_tool.communications.ls_replay import (
+    LsRecorder,
+    LsReplayServer,
+    RecordedLine,
+    load_recording,
+)
+
+
+def fake_session(seconds: float, per_second: int) -> List[RecordedLine]:
+    """Balance updates of one account, with a LOOP every 10k lines."""
+    rnd = random.Random(0)
+    count = int(seconds * per_second)
+    lines = []
+
+    for index in range(count):
+        delay = int(index * 1e6 / per_second)
+        pnl = rnd.randint(-50000, 50000) / 100
+        lines.append((delay, f"1,1|{1000 + pnl}||{pnl}"))
+        if index and index % 10_000 == 0:
+            lines.append((delay, "LOOP"))
+
+    return lines
+
+
+def replay(lines: List[RecordedLine], speed: float, record_to: Path | None) -> list:
+    with LsReplayServer(lines, speed) as server:
+        client = LsClient(server.base_url)
+        if record_to is not None:
+            client.recorder = LsRecorder(record_to)
+
+        table = Table(
+            client,
+            mode=MODE_MERGE,
+            item_ids="ACCOUNT:REPLAY",
+            schema="AVAILABLE_CASH DEPOSIT PNL",
+        )
+        received = []
+        table.on_update.listen(lambda item_ids, fields: received.append(fields))
+
+        done = threading.Event()
+        client.on_state.listen(lambda state: state == STATE_DISCONNECTED and done.set())
+
+        start = time.perf_counter()
+        client.create_session(username="REPLAY", adapter_set="")
+        done.wait(600)
+        duration = time.perf_counter() - start
+
+        speed_name = f"{speed:g}x" if speed else "max"
+        print(
+            f"{speed_name:>5}: {len(received)} updates in {duration:.3f}s "
+            f"({len(received) / duration / 1000:.1f}k updates/s), "
+            f"{server.requests['/lightstreamer/bind_session.txt']} bind(s)"
+        )
+        return received
+
+
+def bench_replay(lines: List[RecordedLine]) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "session.lsrec.gz"
+
+        first = replay(lines, 1.0, record_to=path)
+        recorded = load_recording(path)
+        print(f"recorded {len(recorded)} lines in {path.stat().st_size / 1024:.0f} KB")
+
+        for speed in (10.0, 0):
+            assert replay(recorded, speed, record_to=None) == first
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        bench_replay(load_recording(Path(sys.argv[1])))
+    else:
+        bench_replay(fake_session(3, 10_000))
@@ -0,0 +1,103 @@
+"""Cost of reading the config, alone and in a full update_results cycle.
+
+The cycle is timed with the config cached by ConfigService, then parsed
+from the file on every access as it was before the cache. Run from the
+repository root::
+
+    python -m benchmarks.settings
+"""
+
+import datetime
+import queue
+import tempfile
+import timeit
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from PyQt5 import QtWidgets
+
+from report_tool.communications.ig_rest_api import IGAPI
+from report_tool.qt.main_window import ReportToolGUI
+from report_tool.qt.thread import TransactionThread
+from report_tool.utils import settings
+from report_tool.utils.constants import get_config_file
+from tests.rest_replay import RestReplayServer, fake_history
+
+
+def parse_config() -> dict:
+    return settings.Settings.parse_file(get_config_file()).dict()
+
+
+@contextmanager
+def config_parsed_on_access():
+    """Parse the config file on every access, like before the cache."""
+    service = settings._CONFIG_SERVICE
+    service.snapshot = service.read = parse_config
+    try:
+        yield
+    finally:
+        del service.snapshot, service.read
+
+
+def bench_access() -> None:
+    for name, func in {
+        "parse": parse_config,
+        "read_config": settings.read_config,
+        "get_settings": settings.get_settings,
+    }.items():
+        duration = timeit.timeit(func, number=10_000) / 10_000
+        print(f"{name:>12}: {duration * 1e6:.1f} us")
+
+
+def bench_update_results(nb_days: int = 240, number: int = 20) -> None:
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    today = datetime.date.today()
+    history = fake_history(today - datetime.timedelta(days=nb_days), today)
+
+    with RestReplayServer(history) as replay:
+        session = IGAPI(
+            {
+                "base_url": replay.base_url,
+                "headers": {},
+                "proxies": {},
+                "payload": "{}",
+            }
+        )
+        session.create_session()
+        accounts = session.get_user_accounts(save_currency=False)
+
+    transactions = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        thread = TransactionThread(
+            session,
+            queue.Queue(),
+            transactions.append,
+            store_path=Path(tmp_dir) / "report_tool.db",
+        )
+        thread.treat_data({"transactions": history})
+    transactions = transactions[0]
+
+    gui = ReportToolGUI("Report tool")
+    gui.session = session
+    gui.current_acc = accounts[0]
+    gui.local_transactions = transactions
+    gui.filtered_dict = OrderedDict()
+    gui.update_results(transactions)  # warm up
+
+    def cycle():
+        gui.update_results(transactions)
+        app.processEvents()
+
+    cached = timeit.timeit(cycle, number=number) / number
+    with config_parsed_on_access():
+        parsed = timeit.timeit(cycle, number=number) / number
+
+    print(f"update_results, {len(transactions)} deals:")
+    print(f"{'parsed':>12}: {parsed * 1000:.1f} ms")
+    print(f"{'cached':>12}: {cached * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    bench_access()
+    bench_update_results()
@@ -0,0 +1,49 @@
+"""Build the transactions dict from 100k rows received from IG.
+
+Run from the repository root::
+
+    python -m benchmarks.treat_data
+"""
+
+import datetime
+import queue
+import tempfile
+import timeit
+from pathlib import Path
+
+from report_tool.qt.thread import TransactionThread
+from tests.rest_replay import fake_history
+
+
+def fake_rows(nb_rows: int) -> list:
+    """Synthetic IG rows, some deals partially closed, some fees."""
+    today = datetime.date.today()
+    rows = fake_history(today - datetime.timedelta(days=5000), today, 20)[:nb_rows]
+
+    for index in range(0, len(rows) - 1, 7):
+        rows[index]["reference"] = rows[index + 1]["reference"]
+    for index in range(3, len(rows), 50):
+        rows[index].update(transactionType="WITH", instrumentName="Funds transfer")
+
+    return rows
+
+
+def bench_treat_data(nb_rows: int = 100_000) -> None:
+    rows = fake_rows(nb_rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        thread = TransactionThread(
+            None,
+            queue.Queue(),
+            lambda result: None,
+            store_path=Path(tmp_dir) / "report_tool.db",
+        )
+        duration = timeit.timeit(
+            lambda: thread.treat_data({"transactions": rows}), number=3
+        )
+
+    print(f"{len(rows)} rows: treat_data {duration / 3:.3f}s")
+
+
+if __name__ == "__main__":
+    bench_treat_data()
@@ -0,0 +1,109 @@
+"""Classification of IG transactions from the keywords of ig_config.json."""
+
+import json
+import re
+import threading
+from types import MappingProxyType
+from typing import Iterable, Mapping
+
+from report_tool.calculate.ledger import TypeCode, type_codes
+from report_tool.utils.constants import get_ig_config_file
+
+
+class KeywordMatcher:
+    """Find if a text contains any of a list of keywords.
+
+    Keywords are compiled once in a single alternation, so a text is
+    scanned once whatever the number of keywords. Matching is case
+    sensitive, like ``kw in text``.
+    """
+
+    __slots__ = ("keywords", "_pattern")
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(keywords)
+
+        if self.keywords:
+            # longer first, so a keyword isn't shadowed by its prefix
+            alternation = "|".join(
+                re.escape(keyword)
+                for keyword in sorted(self.keywords, key=len, reverse=True)
+            )
+        else:
+            alternation = "(?!)"  # never matches
+
+        self._pattern = re.compile(alternation)
+
+    def search(self, text: str) -> bool:
+        """Whether text contains one of the keywords."""
+        return self._pattern.search(text) is not None
+
+
+class TransactionClassifier:
+    """Types of IG transactions, from the keywords of ig_config.json.
+
+    Built once and shared by every stage, see :func:`get_classifier`.
+    """
+
+    __slots__ = ("kw_order", "order", "fees", "codes", "_funds_matchers")
+
+    def __init__(self, keywords: Mapping[str, Iterable[str]]):
+        """
+        Args:
+            keywords: ``keyword`` section of ig_config.json.
+        """
+        self.kw_order = tuple(keywords["ORDER"])
+        self.order = frozenset(self.kw_order)
+        self.fees = frozenset(keywords["FEES"])
+        self.codes: Mapping[str, TypeCode] = MappingProxyType(type_codes(self.kw_order))
+
+        # a fee is renamed after the first category found in its market name
+        self._funds_matchers = (
+            ("CASHIN", KeywordMatcher(keywords["CASH_IN"])),
+            ("CASHOUT", KeywordMatcher(keywords["CASH_OUT"])),
+            ("TRANSFER", KeywordMatcher(keywords["TRANSFER"])),
+        )
+
+    def is_order(self, transaction_type: str) -> bool:
+        """Whether an IG type is a trade."""
+        return transaction_type in self.order
+
+    def is_fee(self, transaction_type: str) -> bool:
+        """Whether an IG type is a fee, interest or funds movement."""
+        return transaction_type in self.fees
+
+    def funds_type(self, market_name: str) -> str | None:
+        """CASHIN, CASHOUT or TRANSFER if a fee is a funds movement."""
+        lower_name = market_name.lower()
+        for funds_type, matcher in self._funds_matchers:
+            if matcher.search(lower_name):
+                return funds_type
+        return None
+
+    def code(self, transaction_type: str) -> TypeCode:
+        """Code of a type of the transactions dict, UNDEFINED if unknown."""
+        return self.codes.get(transaction_type, TypeCode.UNDEFINED)
+
+
+_classifier_lock = threading.Lock()
+_classifier: tuple[tuple[int, int], TransactionClassifier] | None = None
+
+
+def get_classifier() -> TransactionClassifier:
+    """Classifier of the current ig_config.json.
+
+    The file is parsed again only when its modification time or size
+    changes, otherwise the same classifier is returned.
+    """
+    global _classifier
+
+    config_file = get_ig_config_file()
+    stat = config_file.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    with _classifier_lock:
+        if _classifier is None or _classifier[0] != stamp:
+            keywords = json.loads(config_file.read_text())["keyword"]
+            _classifier = (stamp, TransactionClassifier(keywords))
+
+        return _classifier[1]
@@ -0,0 +1,123 @@
+"""Vectorized drawdown segmentation of an equity curve."""
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+
+from report_tool.calculate.ledger import to_decimal
+
+
+@dataclass(frozen=True, slots=True)
+class DrawdownSegments:
+    """Markers drawn on an equity curve.
+
+    Indices refer to positions in the equity curve, values are taken from it.
+    """
+
+    idx_high: np.ndarray
+    high: np.ndarray
+    idx_depth: np.ndarray
+    depth: np.ndarray
+    idx_max_dd: np.ndarray
+    max_dd: np.ndarray
+
+
+@dataclass(slots=True)
+class DrawdownStats:
+    """Drawdowns of an equity curve starting at 0."""
+
+    max_dd: float = 0.0
+    dd_sum: float = 0.0  # sum of the drawdowns > 0, each rounded to 2 decimals
+    dd_count: int = 0
+
+    @classmethod
+    def from_pnl(cls, pnl: np.ndarray) -> "DrawdownStats":
+        """Drawdowns of the curve built by cumulating pnl."""
+        dd_array = drawdown(np.cumsum(np.insert(pnl, 0, 0)))
+
+        dd_list = np.round(dd_array, 2)
+        dd_list = dd_list[dd_list > 0]
+
+        return cls(float(dd_array.max()), float(dd_list.sum()), int(dd_list.size))
+
+    @property
+    def mean(self) -> Decimal:
+        """Mean of drawdowns, 0 if there is no drawdown."""
+        if not self.dd_count:
+            return Decimal()
+
+        return to_decimal(self.dd_sum) / self.dd_count
+
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    """Distance between each point of the equity curve and its running high."""
+    return np.maximum.accumulate(equity) - equity
+
+
+def segment_drawdowns(equity: np.ndarray) -> DrawdownSegments:
+    """Find highs, depths and max drawdown of an equity curve in O(n).
+
+    - a high is a point where the curve makes a new high (first point excluded,
+      it is not a trade).
+    - a depth is the lowest point between two highs. A drawdown the curve has
+      not recovered from yet has no depth.
+    - the max drawdown is the first point where the drawdown is the largest.
+
+    Args:
+        equity: cumulated pnl (or any equity curve).
+    """
+    equity = np.asarray(equity, dtype=float)
+    dd_array = drawdown(equity)
+
+    is_high = dd_array == 0
+    idx_high = np.flatnonzero(is_high[1:]) + 1
+
+    # boundaries of the runs of non zero drawdown: +1 starts a run, -1 ends it
+    edges = np.diff(np.concatenate(([0], (~is_high).view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # drop the last run if the curve did not make a new high after it
+    recovered = ends < len(equity)
+    starts = starts[recovered]
+    ends = ends[recovered]
+
+    if starts.size:
+        # only values inside the recovered runs compete for the depth
+        run_values = np.full(equity.size, np.inf)
+        in_run = np.zeros(equity.size + 1, dtype=np.int8)
+        in_run[starts] = 1
+        in_run[ends] = -1
+        in_run = np.cumsum(in_run[:-1]).astype(bool)
+        run_values[in_run] = equity[in_run]
+
+        depth = np.minimum.reduceat(run_values, starts)
+
+        # first index of the depth in each run
+        run_id = np.zeros(equity.size, dtype=np.intp)
+        run_id[starts] = 1
+        run_id = np.cumsum(run_id) - 1
+
+        candidates = np.flatnonzero(in_run & (run_values == depth[run_id]))
+        first = np.r_[True, np.diff(run_id[candidates]) != 0]
+        idx_depth = candidates[first]
+    else:
+        depth = np.array([])
+        idx_depth = np.array([], dtype=np.intp)
+
+    if equity.size:
+        idx_max_dd = np.array([np.argmax(dd_array)])
+        max_dd = equity[idx_max_dd]
+    else:
+        idx_max_dd = np.array([], dtype=np.intp)
+        max_dd = np.array([])
+
+    return DrawdownSegments(
+        idx_high=idx_high,
+        high=equity[idx_high],
+        idx_depth=idx_depth,
+        depth=depth,
+        idx_max_dd=idx_max_dd,
+        max_dd=max_dd,
+    )
@@ -0,0 +1,452 @@
+"""Summary and equity curves updated one transaction at a time."""
+
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Tuple
+
+import numpy as np
+
+from report_tool.calculate.drawdown import DrawdownStats, drawdown, segment_drawdowns
+from report_tool.calculate.ledger import (
+    FEE_CODES,
+    FUNDS_CODES,
+    INTEREST_CODES,
+    TradeLedger,
+    TypeCode,
+    to_decimal,
+    to_float,
+)
+from report_tool.calculate.streaks import StreakStats, run_lengths
+from report_tool.calculate.trades import TradesResults, TradeStats
+
+
+def _with_origin(values: np.ndarray, origin: float) -> np.ndarray:
+    """Prepend the origin of a curve, unless there is nothing to plot."""
+    if not values.size:
+        return values
+    return np.insert(values, 0, origin)
+
+
+@dataclass(slots=True)
+class RunningCurve:
+    """Equity curve with its highs, depths and max drawdown.
+
+    Same markers as ``segment_drawdowns``, but a point is appended in O(1).
+    """
+
+    values: list[float] = field(default_factory=list)
+    idx_high: list[int] = field(default_factory=list)
+    high: list[float] = field(default_factory=list)
+    idx_depth: list[int] = field(default_factory=list)
+    depth: list[float] = field(default_factory=list)
+    peak: float = -np.inf
+    idx_max_dd: int = 0
+    max_dd: float = 0.0
+    dd_sum: float = 0.0  # sum of the drawdowns > 0, each rounded to 2 decimals
+    dd_count: int = 0
+    idx_run_min: int | None = None  # lowest point of the current drawdown
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "RunningCurve":
+        """Seed the running state from a whole curve."""
+        values = np.asarray(values, dtype=float)
+        curve = cls(values=values.tolist())
+
+        if not values.size:
+            return curve
+
+        segments = segment_drawdowns(values)
+        dd_array = drawdown(values)
+        dd_list = np.round(dd_array, 2)
+        dd_list = dd_list[dd_list > 0]
+
+        curve.idx_high = segments.idx_high.tolist()
+        curve.high = segments.high.tolist()
+        curve.idx_depth = segments.idx_depth.tolist()
+        curve.depth = segments.depth.tolist()
+        curve.peak = float(values.max())
+        curve.idx_max_dd = int(segments.idx_max_dd[0])
+        curve.max_dd = float(dd_array[curve.idx_max_dd])
+        curve.dd_sum = float(dd_list.sum())
+        curve.dd_count = int(dd_list.size)
+
+        # curve has not recovered from its last drawdown yet
+        if dd_array[-1] != 0:
+            run_start = np.flatnonzero(dd_array == 0)[-1] + 1
+            curve.idx_run_min = int(run_start + np.argmin(values[run_start:]))
+
+        return curve
+
+    def append(self, value: float) -> int:
+        """Append a point to the curve and return its index."""
+        index = len(self.values)
+        self.values.append(value)
+
+        if not index:  # first point is not a trade
+            self.peak = value
+            return index
+
+        self.peak = max(self.peak, value)
+        dd = self.peak - value
+
+        if dd == 0:  # new high, close the current drawdown if any
+            self.idx_high.append(index)
+            self.high.append(value)
+
+            if self.idx_run_min is not None:
+                self.idx_depth.append(self.idx_run_min)
+                self.depth.append(self.values[self.idx_run_min])
+                self.idx_run_min = None
+
+        else:
+            if self.idx_run_min is None or value < self.values[self.idx_run_min]:
+                self.idx_run_min = index
+
+            if dd > self.max_dd:
+                self.idx_max_dd = index
+                self.max_dd = dd
+
+            if round(dd, 2) > 0:
+                self.dd_sum += round(dd, 2)
+                self.dd_count += 1
+
+        return index
+
+    def drawdown_stats(self) -> DrawdownStats:
+        return DrawdownStats(self.max_dd, self.dd_sum, self.dd_count)
+
+    def scatter_data(self) -> Dict[str, Any]:
+        """Curve and markers, formatted like ``TradesResults.create_curves``."""
+        if not self.values:
+            return {
+                "equity_curve": np.array([]),
+                "maxdd": (np.array([]), np.array([])),
+                "depth": (np.array([]), np.array([])),
+                "high": (np.array([]), np.array([])),
+            }
+
+        # order matters to keep max dd visible
+        return OrderedDict({"equity_curve": np.array(self.values), **self.markers()})
+
+    def markers(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """High, depth and max dd markers, without the curve."""
+        if not self.values:
+            return {
+                "high": (np.array([]), np.array([])),
+                "depth": (np.array([]), np.array([])),
+                "maxdd": (np.array([]), np.array([])),
+            }
+
+        return {
+            "high": (np.array(self.idx_high, dtype=np.intp), np.array(self.high)),
+            "depth": (np.array(self.idx_depth, dtype=np.intp), np.array(self.depth)),
+            "maxdd": (
+                np.array([self.idx_max_dd]),
+                np.array([self.values[self.idx_max_dd]]),
+            ),
+        }
+
+    @property
+    def markers_key(self) -> Tuple[int, int, int]:
+        """Changes when markers change, see ``markers``."""
+        return len(self.idx_high), len(self.idx_depth), self.idx_max_dd
+
+
+@dataclass(slots=True)
+class RunningStreaks:
+    """Consecutive wins/losses, extended one trade at a time."""
+
+    wins: Counter = field(default_factory=Counter)
+    losses: Counter = field(default_factory=Counter)
+    sign: int = 0  # sign of the current streak, 0 is flat
+    length: int = 0
+
+    @classmethod
+    def from_pnl(cls, pnl: np.ndarray) -> "RunningStreaks":
+        signs, lengths = run_lengths(np.sign(pnl))
+        streaks = cls()
+
+        if not signs.size:
+            return streaks
+
+        streaks.wins.update(lengths[:-1][signs[:-1] > 0].tolist())
+        streaks.losses.update(lengths[:-1][signs[:-1] < 0].tolist())
+        streaks.sign = int(signs[-1])
+        streaks.length = int(lengths[-1])
+
+        return streaks
+
+    def append(self, pnl: float) -> None:
+        sign = int(np.sign(pnl))
+
+        if sign == self.sign:
+            self.length += 1
+            return
+
+        self._close()
+        self.sign = sign
+        self.length = 1
+
+    def _close(self) -> None:
+        if self.sign > 0:
+            self.wins[self.length] += 1
+        elif self.sign < 0:
+            self.losses[self.length] += 1
+
+    def stats(self) -> StreakStats:
+        wins = Counter(self.wins)
+        losses = Counter(self.losses)
+
+        if self.sign > 0:
+            wins[self.length] += 1
+        elif self.sign < 0:
+            losses[self.length] += 1
+
+        def average(counter: Counter) -> float:
+            nb_streaks = sum(counter.values())
+            if not nb_streaks:
+                return 0.0
+            return sum(length * nb for length, nb in counter.items()) / nb_streaks
+
+        return StreakStats(
+            longest_win=max(wins, default=0),
+            longest_loss=max(losses, default=0),
+            average_win=average(wins),
+            average_loss=average(losses),
+            win_distribution=dict(sorted(wins.items())),
+            loss_distribution=dict(sorted(losses.items())),
+        )
+
+
+class IncrementalSummary:
+
+    """
+    Keep running sums, counts, drawdowns, streaks and curves
+    of the transactions, so a new transaction (e.g. a deal
+    closed intraday) is folded in O(1) instead of calculating
+    again the whole history. Seeded from the ledger used for
+    the last full calculation, with the same config
+    """
+
+    def __init__(
+        self,
+        ledger: TradeLedger,
+        start_capital: Decimal,
+        config: Mapping,
+        codes: Mapping[str, TypeCode],
+    ):
+        """
+        :param ledger: TradeLedger of the transactions already summarized
+        :param start_capital: Decimal, start capital used by calculate_result
+        :param config: dict with config saved
+        :param codes: code of each type, see TransactionClassifier.codes
+        """
+
+        self.codes = codes
+        self.start_capital = Decimal(start_capital)
+        self.include = config["include"]
+        self.result_in = config["result_in"]
+
+        is_order = ledger.is_order
+        pnl = ledger.pnl[is_order]
+        points = ledger.points[is_order]
+        points_lot = ledger.points_lot[is_order]
+
+        # sums are kept unrounded, rounded when stats are built
+        self.money_won = to_decimal(pnl[pnl > 0].sum())
+        self.money_lost = to_decimal(pnl[pnl < 0].sum())
+        self.points_won = to_decimal(points[points > 0].sum())
+        self.points_lost = to_decimal(points[points < 0].sum())
+        self.points_lot_won = to_decimal(points_lot[points_lot > 0].sum())
+        self.points_lot_lost = to_decimal(points_lot[points_lot < 0].sum())
+
+        self.nb_won = int(np.count_nonzero(pnl > 0))
+        self.nb_lost = int(np.count_nonzero(pnl < 0))
+        self.nb_flat = int(np.count_nonzero(pnl == 0))
+
+        self.totals = {
+            code: to_decimal(np.nansum(ledger.pnl[ledger.type_code == code]))
+            for code in TypeCode
+        }
+        self.total_pnl = to_decimal(np.nansum(ledger.pnl))
+        self.capital_pnl = to_decimal(np.nansum(ledger.pnl[~ledger.is_funds]))
+
+        self.streaks = RunningStreaks.from_pnl(pnl)
+
+        # equity of trades only, used for drawdowns in summary
+        self.dd_points = RunningCurve.from_values(np.cumsum(np.insert(points, 0, 0)))
+        self.dd_points_lot = RunningCurve.from_values(
+            np.cumsum(np.insert(points_lot, 0, 0))
+        )
+        self.dd_pnl = RunningCurve.from_values(np.cumsum(np.insert(pnl, 0, 0)))
+
+        # curves plotted, see TradesResults.create_curves
+        if self.include == 2:
+            is_included = is_order | ledger.is_fee
+        else:
+            is_included = is_order
+
+        scatter = points_lot if self.result_in == "Points/lot" else points
+        growth = ledger.growth(self.start_capital)
+
+        self.curves = {
+            "Points": RunningCurve.from_values(np.cumsum(_with_origin(scatter, 0))),
+            "Capital": RunningCurve.from_values(
+                np.cumsum(
+                    _with_origin(ledger.pnl[is_included], float(self.start_capital))
+                )
+            ),
+            "Growth": RunningCurve.from_values(_with_origin(growth[is_included], 0)),
+        }
+
+    def add(self, trade: Dict[str, Any]) -> Dict[str, List[Tuple[int, float]]]:
+        """
+        Fold a new transaction, more recent than the others.
+        Set its "growth" key like calculate_result does. Points
+        not available (e.g. "-") leave points stats untouched
+
+        Returns the points (x, y) appended to each curve, by graph
+        name. The origin comes first when a curve was empty
+
+        :param trade: dict formatted like a transaction built by
+                      TransactionThread
+        """
+
+        code = self.codes.get(trade["type"], TypeCode.UNDEFINED)
+        pnl = np.nan_to_num(to_float(trade["pnl"]))
+        pnl_decimal = to_decimal(pnl)
+
+        self.totals[code] += pnl_decimal
+        self.total_pnl += pnl_decimal
+
+        if code not in FUNDS_CODES:
+            self.capital_pnl += pnl_decimal
+
+        if self.start_capital == 0:
+            growth = Decimal()
+            trade["growth"] = "0"
+        else:
+            growth = round(self.capital_pnl / self.start_capital * 100, 2)
+            trade["growth"] = str(growth)
+
+        appended = {}
+
+        if code == TypeCode.ORDER:
+            if pnl > 0:
+                self.money_won += pnl_decimal
+                self.nb_won += 1
+            elif pnl < 0:
+                self.money_lost += pnl_decimal
+                self.nb_lost += 1
+            else:
+                self.nb_flat += 1
+
+            self.streaks.append(pnl)
+            self.dd_pnl.append(self.dd_pnl.values[-1] + pnl)
+
+            points = to_float(trade["points"])
+            if not np.isnan(points):
+                if points > 0:
+                    self.points_won += to_decimal(points)
+                elif points < 0:
+                    self.points_lost += to_decimal(points)
+
+                self.dd_points.append(self.dd_points.values[-1] + points)
+
+            points_lot = to_float(trade["points_lot"])
+            if not np.isnan(points_lot):
+                if points_lot > 0:
+                    self.points_lot_won += to_decimal(points_lot)
+                elif points_lot < 0:
+                    self.points_lot_lost += to_decimal(points_lot)
+
+                self.dd_points_lot.append(self.dd_points_lot.values[-1] + points_lot)
+
+            scatter = points_lot if self.result_in == "Points/lot" else points
+            if not np.isnan(scatter):
+                appended["Points"] = self._extend(
+                    self.curves["Points"], 0.0, scatter, cumulate=True
+                )
+
+        if code == TypeCode.ORDER or self.include == 2 and code in FEE_CODES:
+            appended["Capital"] = self._extend(
+                self.curves["Capital"], float(self.start_capital), pnl, cumulate=True
+            )
+
+            # growth is not revelent without start capital
+            if self.start_capital != 0:
+                appended["Growth"] = self._extend(
+                    self.curves["Growth"], 0.0, float(growth), cumulate=False
+                )
+
+        return appended
+
+    @staticmethod
+    def _extend(
+        curve: RunningCurve, origin: float, value: float, cumulate: bool
+    ) -> List[Tuple[int, float]]:
+        appended = []
+
+        if not curve.values:
+            appended.append((curve.append(origin), origin))
+
+        if cumulate:
+            value += curve.values[-1]
+
+        appended.append((curve.append(value), value))
+        return appended
+
+    def stats(self) -> TradeStats:
+        """Stats of all transactions folded so far."""
+        return TradeStats(
+            money_won=round(self.money_won, 2),
+            money_lost=round(self.money_lost, 2),
+            points_won=self.points_won,
+            points_lost=self.points_lost,
+            points_lot_won=self.points_lot_won,
+            points_lot_lost=self.points_lot_lost,
+            nb_won=self.nb_won,
+            nb_lost=self.nb_lost,
+            nb_flat=self.nb_flat,
+            streaks=self.streaks.stats(),
+            total_pnl=self.total_pnl,
+            total_interest=round(
+                sum((self.totals[code] for code in INTEREST_CODES), Decimal()), 2
+            ),
+            total_fee=round(self.totals[TypeCode.CHART], 2),
+            total_cashin=round(self.totals[TypeCode.CASHIN], 2),
+            total_cashout=round(self.totals[TypeCode.CASHOUT], 2),
+            total_transfer=round(self.totals[TypeCode.TRANSFER], 2),
+            dd_points=self.dd_points.drawdown_stats(),
+            dd_points_lot=self.dd_points_lot.drawdown_stats(),
+            dd_pnl=self.dd_pnl.drawdown_stats(),
+        )
+
+    def summary(self, screenshot: bool, config: Mapping) -> OrderedDict:
+        """
+        Summary formatted for the dock. Start capital is kept,
+        cash available is deduced from it and pnl
+
+        :param screenshot: boolean inform if screenshot is being taken
+        :param config: dict with config saved
+        """
+
+        stats = self.stats()
+        cash_available = self.start_capital + stats.net_pnl(self.include)
+
+        return TradesResults.format_summary(
+            stats, self.start_capital, cash_available, screenshot, config
+        )
+
+    def curves_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Curves formatted like ``TradesResults.create_curves``."""
+        curves_dict = {
+            name: curve.scatter_data() for name, curve in self.curves.items()
+        }
+
+        # when growth is not revelent send empty curves
+        if self.start_capital == 0:
+            curves_dict["Growth"] = RunningCurve().scatter_data()
+
+        return curves_dict
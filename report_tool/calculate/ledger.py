@@ -0,0 +1,188 @@
+"""Columnar, NumPy-backed view of the transactions of a period."""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from enum import IntEnum
+from typing import Any, Final, Iterable, Mapping
+
+import numpy as np
+
+
+class TypeCode(IntEnum):
+    """Compact integer code for each transaction type."""
+
+    UNDEFINED = 0
+    ORDER = 1
+    WITH = 2
+    DEPO = 3
+    DIVIDEND = 4
+    CHART = 5
+    CASHIN = 6
+    CASHOUT = 7
+    TRANSFER = 8
+
+
+NAMED_CODES: Final[dict[str, TypeCode]] = {
+    "WITH": TypeCode.WITH,
+    "DEPO": TypeCode.DEPO,
+    "DIVIDEND": TypeCode.DIVIDEND,
+    "CHART": TypeCode.CHART,
+    "CASHIN": TypeCode.CASHIN,
+    "CASHOUT": TypeCode.CASHOUT,
+    "TRANSFER": TypeCode.TRANSFER,
+    "UNDEFINED": TypeCode.UNDEFINED,
+}
+
+INTEREST_CODES: Final[tuple[TypeCode, ...]] = (
+    TypeCode.WITH,
+    TypeCode.DEPO,
+    TypeCode.DIVIDEND,
+)
+FEE_CODES: Final[tuple[TypeCode, ...]] = (*INTEREST_CODES, TypeCode.CHART)
+FUNDS_CODES: Final[tuple[TypeCode, ...]] = (
+    TypeCode.CASHIN,
+    TypeCode.CASHOUT,
+    TypeCode.TRANSFER,
+)
+
+
+def type_codes(kw_order: Iterable[str]) -> dict[str, TypeCode]:
+    """Map each transaction type to its code. Unknown types are UNDEFINED.
+
+    Args:
+        kw_order: IG types identifying a trade (see ig_config.json).
+    """
+    codes = dict(NAMED_CODES)
+    codes.update((kw, TypeCode.ORDER) for kw in kw_order)
+    return codes
+
+
+def to_float(value: Any) -> float:
+    """Convert a transaction value to float, ``"-"`` (not available) to NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def to_decimal(value: float) -> Decimal:
+    """Convert a float computed on the ledger back to a ``Decimal``.
+
+    The float is rounded first so summation noise (``0.30000000000000004``)
+    does not leak into the displayed values.
+    """
+    return Decimal(repr(round(float(value), 10) + 0.0))
+
+
+def round_half_even(array: np.ndarray, decimals: int = 2) -> np.ndarray:
+    """Round like ``round(Decimal, decimals)`` would on the exact values.
+
+    Scaled values are first snapped to remove float noise, so a true tie
+    (``-9.425``) is rounded half to even instead of wherever noise sends it.
+    """
+    scale = 10**decimals
+    return np.rint(np.round(array * scale, 6)) / scale
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True, slots=True)
+class TradeLedger:
+    """Typed columns for the transactions built by ``TransactionThread``.
+
+    Rows keep the order of the transactions dict (older to newer).
+    Values that are not available (``"-"``) are stored as NaN.
+    """
+
+    deal_ids: tuple[str, ...]
+    type_code: np.ndarray
+    pnl: np.ndarray
+    points: np.ndarray
+    points_lot: np.ndarray
+    size: np.ndarray
+    date: np.ndarray
+
+    @classmethod
+    def from_transactions(
+        cls,
+        transactions: Mapping[str, Mapping[str, Any]],
+        codes: Mapping[str, TypeCode],
+    ) -> "TradeLedger":
+        """Build the ledger in a single pass over the transactions.
+
+        Args:
+            transactions: transactions as built by ``TransactionThread.treat_data``.
+            codes: code of each type, see ``TransactionClassifier.codes``.
+        """
+        nb_rows = len(transactions)
+        type_code = np.empty(nb_rows, dtype=np.int8)
+        pnl = np.empty(nb_rows)
+        points = np.empty(nb_rows)
+        points_lot = np.empty(nb_rows)
+        size = np.empty(nb_rows)
+        dates = []
+
+        for row, trade in enumerate(transactions.values()):
+            type_code[row] = codes.get(trade["type"], TypeCode.UNDEFINED)
+            pnl[row] = to_float(trade["pnl"])
+            points[row] = to_float(trade["points"])
+            points_lot[row] = to_float(trade["points_lot"])
+            size[row] = to_float(trade["open_size"])
+
+            try:
+                day, month, year = trade["date"].split("/")  # IG format is dd/mm/yy
+                dates.append(f"20{year}-{month}-{day}")
+            except ValueError:
+                dates.append("NaT")
+
+        return cls(
+            deal_ids=tuple(transactions.keys()),
+            type_code=_frozen(type_code),
+            pnl=_frozen(pnl),
+            points=_frozen(points),
+            points_lot=_frozen(points_lot),
+            size=_frozen(size),
+            date=_frozen(np.array(dates, dtype="datetime64[D]")),
+        )
+
+    def __len__(self) -> int:
+        return len(self.deal_ids)
+
+    def mask(self, *codes: TypeCode) -> np.ndarray:
+        """Return a boolean mask of the rows having one of the given codes."""
+        return np.isin(self.type_code, codes)
+
+    def rows(self, *codes: TypeCode) -> np.ndarray:
+        """Return the read-only indices of the rows having one of the given codes."""
+        return _frozen(np.flatnonzero(self.mask(*codes)))
+
+    @property
+    def is_order(self) -> np.ndarray:
+        """Rows that are trades."""
+        return self.type_code == TypeCode.ORDER
+
+    @property
+    def is_fee(self) -> np.ndarray:
+        """Rows that are fees, interest or dividends."""
+        return self.mask(*FEE_CODES)
+
+    @property
+    def is_funds(self) -> np.ndarray:
+        """Rows that are deposits, withdrawals or transfers between accounts."""
+        return self.mask(*FUNDS_CODES)
+
+    def total(self, *codes: TypeCode) -> Decimal:
+        """Sum of the pnl of the rows having one of the given codes."""
+        return round(to_decimal(np.nansum(self.pnl[self.mask(*codes)])), 2)
+
+    def growth(self, start_capital: Decimal) -> np.ndarray:
+        """Capital growth in % after each row, funds transfers excluded."""
+        if start_capital == 0:
+            return np.zeros(len(self))
+
+        start = float(start_capital)
+        pnl = np.where(self.is_funds, 0.0, np.nan_to_num(self.pnl))
+        return round_half_even(np.cumsum(pnl) / start * 100)
@@ -0,0 +1,62 @@
+"""Statistics about consecutive winning and losing trades."""
+
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+
+
+@dataclass(frozen=True, slots=True)
+class StreakStats:
+    """Streaks of consecutive wins and losses. A flat trade ends a streak.
+
+    Distributions map a streak length to the number of streaks of that length.
+    """
+
+    longest_win: int
+    longest_loss: int
+    average_win: float
+    average_loss: float
+    win_distribution: Dict[int, int]
+    loss_distribution: Dict[int, int]
+
+
+def run_lengths(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Split values in runs of equal values.
+
+    Returns:
+        The value and the length of each run, in order.
+    """
+    values = np.asarray(values)
+    if not values.size:
+        return values, np.array([], dtype=np.intp)
+
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    lengths = np.diff(np.r_[starts, values.size])
+    return values[starts], lengths
+
+
+def _distribution(lengths: np.ndarray) -> Dict[int, int]:
+    counts = np.bincount(lengths)
+    return {int(length): int(counts[length]) for length in np.flatnonzero(counts)}
+
+
+def streak_stats(pnl: np.ndarray) -> StreakStats:
+    """Compute streaks statistics of trades in one run-length pass.
+
+    Args:
+        pnl: pnl of each trade, in the order trades were closed.
+    """
+    signs, lengths = run_lengths(np.sign(np.asarray(pnl, dtype=float)))
+
+    wins = lengths[signs > 0]
+    losses = lengths[signs < 0]
+
+    return StreakStats(
+        longest_win=int(wins.max(initial=0)),
+        longest_loss=int(losses.max(initial=0)),
+        average_win=float(wins.mean()) if wins.size else 0.0,
+        average_loss=float(losses.mean()) if losses.size else 0.0,
+        win_distribution=_distribution(wins),
+        loss_distribution=_distribution(losses),
+    )
@@ -1,11 +1,87 @@
 from collections import OrderedDict
+from dataclasses import dataclass
 from decimal import Decimal, DivisionByZero
-from typing import Dict, List, Tuple
+from typing import Dict, Final, List, Mapping
 
 import numpy as np
 
-from report_tool.qt.functions import read_ig_config
-from report_tool.utils.settings import read_config
+from report_tool.calculate.classify import get_classifier
+from report_tool.calculate.drawdown import DrawdownStats, segment_drawdowns
+from report_tool.calculate.ledger import (
+    INTEREST_CODES,
+    TradeLedger,
+    TypeCode,
+    to_decimal,
+)
+from report_tool.calculate.streaks import StreakStats, streak_stats
+from report_tool.utils.settings import get_settings
+
+SUMMARY_HEADERS: Final[List[str]] = [
+    "Points won",
+    "Trades won",
+    "Points lost",
+    "Trades lost",
+    "Total points",
+    "Trades flat",
+    "Total trades",
+    "Avg trade",
+    "Profit Factor",
+    "Avg win",
+    "Capital growth",
+    "Avg loss",
+    "Max drawdown",
+    "Avg drawdown",
+    "Consec. wins",
+    "Consec. losses",
+    "Interests",
+    "Fees",
+    "Cash in/out",
+    "Transfers",
+]  # same list as the one used to create dock
+
+
+@dataclass(slots=True)
+class TradeStats:
+    """Aggregates the summary is formatted from.
+
+    Wins, losses and drawdowns only concern trades.
+    Money won/lost are rounded to 2 decimals.
+    """
+
+    money_won: Decimal
+    money_lost: Decimal
+    points_won: Decimal
+    points_lost: Decimal
+    points_lot_won: Decimal
+    points_lot_lost: Decimal
+    nb_won: int
+    nb_lost: int
+    nb_flat: int
+    streaks: StreakStats
+    total_pnl: Decimal  # pnl of every transaction
+    total_interest: Decimal
+    total_fee: Decimal
+    total_cashin: Decimal
+    total_cashout: Decimal
+    total_transfer: Decimal
+    dd_points: DrawdownStats
+    dd_points_lot: DrawdownStats
+    dd_pnl: DrawdownStats
+
+    @property
+    def nb_trades(self) -> int:
+        return self.nb_won + self.nb_lost + self.nb_flat
+
+    def net_pnl(self, include: int) -> Decimal:
+        """Pnl without funds transfers (and fees/interest if not included)."""
+        net_pnl = self.total_pnl - (
+            self.total_cashin + self.total_cashout + self.total_transfer
+        )
+
+        if include != 2:
+            net_pnl = net_pnl - (self.total_fee + self.total_interest)
+
+        return net_pnl
 
 
 # TODO: is it needed to subclass dict? Especially for one huge method!
@@ -20,17 +96,43 @@ class TradesResults(dict):
         self.dict_results = dict
 
     @staticmethod
-    def calculate_transactions_of_types(
-        transactions: Dict, types: List[str]
-    ) -> Tuple[List[Decimal], Decimal]:
-        out_list = [
-            Decimal(trade["pnl"])
-            for trade in transactions.values()
-            if trade["type"] in types
-        ]
+    def build_stats(ledger: TradeLedger) -> TradeStats:
+        """
+        Aggregate the ledger in the stats needed by format_summary
+
+        :param ledger: TradeLedger of the transactions
+        """
 
-        out_total = round(Decimal(sum(out_list)), 2)
-        return out_list, out_total
+        # pnl in currency, points and points/lot of trades only
+        is_order = ledger.is_order
+        pnl_currency_array = ledger.pnl[is_order]
+        points_array = ledger.points[is_order]
+        points_lot_array = ledger.points_lot[is_order]
+
+        won = pnl_currency_array > 0
+        lost = pnl_currency_array < 0
+
+        return TradeStats(
+            money_won=round(to_decimal(pnl_currency_array[won].sum()), 2),
+            money_lost=round(to_decimal(pnl_currency_array[lost].sum()), 2),
+            points_won=to_decimal(points_array[points_array > 0].sum()),
+            points_lost=to_decimal(points_array[points_array < 0].sum()),
+            points_lot_won=to_decimal(points_lot_array[points_lot_array > 0].sum()),
+            points_lot_lost=to_decimal(points_lot_array[points_lot_array < 0].sum()),
+            nb_won=int(np.count_nonzero(won)),
+            nb_lost=int(np.count_nonzero(lost)),
+            nb_flat=int(np.count_nonzero(pnl_currency_array == 0)),
+            streaks=streak_stats(pnl_currency_array),
+            total_pnl=to_decimal(np.nansum(ledger.pnl)),
+            total_interest=ledger.total(*INTEREST_CODES),
+            total_fee=ledger.total(TypeCode.CHART),
+            total_cashin=ledger.total(TypeCode.CASHIN),  # user's deposit
+            total_cashout=ledger.total(TypeCode.CASHOUT),  # user's withdrawal
+            total_transfer=ledger.total(TypeCode.TRANSFER),  # interaccount transfer
+            dd_points=DrawdownStats.from_pnl(points_array),
+            dd_points_lot=DrawdownStats.from_pnl(points_lot_array),
+            dd_pnl=DrawdownStats.from_pnl(pnl_currency_array),
+        )
 
     def calculate_result(
         self,
@@ -38,6 +140,7 @@ class TradesResults(dict):
         start_capital: Decimal,
         cash_available: Decimal,
         screenshot: bool,
+        ledger: TradeLedger | None = None,
     ) -> Dict:
         """
         Calculate summary about trades. For infos calculated
@@ -56,110 +159,28 @@ class TradesResults(dict):
 
         :kw param screenshot: boolean inform if screenshot is being
                              taken to properly format infos
+
+        :kw param ledger: TradeLedger built from transactions, built
+                          here if not given
         """
 
-        config = read_config()  # load config file
-        currency_symbol = config["currency_symbol"]
-        result_in = config["result_in"]
+        config = get_settings()  # load config file
         auto_calculate = config["auto_calculate"]
         include = config["include"]
-        state_filter = config["all"]
-        state_infos = config["what_to_show"]["state_infos"]
-
-        summary_headers = [
-            "Points won",
-            "Trades won",
-            "Points lost",
-            "Trades lost",
-            "Total points",
-            "Trades flat",
-            "Total trades",
-            "Avg trade",
-            "Profit Factor",
-            "Avg win",
-            "Capital growth",
-            "Avg loss",
-            "Max drawdown",
-            "Avg drawdown",
-            "Consec. wins",
-            "Consec. losses",
-            "Interests",
-            "Fees",
-            "Cash in/out",
-            "Transfers",
-        ]  # same lis as the one used to create dock
-
-        ig_config = read_ig_config()
-
-        """
-        ig sends keywords to identify transactions type known
-        keywords ares stored in ig_config.json
-        if transaction type is unknown log it
-        """
 
-        kw_order = ig_config["keyword"]["ORDER"]
-        kw_fees = ig_config["keyword"]["FEES"]
-        kw_cashin = ig_config["keyword"]["CASH_IN"]
-        kw_cashout = ig_config["keyword"]["CASH_OUT"]
-        kw_transfer = ig_config["keyword"]["TRANSFER"]
+        if ledger is None:
+            codes = get_classifier().codes
+            ledger = TradeLedger.from_transactions(transactions, codes)
 
-        summary_dict = OrderedDict()
-
-        # -------------------------start precalculation-------------------------
-
-        # calculate all internal funds transfer
-
-        # interaccount transfer
-        transfer_list, total_transfer = self.calculate_transactions_of_types(
-            transactions, ["TRANSFER"]
-        )
-
-        # user's deposit
-        cashin_list, total_cashin = self.calculate_transactions_of_types(
-            transactions, ["CASHIN"]
-        )
-
-        # user's withdrawal
-        cashout_list, total_cashout = self.calculate_transactions_of_types(
-            transactions, ["CASHOUT"]
-        )
-
-        # build list with interest pnl
-        interest_list, total_interest = self.calculate_transactions_of_types(
-            transactions, ["WITH", "DEPO", "DIVIDEND"]
-        )
-
-        # build list with fees pnl
-        fee_list, total_fee = self.calculate_transactions_of_types(
-            transactions, ["CHART"]
-        )
-
-        # calculate total pnl to determine start capital
-        if transactions:
-            total_pnl = sum([Decimal(t["pnl"]) for t in transactions.values()])
-
-            # pnl minus funds transfert
-            if include == 2:
-                total_pnl = total_pnl - (total_cashin + total_cashout + total_transfer)
-
-            # pnl minus funds transfert and fees/interest
-            else:
-                total_pnl = total_pnl - (
-                    total_cashin
-                    + total_cashout
-                    + total_transfer
-                    + total_fee
-                    + total_interest
-                )
-
-        else:  # no data returns empy dict
-            for count, header in enumerate(summary_headers):
-                summary_dict[header] = ""
+        if not transactions:  # no data returns empy dict
+            summary_dict = OrderedDict((header, "") for header in SUMMARY_HEADERS)
 
             curve_args = {
                 "transactions": transactions,
                 "start_capital": start_capital,
                 "config": config,
+                "ledger": ledger,
+                "growth": np.array([]),
             }
 
             curves_dict = self.create_curves(**curve_args)
@@ -169,74 +190,112 @@ class TradesResults(dict):
                 "start_capital": start_capital,
                 "transactions": transactions,
                 "curves_dict": curves_dict,
+                "stats": None,
+                "streaks": streak_stats(np.array([])),
             }
 
             return dict_results
 
+        stats = self.build_stats(ledger)
+
         # determine start capital according to user's choice
-        if auto_calculate == 2:
-            start_capital = cash_available - total_pnl
-        else:
-            cash_available = start_capital + total_pnl
-        capital = start_capital
+        start_capital, cash_available = self.resolve_capital(
+            stats, start_capital, cash_available, include, auto_calculate
+        )
 
         # calculate growth according to start capital
-        for count, deal_id in enumerate(transactions.keys()):
-            # add nothing if trade is fund transfer
-            if transactions[deal_id]["type"] not in ["TRANSFER", "CASHIN", "CASHOUT"]:
-                # substract every pnl to cash available
-                capital += transactions[deal_id]["pnl"]
+        growth_array = ledger.growth(start_capital)
 
-            # recalculate growth
-            try:
-                growth = round(((capital - start_capital) / start_capital) * 100, 2)
-            except ZeroDivisionError:
-                growth = 0
+        # change growth key in transactions
+        if start_capital == 0:
+            for deal_id in transactions.keys():
+                transactions[deal_id]["growth"] = "0"
+        else:
+            for deal_id, growth in zip(transactions.keys(), growth_array):
+                transactions[deal_id]["growth"] = f"{growth:.2f}"
 
-            # change growth key in transactions
-            transactions[deal_id]["growth"] = str(growth)
+        summary_dict = self.format_summary(
+            stats, start_capital, cash_available, screenshot, config
+        )
 
-        # build list with pnl in currency
-        pnl_currency_list = [
-            Decimal(transactions[trade]["pnl"])
-            for trade in transactions.keys()
-            if transactions[trade]["type"] in kw_order
-        ]
+        curve_args = {
+            "transactions": transactions,
+            "start_capital": start_capital,
+            "config": config,
+            "ledger": ledger,
+            "growth": growth_array,
+        }
 
-        # build list with pnl in points
-        points_list = [
-            Decimal(transactions[trade]["points"])
-            for trade in transactions.keys()
-            if transactions[trade]["type"] in kw_order
-        ]
+        # creates curves for equity plot
+        scatter_curves = self.create_curves(**curve_args)
 
-        # build list with pnl in points/lot
-        points_lot_list = [
-            Decimal(transactions[trade]["points_lot"])
-            for trade in transactions.keys()
-            if transactions[trade]["type"] in kw_order
-        ]
+        dict_results = {
+            "summary": summary_dict,
+            "start_capital": start_capital,
+            "transactions": transactions,
+            "curves_dict": scatter_curves,
+            "stats": stats,
+            "streaks": stats.streaks,
+        }
 
-        # lists with pnl in currency
-        pnl_won_list = [pnl for pnl in pnl_currency_list if pnl > 0]
-        pnl_loss_list = [pnl for pnl in pnl_currency_list if pnl < 0]
-        pnl_flat_list = [pnl for pnl in pnl_currency_list if pnl == 0]
+        return dict_results
 
-        # list with pnl in points
-        points_won_list = [points for points in points_list if points > 0]
-        points_loss_list = [points for points in points_list if points < 0]
+    @staticmethod
+    def resolve_capital(
+        stats: TradeStats,
+        start_capital: Decimal,
+        cash_available: Decimal,
+        include: int,
+        auto_calculate: int,
+    ) -> tuple[Decimal, Decimal]:
+        """
+        Return start capital and cash available. One of
+        them is deduced from the other according to user's
+        choice (auto calculate start capital or not)
+        """
 
-        # list with won in points/lot
-        points_lot_won_list = [
-            points_lot for points_lot in points_lot_list if points_lot > 0
-        ]
+        total_pnl = stats.net_pnl(include)
 
-        points_lot_loss_list = [
-            points_lot for points_lot in points_lot_list if points_lot < 0
-        ]
+        if auto_calculate == 2:
+            start_capital = cash_available - total_pnl
+        else:
+            cash_available = start_capital + total_pnl
 
-        money_won = sum(pnl_won_list)
-        money_lost = sum(pnl_loss_list)
+        return start_capital, cash_available
+
+    @staticmethod
+    def format_summary(
+        stats: TradeStats,
+        start_capital: Decimal,
+        cash_available: Decimal,
+        screenshot: bool,
+        config: Mapping,
+    ) -> OrderedDict:
+        """
+        Format stats into the strings displayed in the summary
+        dock. See SUMMARY_HEADERS for the infos returned
+
+        :param stats: TradeStats to format
+        :param start_capital: Decimal
+        :param cash_available: Decimal
+        :param screenshot: boolean inform if screenshot is being
+                           taken to properly format infos
+        :param config: dict with config saved
+        """
+
+        currency_symbol = config["currency_symbol"]
+        result_in = config["result_in"]
+        include = config["include"]
+        state_infos = config["what_to_show"]["state_infos"]
+
+        total_transfer = stats.total_transfer
+        total_cashin = stats.total_cashin
+        total_cashout = stats.total_cashout
+        total_interest = stats.total_interest
+        total_fee = stats.total_fee
+
+        money_won = stats.money_won
+        money_lost = stats.money_lost
 
         """
         if users want to calculate summary with
@@ -256,72 +315,26 @@ class TradesResults(dict):
         else:
             # calculate totals in currency
             total_pnl_currency = round((money_won + money_lost), 2)
-            money_won = round(money_won, 2)
-            money_lost = round(money_lost, 2)
 
         # stats in points
-        points_lost = sum(points_loss_list)
-        points_won = sum(points_won_list)
+        points_lost = stats.points_lost
+        points_won = stats.points_won
         total_pnl = round((points_won + points_lost), 2)
 
         # stats in points/lot
-        points_lot_lost = sum(points_lot_loss_list)
-        points_lot_won = sum(points_lot_won_list)
+        points_lot_lost = stats.points_lot_lost
+        points_lot_won = stats.points_lot_won
         total_pnl_lot = round((points_lot_won + points_lot_lost), 2)
 
         # stats about nb trades
-        nb_trades = Decimal(len(pnl_currency_list))
-        nb_trades_flat = Decimal(len(pnl_flat_list))
-        nb_trades_lost = Decimal(len(pnl_loss_list))
-        nb_trades_won = Decimal(len(pnl_won_list))
-
-        i = 0
-        j = 0
-        conseq_won_list = [0]
-        conseq_loss_list = [0]
+        nb_trades = Decimal(stats.nb_trades)
+        nb_trades_flat = Decimal(stats.nb_flat)
+        nb_trades_lost = Decimal(stats.nb_lost)
+        nb_trades_won = Decimal(stats.nb_won)
 
         # stats about consequtive win/loss
-        for _ in pnl_currency_list:
-            conseq_loss = 0
-            conseq_won = 0
-            j = 0
-
-            try:
-                pnl = pnl_currency_list[i]  # get pnl
-            except IndexError:
-                break
-
-            if pnl > 0:
-                try:
-                    while pnl > 0:
-                        conseq_won += 1  # increment conseq wons
-                        j += 1
-                        pnl = pnl_currency_list[i + j]  # get next pnl
-                    conseq_won_list.append(conseq_won)
-                    i += j  # get pnl after last won
-
-                except IndexError:
-                    conseq_won_list.append(conseq_won)  # r eached end of list
-                    i = j - 1
-
-            elif pnl < 0:
-                try:
-                    while pnl < 0:
-                        conseq_loss += 1  # increment conseq losses
-                        j += 1
-                        pnl = pnl_currency_list[i + j]  # get next pnl
-                    conseq_loss_list.append(conseq_loss)
-                    i += j  # get pnl after last loss
-
-                except IndexError:
-                    conseq_loss_list.append(conseq_loss)  # reached end of list
-                    i = j - 1
-
-            elif pnl == 0:
-                i += 1  # trade flat get next one
-
-        conseq_won = max(conseq_won_list)
-        conseq_loss = max(conseq_loss_list)
+        conseq_won = stats.streaks.longest_win
+        conseq_loss = stats.streaks.longest_loss
 
         # manage zero division error
         try:
@@ -363,13 +376,7 @@ class TradesResults(dict):
             won_in = points_won
             loss_in = points_lost
 
-            # prepare dd calculation
-            pnl_array = np.insert(np.asfarray(points_list), 0, 0)
-            pnl_cumsum = np.cumsum(pnl_array)
-
-            dd_array = np.maximum.accumulate(pnl_cumsum) - pnl_cumsum
-            dd_to_list = [round(Decimal(f), 2) for f in np.ndarray.tolist(dd_array)]
-            dd_list = [dd for dd in dd_to_list if dd > 0]
+            dd_stats = stats.dd_points
 
             """
             force interest and fees to be displayed
@@ -397,13 +404,7 @@ class TradesResults(dict):
             except DivisionByZero:
                 loss_in = 0
 
-            # prepare dd calculation
-            pnl_array = np.insert(np.asfarray(points_lot_list), 0, 0)
-            pnl_cumsum = np.cumsum(pnl_array)
-
-            dd_array = np.maximum.accumulate(pnl_cumsum) - pnl_cumsum
-            dd_to_list = [round(Decimal(f), 2) for f in np.ndarray.tolist(dd_array)]
-            dd_list = [dd for dd in dd_to_list if dd > 0]
+            dd_stats = stats.dd_points_lot
 
             """
             force interest and fees to be displayed
@@ -420,13 +421,7 @@ class TradesResults(dict):
             won_in = money_won
             loss_in = money_lost
 
-            # prepare dd calculation
-            pnl_array = np.insert(np.asfarray(pnl_currency_list), 0, 0)
-            pnl_cumsum = np.cumsum(pnl_array)
-
-            dd_array = np.maximum.accumulate(pnl_cumsum) - pnl_cumsum
-            dd_to_list = [round(Decimal(f), 2) for f in np.ndarray.tolist(dd_array)]
-            dd_list = [dd for dd in dd_to_list if dd > 0]
+            dd_stats = stats.dd_pnl
 
             interest_text = f"{total_interest} {currency_symbol}"
             fee_text = f"{total_fee} {currency_symbol}"
@@ -434,24 +429,14 @@ class TradesResults(dict):
             result_in = currency_symbol  # prettier string for result_in
 
         elif result_in == "%":
-            # prepare dd calculation
-            pnl_array = np.insert(np.asfarray(pnl_currency_list), 0, 0)
-            pnl_cumsum = np.cumsum(pnl_array)
-            dd_array = np.maximum.accumulate(pnl_cumsum) - pnl_cumsum
-            dd_to_list = [round(Decimal(f), 2) for f in np.ndarray.tolist(dd_array)]
-            dd_list = [dd for dd in dd_to_list if dd > 0]
+            dd_stats = None
 
-            try:
-                # first calculate max_dd in money
-                max_dd = round(Decimal(np.amax(dd_array)), 2)
-            except ValueError:
-                max_dd = Decimal()
+            # first calculate max_dd in money
+            max_dd = round(Decimal(stats.dd_pnl.max_dd), 2)
 
             # calculate dd in %
             try:
-                per_cent_avg_dd = round(
-                    (Decimal(sum(dd_list)) / len(dd_list)) / start_capital * 100, 2
-                )
+                per_cent_avg_dd = round(stats.dd_pnl.mean / start_capital * 100, 2)
                 per_cent_max_dd = round(max_dd / start_capital * 100, 2)
 
             except (RuntimeWarning, DivisionByZero):
@@ -476,13 +461,6 @@ class TradesResults(dict):
             interest_text = f"{total_interest} %"
             fee_text = f"{total_fee} %"
 
-            """
-            set dummy array to force TypeError. I prefer doing
-            that way to avoid too much if/else statements
-            """
-
-            dd_array = ""
-
         # calculate avg values
         try:
             avg_trade = round((total_in / nb_trades), 2)
@@ -499,21 +477,12 @@ class TradesResults(dict):
         except DivisionByZero:
             avg_loss = Decimal()
 
-        try:
-            max_dd = round(Decimal(np.amax(dd_array)), 2)
-
-            try:
-                avg_dd = round(Decimal(sum(dd_list)) / len(dd_list), 2)
-            except DivisionByZero:  # means 0 loss
-                avg_dd = Decimal()
-
-        except TypeError:  # means result is in %
+        if dd_stats is None:  # means result is in %
             max_dd = per_cent_max_dd
             avg_dd = per_cent_avg_dd
-
-        except ValueError:
-            max_dd = Decimal()
-            avg_dd = Decimal()
+        else:
+            max_dd = round(Decimal(dd_stats.max_dd), 2)
+            avg_dd = round(dd_stats.mean, 2)
         # -------------------------end main calculation-------------------------
 
         # add result_in to strings
@@ -592,15 +561,6 @@ class TradesResults(dict):
             )
             total_transfer_text = f"{total_transfer}{currency_symbol}"
 
-        curve_args = {
-            "transactions": transactions,
-            "start_capital": start_capital,
-            "config": config,
-        }
-
-        # creates curves for equity plot
-        scatter_curves = self.create_curves(**curve_args)
-
         # list with all infos calculated
         summary_list = [
             won_in_text,
@@ -625,19 +585,8 @@ class TradesResults(dict):
             total_transfer_text,
         ]
 
-        summary_dict = OrderedDict()
-
-        for count, header in enumerate(summary_headers):
-            summary_dict[header] = summary_list[count]  # populate summary dict
-
-        dict_results = {
-            "summary": summary_dict,
-            "start_capital": start_capital,
-            "transactions": transactions,
-            "curves_dict": scatter_curves,
-        }
-
-        return dict_results
+        # populate summary dict
+        return OrderedDict(zip(SUMMARY_HEADERS, summary_list))
 
     def create_curves(*args, **kwargs):
         """
@@ -663,19 +612,17 @@ class TradesResults(dict):
         config = kwargs["config"]
         include = config["include"]
         result_in = config["result_in"]
-        ig_config = read_ig_config()
 
-        """
-        ig sends keywords to identify transactions type known
-        keywords ares stored in ig_config.json
-        if transaction type is unknown log it
-        """
+        ledger = kwargs.get("ledger")
+
+        if ledger is None:
+            codes = get_classifier().codes
+            ledger = TradeLedger.from_transactions(transactions, codes)
+
+        growth = kwargs.get("growth")
 
-        kw_order = ig_config["keyword"]["ORDER"]
-        kw_fees = ig_config["keyword"]["FEES"]
-        kw_cashin = ig_config["keyword"]["CASH_IN"]
-        kw_cashout = ig_config["keyword"]["CASH_OUT"]
-        kw_transfer = ig_config["keyword"]["TRANSFER"]
+        if growth is None:
+            growth = ledger.growth(start_capital)
 
         plot_available = ["high", "depth", "maxdd"]  # type of scatter
 
@@ -689,17 +636,24 @@ class TradesResults(dict):
         scatter_dict = {}
 
         """
-        keys correspond to those in transactions lists are
-        used to acces to correct data in transactions
+        columns of the ledger used for each graph
         """
 
         if result_in == "Points/lot":
-            scatter_type = ["points_lot", "pnl", "growth"]
+            scatter_type = [ledger.points_lot, ledger.pnl, growth]
         else:
-            scatter_type = ["points", "pnl", "growth"]
+            scatter_type = [ledger.points, ledger.pnl, growth]
 
         graph_name = ["Points", "Capital", "Growth"]  # tab names
 
+        is_order = ledger.is_order
+
+        # means we have to care about fees/interest
+        if include == 2:
+            is_included = is_order | ledger.is_fee
+        else:
+            is_included = is_order
+
         for index, scatter in enumerate(scatter_type):
             if not transactions:  # returns empty curves if no data
                 scatter_data = {
@@ -711,128 +665,32 @@ class TradesResults(dict):
                 scatter_dict[graph_name[index]] = scatter_data
 
             else:
-                # means we have to care about fees/interest
                 if graph_name[index] != "Points":
-                    if include == 2:
-                        pnl_list = [
-                            Decimal(transactions[trade][scatter])
-                            for trade in transactions.keys()
-                            if transactions[trade]["type"] in kw_order
-                            or transactions[trade]["type"] in kw_fees
-                        ]
-
-                    # exclude interest/fees
-                    else:
-                        pnl_list = [
-                            Decimal(transactions[trade][scatter])
-                            for trade in transactions.keys()
-                            if transactions[trade]["type"] in kw_order
-                        ]
-
-                    # pnl_list = [0,-10, 5,2,3,8,-25,54]    #dummy curves to test
+                    pnl_array = scatter[is_included]
 
                     if graph_name[index] == "Capital":
                         # insert start capital
-                        if len(pnl_list) != 0:
-                            pnl_list.insert(0, start_capital)
+                        if pnl_array.size:
+                            pnl_array = np.insert(pnl_array, 0, float(start_capital))
 
-                        pnl_array = np.asfarray(pnl_list)
                         pnl_cumsum = np.cumsum(pnl_array)
 
                     else:
-                        if len(pnl_list) != 0:
-                            pnl_list.insert(0, 0)
+                        if pnl_array.size:
+                            pnl_array = np.insert(pnl_array, 0, 0)
 
-                        pnl_array = np.asfarray(pnl_list)
                         pnl_cumsum = pnl_array  # don"t cumsum if growth
 
                 else:  # we don"t care about fees/interest
-                    pnl_list = [
-                        Decimal(transactions[trade][scatter])
-                        for trade in transactions.keys()
-                        if transactions[trade]["type"] in kw_order
-                    ]
-
-                    # pnl_list = [0,-10, 5,2,3,8,-25,54]    #dummy curves to test
+                    pnl_array = scatter[is_order]
 
-                    if len(pnl_list) != 0:
-                        pnl_list.insert(0, 0)
+                    if pnl_array.size:
+                        pnl_array = np.insert(pnl_array, 0, 0)
 
-                    pnl_array = np.asfarray(pnl_list)
                     pnl_cumsum = np.cumsum(pnl_array)
 
-                """
-                find new hight in pnl_list. new higth is when
-                a value isgreater than all the previous ones
-                """
-
-                dd_array = np.maximum.accumulate(pnl_cumsum) - pnl_cumsum
-                idx_high = [
-                    count for count, high in enumerate(dd_array) if dd_array[count] == 0
-                ]
-
-                # list of all hights on equity curves
-                list_high = [pnl_cumsum[idx] for idx in idx_high]
-
-                # del the first idx, not a trade
-                if 0 in idx_high:
-                    del idx_high[0]
-                    del list_high[0]
-
-                list_depth = []
-                idx_depth = []
-                i = 0
-                j = 0
-
-                """
-                Find depth in pnl_list. depth is the
-                smallest value between two hights
-                """
-
-                for dd in dd_array:
-                    try:
-                        dd = dd_array[j]
-                    except IndexError:  # reach end of the array
-                        break
-
-                    if dd == 0.0:  # means new high an equity curve ascending
-                        j += 1  # continue iteration
-
-                    # when equity curve is descending (dd != 0) find the
-                    # ext dd == 0, meaning a new high has been made
-                    else:
-                        try:
-                            i = 1
-                            while dd != 0:
-                                # get next dd starting from last high
-                                dd = dd_array[j + i]
-                                i += 1
-
-                            # isolate the depth in equity curve
-                            current_depth = pnl_cumsum[j : j + i - 1]
-                            list_depth.append(min(current_depth))
-
-                            # get index of min
-                            idx_min = np.argmin(current_depth) + j
-                            idx_depth.append(idx_min)
-
-                            # we continue iteration from the end of depth
-                            j = j + i
-
-                        except IndexError:  # reach end of the array
-                            break
-
-                try:
-                    idx_max_dd = [np.argmax(dd_array)]
-
-                    if graph_name[index] == "Capital":
-                        max_dd = [pnl_cumsum[idx_max_dd[0]]]
-                    else:
-                        max_dd = pnl_cumsum[idx_max_dd]
-
-                except ValueError:
-                    idx_max_dd = np.array([])
-                    max_dd = np.array([])
+                # highs, depths and max dd of equity curve
+                segments = segment_drawdowns(pnl_cumsum)
 
                 # when growth is not revelent send empty curves
                 if start_capital == 0 and graph_name[index] == "Growth":
@@ -848,9 +706,9 @@ class TradesResults(dict):
                     scatter_data = OrderedDict(
                         {
                             "equity_curve": pnl_cumsum,
-                            "high": (idx_high, list_high),
-                            "depth": (idx_depth, list_depth),
-                            "maxdd": (idx_max_dd, max_dd),
+                            "high": (segments.idx_high, segments.high),
+                            "depth": (segments.idx_depth, segments.depth),
+                            "maxdd": (segments.idx_max_dd, segments.max_dd),
                         }
                     )
 
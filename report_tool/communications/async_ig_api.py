@@ -0,0 +1,101 @@
+"""Asyncio facade of :any:`IGAPI`, over a pool of threads sending its requests."""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Coroutine, Final
+
+from report_tool.communications.ig_rest_api import IGAPI, APIError
+
+MAX_WORKERS: Final[int] = 4  # same as the default pool size of IGAPI
+
+
+class AsyncIGAPI:
+    """Same requests as :any:`IGAPI`, as coroutines.
+
+    This is an executor facade, not an integration with Qt: requests
+    are still sent by the blocking ``IGAPI``, in a pool of
+    ``max_workers`` threads sharing its kept alive connections. The
+    coroutines wrapping them run on a private event loop, in a daemon
+    thread. Results are delivered to the gui thread by
+    :any:`AsyncCaller`, through a queued signal.
+
+    Requests return what ``IGAPI`` does, except that
+    :meth:`get_user_accounts` doesn't write the config: do it from
+    the gui thread with ``IGAPI.save_currency_symbol``.
+    """
+
+    def __init__(self, session: IGAPI, max_workers: int = MAX_WORKERS):
+        """
+        Args:
+            session: connected, or about to be, blocking client.
+            max_workers: max number of requests in flight.
+        """
+        self.session = session
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="AsyncIGAPI"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._executor)
+        self._futures: set[Future] = set()
+        self._thread = threading.Thread(
+            target=self._run, name="AsyncIGAPI", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        self._loop.run_forever()
+
+        # stopped by close, let the coroutines left handle their cancellation
+        pending = asyncio.all_tasks(self._loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self._loop.run_until_complete(
+                asyncio.gather(*pending, return_exceptions=True)
+            )
+
+        self._loop.close()
+
+    async def _call(self, method, *args) -> Any:
+        return await self._loop.run_in_executor(None, method, *args)
+
+    async def create_session(self) -> APIError | None:
+        return await self._call(self.session.create_session)
+
+    async def get_user_accounts(self):
+        return await self._call(self.session.get_user_accounts, False)
+
+    async def get_transactions(self, date_range: str):
+        return await self._call(self.session.get_transactions, date_range)
+
+    async def get_positions(self):
+        return await self._call(self.session.get_positions)
+
+    async def switch_account(self, acc_id: str, acc_name: str) -> APIError | None:
+        return await self._call(self.session.switch_account, acc_id, acc_name)
+
+    async def logout(self) -> APIError | None:
+        return await self._call(self.session.logout)
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """Run a coroutine on the loop, from any thread."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+
+        return future
+
+    def close(self) -> None:
+        """Cancel the coroutines pending and stop the loop, without waiting.
+
+        Requests queued are dropped. The ones in flight end in their
+        thread, their replies are dropped.
+        """
+        for future in list(self._futures):
+            future.cancel()
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._loop.call_soon_threadsafe(self._loop.stop)
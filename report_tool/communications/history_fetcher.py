@@ -0,0 +1,166 @@
+"""Fetch long transaction histories as concurrent, month sized requests."""
+
+import datetime
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Final, Iterator, List, Tuple
+
+import requests
+
+from report_tool.communications.ig_rest_api import APIError
+
+DateWindow = Tuple[datetime.date, datetime.date]
+
+IG_DATE_FORMAT: Final[str] = "%d-%m-%Y"  # format of dates in history urls
+ONE_DAY: Final[datetime.timedelta] = datetime.timedelta(days=1)
+
+logger = logging.getLogger("ReportTool_debug.IGAPI")
+
+MAX_WORKERS: Final[int] = 4
+# IG allows 60 non-trading requests per minute, with some burst
+REQUESTS_PER_SECOND: Final[float] = 1.0
+REQUESTS_BURST: Final[int] = 10
+
+
+def parse_date_range(date_range: str) -> DateWindow:
+    """Parse a range formatted like ``/dd-MM-yyyy/dd-MM-yyyy``."""
+    start, end = date_range.strip("/").split("/")
+    return (
+        datetime.datetime.strptime(start, IG_DATE_FORMAT).date(),
+        datetime.datetime.strptime(end, IG_DATE_FORMAT).date(),
+    )
+
+
+def format_date_range(start: datetime.date, end: datetime.date) -> str:
+    """Format a range of dates the way history urls expect it."""
+    return f"/{start.strftime(IG_DATE_FORMAT)}/{end.strftime(IG_DATE_FORMAT)}"
+
+
+def split_months(
+    start: datetime.date, end: datetime.date, max_windows: int = REQUESTS_BURST
+) -> List[DateWindow]:
+    """Split a range of days in calendar months, newer first.
+
+    Consecutive months are grouped when there are more than
+    ``max_windows`` of them, so a long history doesn't exhaust
+    the requests allowed.
+    """
+    months = []
+    month_end = end
+
+    while month_end >= start:
+        month_start = max(month_end.replace(day=1), start)
+        months.append((month_start, month_end))
+        month_end = month_start - ONE_DAY
+
+    group = max(1, -(-len(months) // max_windows))  # ceil division
+
+    return [
+        (months[min(index + group, len(months)) - 1][0], months[index][1])
+        for index in range(0, len(months), group)
+    ]
+
+
+class RateLimiter:
+    """Token bucket: ``burst`` requests at once, then ``rate`` per second."""
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND, burst: int = REQUESTS_BURST):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait until a request is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._burst, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self._rate
+
+            time.sleep(wait)
+
+
+# shared by every fetch, the limit is per application
+_RATE_LIMITER = RateLimiter()
+
+
+def fetch_history(
+    session,
+    start: datetime.date,
+    end: datetime.date,
+    progress: Callable[[int, int], None] | None = None,
+    max_workers: int = MAX_WORKERS,
+    rate_limiter: RateLimiter | None = None,
+):
+    """
+    Request transactions from start to end, one request per
+    month (see :any:`split_months`), at most max_workers at once.
+    Returns transactions in IG order (newer first) like
+    ``IGAPI.get_transactions`` does, or the APIError of the first
+    window that failed. Responses are parsed while they are
+    received, their text is never held in memory. Transactions
+    are an iterator, the list of a window is dropped once read
+
+    :param session: :any:`IGAPI` instance
+    :param start: datetime.date, first day requested
+    :param end: datetime.date, last day requested
+    :param progress: function called with (nb windows received, nb windows)
+    :param max_workers: int, max number of requests in flight
+    :param rate_limiter: RateLimiter, default is shared by all fetches
+    """
+
+    windows = split_months(start, end)
+    rate_limiter = rate_limiter or _RATE_LIMITER
+
+    nb_done = 0
+    lock = threading.Lock()
+
+    def fetch(window: DateWindow):
+        nonlocal nb_done
+
+        rate_limiter.acquire()
+        result = session.get_transactions(format_date_range(*window), stream=True)
+
+        if type(result) != APIError:
+            try:
+                result = {"transactions": list(result["transactions"])}
+            except (requests.exceptions.RequestException, ValueError):
+                logger.error(traceback.format_exc())
+                result = APIError("Unable to get transactions: see log file")
+
+        with lock:
+            nb_done += 1
+            if progress is not None:
+                progress(nb_done, len(windows))
+
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as pool:
+        results = list(pool.map(fetch, windows))
+
+    for result in results:
+        if type(result) == APIError:
+            return result
+
+    return {"transactions": _iter_windows(results)}
+
+
+def _iter_windows(results: List[dict]) -> Iterator[dict]:
+    """Yield transactions of windows newer first, forget windows read."""
+    results.reverse()
+
+    while results:
+        yield from results.pop()["transactions"]
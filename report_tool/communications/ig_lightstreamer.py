@@ -20,6 +20,7 @@
 import collections
 import logging
 import queue
+import re
 import socket
 import threading
 import time
@@ -58,6 +59,10 @@ RETRY_WAIT_SECS = 0.125
 # cap the retry backoff at this maximum.
 RETRY_WAIT_MAX_SECS = 30.0
 
+# Maximum number of bytes read at once from the stream. A read returns as soon
+# as some bytes are available, so a large value doesn't delay updates.
+READ_CHUNK_SIZE = 64 * 1024
+
 # Create and activate a new table. The item group specified in the LS_id
 # parameter will be subscribed to and Lightstreamer Server will start sending
 # realtime updates to the client immediately.
@@ -172,27 +177,119 @@ def _replace_url_host(url, hostname=None):
     return urllib.parse.urlunparse(new)
 
 
-def _decode_field(s, prev=None):
-    """
-    Decode a single field according to the Lightstreamer encoding rules.
+_RE_UNICODE_ESCAPE = re.compile(r"\\u([0-9a-fA-F]{4})")
+
+
+def _unescape(s):
+    """Replace the unicode escapes of the form \\uXXXX of `s`."""
+    return _RE_UNICODE_ESCAPE.sub(lambda match: chr(int(match.group(1), 16)), s)
+
+
+class RowDecoder(object):
+    """Decode update rows of a table, merging each one into the last known
+    row of its item.
+
+    Fields are decoded according to the Lightstreamer encoding rules:
     1. Literal '$' is the empty string.
     2. Literal '#' is null (None).
     3. Literal '' indicates unchanged since previous update.
     4. If the string starts with either '$' or '#', but is not length 1,
        trim the first character.
-    5. Unicode escapes of the form uXXXX are unescaped.
+    5. Unicode escapes of the form \\uXXXX are unescaped.
+
+    The last row of an item is a list allocated at its first update, then
+    updated in place.
+    """
 
-    Returns the decoded Unicode string.
+    def __init__(self, field_count=0):
+        """`field_count`: number of fields of the schema, if known."""
+        self.field_count = field_count
+        self._rows = {}
+
+    def decode(self, item_id, fields):
+        """Merge the encoded `fields` of an update into the last row of
+        `item_id` and return a copy of the row."""
+        row = self._rows.get(item_id)
+        if row is None:
+            row = self._rows[item_id] = [None] * max(self.field_count, len(fields))
+        elif len(row) < len(fields):
+            row.extend([None] * (len(fields) - len(row)))
+
+        for index, field in enumerate(fields):
+            if not field:
+                continue  # unchanged
+            first = field[0]
+            if first == "$" or first == "#":
+                if len(field) == 1:
+                    row[index] = "" if first == "$" else None
+                    continue
+                field = field[1:]
+            if "\\" in field:
+                field = _unescape(field)
+            row[index] = field
+
+        return row[:]
+
+
+def _read1(raw):
+    """Return a function reading at most n bytes of `raw`, returning as soon
+    as some bytes are available instead of waiting for n bytes. urllib3 1.x
+    responses have no read1, their read(n) waits for n bytes."""
+    read1 = getattr(raw, "read1", None)  # urllib3 >= 2
+    if read1 is not None:
+        return read1
+    return raw.read
+
+
+class LineReader(object):
+    """Split a byte stream in lines, read by large chunks.
+
+    Lines end with CRLF (a lone LF is accepted too) and are yielded as soon
+    as they are complete, without their line ending. Lines are sliced out of
+    the buffer through a memoryview, so bytes are copied once, when decoded.
     """
-    if s == "$":
-        return ""
-    elif s == "#":
-        return None
-    elif s == "":
-        return prev
-    elif s[0] in "$#":
-        s = s[1:]
-    return s.decode("unicode_escape")
+
+    def __init__(self, read, chunk_size=READ_CHUNK_SIZE):
+        """`read(n)` returns up to n bytes, b"" at the end of the stream."""
+        self._read = read
+        self._chunk_size = chunk_size
+
+    @classmethod
+    def from_stream(cls, req, chunk_size=READ_CHUNK_SIZE):
+        """Reader of the body of a `requests` response sent with stream=True."""
+        return cls(_read1(req.raw), chunk_size)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Reader of a body already received."""
+        chunks = iter([data, b""])
+        return cls(lambda n: next(chunks))
+
+    def __iter__(self):
+        buf = bytearray()
+        while True:
+            chunk = self._read(self._chunk_size)
+            if not chunk:
+                break
+            buf += chunk
+
+            start = 0
+            view = memoryview(buf)
+            try:
+                while True:
+                    end = buf.find(b"\n", start)
+                    if end < 0:
+                        break
+                    stop = end - 1 if end > start and buf[end - 1] == 0x0D else end
+                    yield str(view[start:stop], "utf-8")
+                    start = end + 1
+            finally:
+                view.release()  # buf can't be resized while viewed
+
+            del buf[:start]
+
+        if buf:  # last line, without line ending
+            yield buf.rstrip(b"\r").decode("utf-8")
 
 
 def run_and_log(func, *args, **kwargs):
@@ -360,7 +457,7 @@ class Table(object):
         self.silent = silent
         self.snapshot = snapshot
 
-        self._last_item_map = {}
+        self._decoder = client.row_decoder(len(schema.split()) if schema else 0)
         #: This is a dict mapping item IDs to the last known value for
         #: the particular item. Note that if no updates have been received
         #: for a specified item ID, it will have no entry here.
@@ -372,9 +469,7 @@ class Table(object):
         if item == "EOS":
             self.on_end_of_snapshot.fire()
             return
-        last = dict(enumerate(self._last_item_map.get(item_id, [])))
-        fields = [_decode_field(s, last.get(i)) for i, s in enumerate(item)]
-        self._last_item_map[item_id] = fields
+        fields = self._decoder.decode(item_id, item)
         # fields.insert(0, self.item_ids)    # insert table ids to know wha it's sent
         # self.items[item_id] = self.item_factory(fields)
         # self.on_update.fire(item_id, self.items[item_id])
@@ -395,6 +490,9 @@ class LsClient(object):
     private thread.
     """
 
+    #: Decoder of the update rows of the tables, per transport.
+    row_decoder = RowDecoder
+
     on_state = event_property(
         "on_state",
         """Subscribe `func` to connection state changes. Sole argument, `state`
@@ -434,6 +532,8 @@ class LsClient(object):
         self._state = STATE_DISCONNECTED
         self._control_queue = collections.deque()
         self._thread = None
+        #: Optional ls_replay.LsRecorder, recording the lines received.
+        self.recorder = None
 
     def _set_state(self, state):
         """Emit an event indicating the connection state has changed, taking
@@ -528,9 +628,11 @@ class LsClient(object):
             verify=False,
             proxies=self.proxies,
         )
-        line_it = req.iter_lines(chunk_size=1, decode_unicode=True)
+        line_it = iter(LineReader.from_stream(req))
         self._parse_and_raise_status(req, line_it)
         self._parse_session_info(line_it)
+        if self.recorder is not None:
+            line_it = self.recorder.wrap(line_it)
         self._set_state(STATE_CONNECTED)
         self.log.debug(
             "Server reported Content-length: %s", req.headers.get("Content-length")
@@ -574,6 +676,8 @@ class LsClient(object):
                 self._set_state(STATE_CONNECTING)
                 time.sleep(fail_wait)
 
+        if self.recorder is not None:
+            self.recorder.close()
         self._set_state(STATE_DISCONNECTED)
         self._thread = None
         self._session.clear()
@@ -595,19 +699,14 @@ class LsClient(object):
             raise TransientError("%s %s: %s" % (status, next(line_it), next(line_it)))
 
     def _parse_session_info(self, line_it):
-        """Parse the headers from `fp` sent immediately following an OK
-        message, and store them in self._session."""
-        # Requests' iter_lines() has some issues with \r.
-        blanks = 0
+        """Parse the headers from `line_it` sent immediately following an OK
+        message, up to the blank line ending them, and store them in
+        self._session."""
         for line in line_it:
-            if line:
-                blanks = 0
-                key, value = line.rstrip().split(":", 1)
-                self._session[key] = value
-            else:
-                blanks += 1
-                if blanks == 2:
-                    break
+            if not line:
+                break
+            key, value = line.rstrip().split(":", 1)
+            self._session[key] = value
 
         self.control_url = _replace_url_host(
             self.base_url, self._session.get("ControlAddress")
@@ -629,7 +728,7 @@ class LsClient(object):
                     "`ControlAddress` not found. Frame was: `%s`", req.text
                 )
 
-            line_it = req.iter_lines(chunk_size=1, decode_unicode=True)
+            line_it = iter(LineReader.from_bytes(req.content))
             self._parse_and_raise_status(req, line_it)
             self.control_url = control_address
         except Exception:
@@ -712,7 +811,7 @@ class LsClient(object):
         req = self._post(
             "control.txt", data="\r\n".join(bits), base_url=self.control_url
         )
-        self._parse_and_raise_status(req, req.iter_lines(decode_unicode=True))
+        self._parse_and_raise_status(req, iter(LineReader.from_bytes(req.content)))
         self.log.debug("Control message successful.")
 
     def _enqueue_table_create(self, table):
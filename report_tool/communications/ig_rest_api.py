@@ -1,14 +1,48 @@
 """Module with classes to interact with IG Rest API"""
+import functools
 import json
 import logging
+import re
+import threading
+import time
 import traceback
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from copy import deepcopy
+from decimal import Decimal
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from report_tool.utils.json_utils import iter_json_array
 from report_tool.utils.settings import read_config, write_config
 
+# http method of each req_type accepted by send_request
+REQ_METHODS = {"get": "GET", "post": "POST", "put": "PUT", "del": "DELETE"}
+
+# ig is rate limiting (429) or unavailable, worth retrying
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes read at once from streamed responses
+
+RE_DATE_RANGE = re.compile(r"(/\d{2}-\d{2}-\d{4})+$")
+
+# dict with ISO code of currency as keys
+# and corresponding symbol as values
+CURRENCY_SYMBOLS = {
+    "EUR": "€",
+    "USD": "$",
+    "GBP": "£",
+    "CAD": "$CA",
+    "AUD": "$AU",
+    "SGD": "S$",
+    "CHF": "CHF",
+    "NOK": "krone",
+    "SEK": "kronor",
+    "JPY": str("\u00A5"),
+}
+
 
 class APIError(Exception):
 
@@ -38,6 +72,74 @@ class APIError(Exception):
         self._error_msg = msg
 
 
+# connections opened by the requests of each thread
+_opened_connections = threading.local()
+
+
+def opened_connections():
+    """Count connections opened so far by the current thread"""
+
+    return getattr(_opened_connections, "count", 0)
+
+
+@functools.lru_cache(maxsize=None)
+def _counting_pool(pool_cls):
+    """
+    Subclass a urllib3 pool so that its connections count each
+    time they connect, i.e. when a socket is opened. Built once
+    per pool class
+    """
+
+    class CountingConnection(pool_cls.ConnectionCls):
+        def connect(self):
+            _opened_connections.count = opened_connections() + 1
+            super(CountingConnection, self).connect()
+
+    class CountingPool(pool_cls):
+        ConnectionCls = CountingConnection
+
+    return CountingPool
+
+
+def _counting_pools(pool_classes_by_scheme):
+    """Copy pool classes of a manager, counting connections"""
+
+    return {
+        scheme: _counting_pool(pool_cls)
+        for scheme, pool_cls in pool_classes_by_scheme.items()
+    }
+
+
+class CountingAdapter(HTTPAdapter):
+
+    """
+    HTTPAdapter whose pools count connections opened per thread,
+    see opened_connections. Requests run concurrently by several
+    threads don't count the connections of each other
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Reimplement base method"""
+
+        super(CountingAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _counting_pools(
+            self.poolmanager.pool_classes_by_scheme
+        )
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        """Reimplement base method, managers are kept by proxy"""
+
+        is_new = proxy not in self.proxy_manager
+        manager = super(CountingAdapter, self).proxy_manager_for(proxy, **proxy_kwargs)
+
+        if is_new:
+            manager.pool_classes_by_scheme = _counting_pools(
+                manager.pool_classes_by_scheme
+            )
+
+        return manager
+
+
 class IGAPI(object):
 
     """This class provides methods to interacts with IG Rest API"""
@@ -59,12 +161,85 @@ class IGAPI(object):
         payload = connect_dict["payload"]
 
         self._ls_endpoint = ""
+        self._account_id = ""
         self._connect_dict = connect_dict
         self._headers = headers
 
         # set up a dict with all requested argument
         self._req_args = {"headers": headers, "data": payload, "proxies": proxies}
 
+        config = read_config()
+
+        self._timeout = config["request_timeout"]
+        self._session = self._create_http_session(
+            config["pool_size"], config["max_retries"]
+        )
+
+        # per endpoint: [nb of requests, total latency in s]
+        self._latencies = defaultdict(lambda: [0, 0.0])
+        self._latencies_lock = threading.Lock()
+
+    @staticmethod
+    def _create_http_session(pool_size, max_retries):
+        """
+        Create a session keeping connections alive between requests.
+        Requests failing with a status in RETRY_STATUS are retried
+        with an exponential backoff (0.5s, 1s, 2s...), Retry-After
+        header of ig is respected. POST are never retried
+
+        :param pool_size: int, max connections kept alive
+        :param max_retries: int, max retries of a request
+        """
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUS,
+            raise_on_status=False,  # last response is checked as usual
+        )
+        adapter = CountingAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+
+        http_session = requests.Session()
+        http_session.mount("https://", adapter)
+        http_session.mount("http://", adapter)
+
+        return http_session
+
+    def _log_latency(self, method, url, response, duration, nb_connections):
+        """
+        Log latency of a request and mean latency of its endpoint.
+        A request opening no connection reused a kept alive one
+
+        :param method: string, http method
+        :param url: string, adress of request
+        :param response: requests.Response or None if request failed
+        :param duration: float, latency of request in s
+        :param nb_connections: int, connections opened by request
+        """
+
+        endpoint = "%s %s" % (method, RE_DATE_RANGE.sub("", urlsplit(url).path))
+
+        with self._latencies_lock:
+            stats = self._latencies[endpoint]
+            stats[0] += 1
+            stats[1] += duration
+            nb_requests, total = stats
+
+        status = response.status_code if response is not None else "failed"
+        connection = "new connection" if nb_connections else "reused connection"
+
+        msg = "%s: %s in %.1f ms, %s (mean %.1f ms over %d requests)" % (
+            endpoint,
+            status,
+            duration * 1000,
+            connection,
+            total / nb_requests * 1000,
+            nb_requests,
+        )
+        self.logger_debug.log(logging.DEBUG, msg)
+
     def send_request(self, url, req_type, base_msg, *args, **kwargs):
         """
         Generic function to send request to API. It logs any exceptions.
@@ -76,19 +251,21 @@ class IGAPI(object):
         :param base_msg: string, describing request where an error occured
         """
 
-        try:
-            # select type of request
-            if req_type == "get":
-                response = requests.get(url, **kwargs)
-
-            elif req_type == "post":
-                response = requests.post(url, **kwargs)
+        method = REQ_METHODS[req_type]
+        kwargs.setdefault("timeout", self._timeout)
 
-            elif req_type == "put":
-                response = requests.put(url, **kwargs)
+        response = None
+        nb_connections = opened_connections()
+        start = time.perf_counter()
 
-            elif req_type == "del":
-                response = requests.put(url, **kwargs)
+        try:
+            try:
+                response = self._session.request(method, url, **kwargs)
+            finally:
+                nb_connections = opened_connections() - nb_connections
+                self._log_latency(
+                    method, url, response, time.perf_counter() - start, nb_connections
+                )
 
             # raise error if status code != 200
             response.raise_for_status()
@@ -156,35 +333,25 @@ class IGAPI(object):
 
             body = r_connect.json()
             self._ls_endpoint = body["lightstreamerEndpoint"]
+            self._account_id = body.get("currentAccountId", "")
 
             return
 
-    def get_user_accounts(self):
+    def get_user_accounts(self, save_currency=True):
         """
         Get user's account.
         Returns a nested dict with number of accounts as
         keys and strings listed in list_accounts_labels
         as subkeys with informations of account as sub values
         Else return APIError object.
+
+        :param save_currency: boolean, write currency symbol in
+            config. Config is written from the gui thread only,
+            other threads call save_currency_symbol from it
         """
 
         config = read_config()
 
-        # dict with ISO code of currency as keys
-        # and corresponding symbol as values
-        dict_currency = {
-            "EUR": "€",
-            "USD": "$",
-            "GBP": "£",
-            "CAD": "$CA",
-            "AUD": "$AU",
-            "SGD": "S$",
-            "CHF": "CHF",
-            "NOK": "krone",
-            "SEK": "kronor",
-            "JPY": str("\u00A5"),
-        }
-
         """
         list is the same used to create static labels in create_dock_account
         and self.dict_account_labels in ReportToolGUI here it used to created
@@ -225,19 +392,20 @@ class IGAPI(object):
                 dict_account.setdefault(count, OrderedDict())
 
                 currency_ISO = account["currency"]
-                currency_symbol = dict_currency[currency_ISO]
+                currency_symbol = CURRENCY_SYMBOLS[currency_ISO]
 
-                # write new currency symbol
-                config["currency_symbol"] = currency_symbol
-                write_config(config)
+                if save_currency:
+                    # write new currency symbol
+                    config["currency_symbol"] = currency_symbol
+                    write_config(config)
 
-                """
-                read new config to have the correct formatting
-                for currency symbol. may have a better solution
-                """
+                    """
+                    read new config to have the correct formatting
+                    for currency symbol. may have a better solution
+                    """
 
-                config = read_config()
-                currency_symbol = config["currency_symbol"]
+                    config = read_config()
+                    currency_symbol = config["currency_symbol"]
 
                 """
                 following infos will be displayed
@@ -273,24 +441,44 @@ class IGAPI(object):
                 for i, label in enumerate(list_account_labels):
                     dict_account[count][label] = list_acc_infos[i]
 
-            try:  # select currency symbol
-                currency_symbol = dict_currency[currency_ISO]
+            if save_currency:
+                self.save_currency_symbol(dict_account)
 
-            except KeyError:  # default is €
-                currency_symbol = dict_currency["EUR"]
+            return dict_account
 
-            config["currency_symbol"] = currency_symbol
-            write_config(config)
+    @staticmethod
+    def save_currency_symbol(dict_account):
+        """
+        Write in config the currency symbol of the
+        accounts received, to call from the gui thread
 
-            return dict_account
+        :param dict_account: reply of get_user_accounts
+        """
+
+        config = read_config()
+
+        try:  # select currency symbol
+            currency_ISO = list(dict_account.values())[-1]["currency_ISO"]
+            currency_symbol = CURRENCY_SYMBOLS[currency_ISO]
 
-    def get_transactions(self, date_range):
+        except (IndexError, KeyError):  # default is €
+            currency_symbol = CURRENCY_SYMBOLS["EUR"]
+
+        config["currency_symbol"] = currency_symbol
+        write_config(config)
+
+    def get_transactions(self, date_range, stream=False):
         """
         Get transactions within the range of dates selected by user.
         Returns transactions received or an APIError object
 
+        With stream, transactions are a generator parsing them from
+        the response as it is received, the body is never held in
+        memory. Reading it may raise requests or json exceptions
+
         :param date_range: string formatted to be compliant
                            with API format /dd-MM-yyyy/"dd-MM-yyyy"
+        :param stream: boolean, stream transactions
         """
 
         base_url = self._connect_dict["base_url"]
@@ -299,7 +487,11 @@ class IGAPI(object):
         transaction_url = base_url + "/history/transactions/ALL" + date_range
 
         r_transaction = self.send_request(
-            transaction_url, "get", "Unable to get transactions: ", **req_args
+            transaction_url,
+            "get",
+            "Unable to get transactions: ",
+            stream=stream,
+            **req_args,
         )
 
         # request failed return error
@@ -307,11 +499,65 @@ class IGAPI(object):
             return r_transaction
 
         # request is successfull, returns transactions
+        elif stream:
+            return {"transactions": self._stream_transactions(r_transaction)}
+
         else:
             transaction_received = json.loads(r_transaction.text)  # TODO: sanitize
 
             return transaction_received
 
+    @staticmethod
+    def _stream_transactions(response):
+        """
+        Yield transactions of a streamed response, connection
+        is released as soon as the array has been read
+
+        :param response: requests.Response sent with stream=True
+        """
+
+        try:
+            chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            yield from iter_json_array(chunks, "transactions")
+        finally:
+            response.close()
+
+    def get_positions(self):
+        """
+        Get open positions of current account. Returns a dict
+        with deal id of positions as keys and a dict with the
+        market name, direction and open level as values.
+        Else return APIError object.
+        """
+
+        base_url = self._connect_dict["base_url"]
+        positions_url = base_url + "/positions"
+
+        r_positions = self.send_request(
+            positions_url, "get", "Unable to get positions: ", **self._req_args
+        )
+
+        # request failed return error
+        if type(r_positions) == APIError:
+            return r_positions
+
+        # request is successfull, return positions
+        else:
+            r_text = json.loads(r_positions.text)
+
+            dict_positions = {}
+
+            for item in r_text["positions"]:
+                position = item["position"]
+
+                dict_positions[position["dealId"]] = {
+                    "market_name": item["market"]["instrumentName"],
+                    "direction": position["direction"],
+                    "open_level": Decimal(str(position["openLevel"])),
+                }
+
+            return dict_positions
+
     def switch_account(self, acc_id, acc_name):
         """
         Switch to account selected by user.
@@ -349,6 +595,7 @@ class IGAPI(object):
             self._headers["X-SECURITY-TOKEN"] = token
 
             self._req_args["headers"] = self._headers
+            self._account_id = acc_id
 
             return
 
@@ -371,6 +618,11 @@ class IGAPI(object):
         else:
             return
 
+    def close(self):
+        """Close connections kept alive"""
+
+        self._session.close()
+
     def _get_ls_endpoint(self):
         """Getter method"""
 
@@ -385,6 +637,11 @@ class IGAPI(object):
 
         self._ls_endpoint = endpoint
 
+    def _get_account_id(self):
+        """Getter method"""
+
+        return self._account_id
+
     def _get_req_args(self):
         """Getter method"""
 
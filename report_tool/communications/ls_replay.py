@@ -0,0 +1,190 @@
+"""Record Lightstreamer streams and replay them from a local server.
+
+A recording holds the lines received on bind_session.txt with the time
+they were received. Set ``recorder`` of an :any:`LsClient` to a
+:class:`LsRecorder` to record a session, then point ``base_url`` of
+another ``LsClient`` to ``LsReplayServer.base_url`` to replay it at
+the speed wanted, without a connection to IG. Tables must be created
+in the same order as when recording, updates refer to them by number.
+"""
+
+import gzip
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+RECORD_HEADER = "# ls-replay 1"
+
+# a recorded line: microseconds since the first line, line
+RecordedLine = Tuple[int, str]
+
+
+class LsRecorder:
+
+    """
+    Write lines received by an :any:`LsClient` to a gzip file, one
+    ``<microseconds since first line>\\t<line>`` per line. Lines are
+    buffered, the file is complete once closed
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = gzip.open(self.path, "wt", encoding="utf-8", newline="\n")
+        self._file.write(RECORD_HEADER + "\n")
+        self._lock = threading.Lock()
+        self._start: int | None = None
+        self.count = 0
+
+    def record(self, line: str) -> None:
+        """Append a line, timestamped now."""
+        now = time.monotonic_ns() // 1000
+
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._start is None:
+                self._start = now
+            self._file.write(f"{now - self._start}\t{line}\n")
+            self.count += 1
+
+    def wrap(self, line_it: Iterable[str]) -> Iterator[str]:
+        """Record the lines of line_it as they are read."""
+        for line in line_it:
+            self.record(line)
+            yield line
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def load_recording(path: Path) -> List[RecordedLine]:
+    """Lines of a recording, with their time in microseconds."""
+    with gzip.open(path, "rt", encoding="utf-8", newline="\n") as f:
+        if f.readline().rstrip("\n") != RECORD_HEADER:
+            raise ValueError(f"{path} is not a Lightstreamer recording")
+
+        lines = []
+        for row in f:
+            delay, _, line = row.rstrip("\n").partition("\t")
+            lines.append((int(delay), line))
+
+    return lines
+
+
+class LsReplayServer:
+
+    """
+    Serve a recording to an :any:`LsClient`. Lines are sent ``speed``
+    times faster than recorded, ``speed=0`` sends them as fast as
+    possible. A LOOP line ends a bind_session.txt answer, the next one
+    goes on with the following line. Once every line is sent, the
+    session is ended. Requests received are counted by path
+    """
+
+    def __init__(self, lines: List[RecordedLine], speed: float = 1.0):
+        self.lines = lines
+        self.speed = speed
+        self.requests: Counter[str] = Counter()
+        self.position = 0  # next line to send
+        self._lock = threading.Lock()
+        # (time.monotonic(), recorded time) of first line sent
+        self._start: Tuple[float, int] | None = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # keep the console quiet
+                pass
+
+            def do_POST(self):
+                server.requests[self.path] += 1
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                if self.path.endswith("create_session.txt"):
+                    body = server.session_header(self.server.server_address)
+                elif self.path.endswith("control.txt"):
+                    body = "OK\r\n"
+                elif self.path.endswith("bind_session.txt"):
+                    body = None
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+
+                if body is not None:
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body.encode())
+                else:  # streamed until the connection is closed
+                    self.end_headers()
+                    server.stream(self.wfile, self.server.server_address)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/lightstreamer/"
+
+    @staticmethod
+    def session_header(address: Tuple[str, int]) -> str:
+        host, port = address[:2]
+        return (
+            "OK\r\nSessionId:REPLAY\r\n"
+            f"ControlAddress:{host}:{port}\r\n"
+            "KeepaliveMillis:5000\r\nRequestLimit:50000\r\n\r\n"
+        )
+
+    def stream(self, wfile, address) -> None:
+        """Write the next lines, until a LOOP or the last line."""
+        wfile.write(self.session_header(address).encode())
+
+        with self._lock:  # one bind_session at a time, like LS does
+            batch: List[str] = []
+
+            while self.position < len(self.lines):
+                delay, line = self.lines[self.position]
+                self.position += 1
+
+                wait = self._wait(delay)
+                if wait > 0:
+                    wfile.write("".join(batch).encode())
+                    wfile.flush()
+                    batch.clear()
+                    time.sleep(wait)
+
+                batch.append(line + "\r\n")
+                if line.startswith("LOOP") or line.startswith("END"):
+                    break
+            else:
+                batch.append("END 31\r\n")
+
+            wfile.write("".join(batch).encode())
+
+    def _wait(self, delay: int) -> float:
+        """Seconds to wait before sending a line recorded at delay."""
+        if not self.speed:
+            return 0.0
+
+        now = time.monotonic()
+        if self._start is None:
+            self._start = (now, delay)
+            return 0.0
+
+        start, first_delay = self._start
+        return start + (delay - first_delay) / 1e6 / self.speed - now
+
+    def __enter__(self) -> "LsReplayServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
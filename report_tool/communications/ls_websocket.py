@@ -0,0 +1,494 @@
+"""Lightstreamer client over a single WebSocket, speaking TLCP.
+
+Session creation, subscriptions, control requests and updates share one
+connection, instead of a polling bind_session.txt request plus a
+control.txt request per batch of control messages.
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import socket
+import ssl
+import struct
+import threading
+import urllib.parse
+from typing import Callable, Dict, Final, List, Tuple
+
+import requests
+
+from report_tool.communications.ig_lightstreamer import (
+    CAUSE_MAP,
+    OP_ADD,
+    OP_ADD_SILENT,
+    OP_START,
+    STATE_CONNECTED,
+    STATE_CONNECTING,
+    STATE_DISCONNECTED,
+    LsClient,
+    RowDecoder,
+    SessionExpired,
+    TransientError,
+    run_and_log,
+)
+
+TLCP_PROTOCOL: Final[str] = "TLCP-2.0.0.lightstreamer.com"
+
+# Client id sent by the IG web platform, required to create a TLCP session.
+LS_CID: Final[str] = "mgQkwtwdysogQz2BJ4Ji kOj2Bg"
+
+_WS_GUID: Final[bytes] = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_CONTINUATION: Final[int] = 0x0
+OPCODE_TEXT: Final[int] = 0x1
+OPCODE_BINARY: Final[int] = 0x2
+OPCODE_CLOSE: Final[int] = 0x8
+OPCODE_PING: Final[int] = 0x9
+OPCODE_PONG: Final[int] = 0xA
+
+# keys of the HTTP control requests renamed in TLCP
+_TLCP_KEYS: Final[dict[str, str]] = {"LS_table": "LS_subId", "LS_id": "LS_group"}
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool = True) -> bytes:
+    """A final frame, masked as clients must do (servers must not)."""
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, length)
+
+    if not mask:
+        return header + payload
+
+    key = os.urandom(4)
+    return header + key + _apply_mask(key, payload)
+
+
+def read_frame(read: Callable[[int], bytes]) -> Tuple[bool, int, bytes]:
+    """Read a frame with `read(n)`, returns (fin, opcode, payload).
+
+    Raises:
+        TransientError: connection closed in the middle of a frame.
+    """
+
+    def read_exact(size: int) -> bytes:
+        data = read(size)
+        if len(data) < size:
+            raise TransientError("WebSocket connection closed")
+        return data
+
+    first, second = read_exact(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", read_exact(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", read_exact(8))
+
+    key = read_exact(4) if second & 0x80 else None
+    payload = read_exact(length) if length else b""
+    if key is not None:
+        payload = _apply_mask(key, payload)
+
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+def _apply_mask(key: bytes, payload: bytes) -> bytes:
+    """XOR payload with the repeated 4 bytes key, as one big integer."""
+    length = len(payload)
+    if not length:
+        return payload
+    repeated = (key * (length // 4 + 1))[:length]
+    masked = int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")
+    return masked.to_bytes(length, "big")
+
+
+def accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept answering a Sec-WebSocket-Key."""
+    digest = hashlib.sha1(key.encode("ascii") + _WS_GUID).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+class WebSocket:
+    """Minimal client side WebSocket (RFC 6455), text messages only.
+
+    Messages may be sent from any thread. Pings are answered while
+    receiving.
+    """
+
+    def __init__(self, url: str, protocol: str, timeout: float | None = None):
+        """Connect and open the WebSocket.
+
+        Args:
+            url: ``ws://`` or ``wss://`` url.
+            protocol: subprotocol requested, the server must accept it.
+            timeout: socket timeout, in seconds.
+
+        Raises:
+            TransientError: the server refused the WebSocket.
+        """
+        parsed = urllib.parse.urlsplit(url)
+        secure = parsed.scheme == "wss"
+        port = parsed.port or (443 if secure else 80)
+
+        sock = socket.create_connection((parsed.hostname, port), timeout)
+        if secure:
+            context = ssl.create_default_context()
+            sock = context.wrap_socket(sock, server_hostname=parsed.hostname)
+
+        self._sock = sock
+        self._file = sock.makefile("rb")
+        self._send_lock = threading.Lock()
+        self.closed = False
+
+        try:
+            self._handshake(parsed, protocol)
+        except BaseException:
+            self._sock.close()
+            raise
+
+    def _handshake(self, parsed: urllib.parse.SplitResult, protocol: str) -> None:
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        request = (
+            f"GET {parsed.path or '/'} HTTP/1.1\r\n"
+            f"Host: {parsed.netloc}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n"
+            f"Sec-WebSocket-Protocol: {protocol}\r\n"
+            "\r\n"
+        )
+        self._sock.sendall(request.encode("ascii"))
+
+        status = self._file.readline().decode("latin-1")
+        headers = {}
+        while True:
+            line = self._file.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if status.split(" ", 2)[1:2] != ["101"]:
+            raise TransientError("WebSocket refused: %s" % status.strip())
+        if headers.get("sec-websocket-accept") != accept_key(key):
+            raise TransientError("WebSocket refused: bad Sec-WebSocket-Accept")
+        if headers.get("sec-websocket-protocol") != protocol:
+            raise TransientError("WebSocket refused: %s not accepted" % protocol)
+
+    def settimeout(self, timeout: float | None) -> None:
+        self._sock.settimeout(timeout)
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        frame = encode_frame(opcode, payload)
+        with self._send_lock:
+            self._sock.sendall(frame)
+
+    def send(self, message: str) -> None:
+        """Send a text message."""
+        self._send_frame(OPCODE_TEXT, message.encode("utf-8"))
+
+    def recv(self) -> str | None:
+        """Next text message, None once the server closed the WebSocket."""
+        fragments: List[bytes] = []
+
+        while not self.closed:
+            fin, opcode, payload = read_frame(self._file.read)
+
+            if opcode == OPCODE_PING:
+                self._send_frame(OPCODE_PONG, payload)
+            elif opcode == OPCODE_PONG:
+                pass
+            elif opcode == OPCODE_CLOSE:
+                self.close(payload[:2])
+            else:  # text, binary or continuation of one of them
+                fragments.append(payload)
+                if fin:
+                    return b"".join(fragments).decode("utf-8")
+
+        return None
+
+    def close(self, status: bytes = struct.pack("!H", 1000)) -> None:
+        """Close the WebSocket, then the connection."""
+        if self.closed:
+            return
+        self.closed = True
+
+        try:
+            self._send_frame(OPCODE_CLOSE, status)
+        except OSError:
+            pass  # connection already lost
+        finally:
+            self._file.close()
+            self._sock.close()
+
+
+class TlcpRowDecoder(RowDecoder):
+    """Decode update rows encoded by TLCP.
+
+    Rules differ from the HTTP text protocol:
+    1. Literal '$' is the empty string, '#' is null (None).
+    2. Literal '' indicates unchanged since previous update.
+    3. '^N' indicates that the N next fields are unchanged.
+    4. Other values are percent-encoded, '$' and '#' included.
+    """
+
+    def decode(self, item_id, fields):
+        row = self._rows.get(item_id)
+        if row is None:
+            row = self._rows[item_id] = [None] * self.field_count
+
+        index = 0
+        for field in fields:
+            if not field:
+                index += 1
+                continue  # unchanged
+            if field[0] == "^":
+                index += int(field[1:])
+                continue  # several unchanged
+            if index >= len(row):
+                row.extend([None] * (index + 1 - len(row)))
+
+            if field == "$":
+                row[index] = ""
+            elif field == "#":
+                row[index] = None
+            elif "%" in field:
+                row[index] = urllib.parse.unquote(field)
+            else:
+                row[index] = field
+            index += 1
+
+        return row[:]
+
+
+def encode_params(dct: dict) -> str:
+    """Percent-encode the parameters of a TLCP request, skipping None values.
+    Booleans are sent as true or false."""
+    return urllib.parse.urlencode(
+        [
+            (key, str(value).lower() if isinstance(value, bool) else value)
+            for key, value in dct.items()
+            if value is not None
+        ],
+        quote_via=urllib.parse.quote,
+    )
+
+
+def websocket_url(base_url: str) -> str:
+    """Url of the WebSocket of a Lightstreamer server."""
+    parsed = urllib.parse.urlsplit(base_url)
+    scheme = "wss" if parsed.scheme == "https" else "ws"
+    path = parsed.path.rstrip("/") or "/lightstreamer"
+    return urllib.parse.urlunsplit((scheme, parsed.netloc, path, "", ""))
+
+
+def proxy_for(base_url: str, proxies: Dict[str, str] | None) -> str | None:
+    """Proxy ``requests`` goes through to reach base_url, None if direct.
+
+    Args:
+        base_url: url of the Lightstreamer server.
+        proxies: proxies by scheme, as given to ``requests``, an empty
+            one means none. The environment sets schemes not given.
+    """
+    merged = dict(proxies or {})
+    for key, value in requests.utils.get_environ_proxies(base_url).items():
+        merged.setdefault(key, value)  # as requests.Session does
+
+    return requests.utils.select_proxy(base_url, merged) or None
+
+
+class WsLsClient(LsClient):
+    """:any:`LsClient` sending and receiving everything over one WebSocket.
+
+    Used like ``LsClient``. When the server asks to rebind (LOOP) or the
+    connection is lost, a new WebSocket is bound to the same session.
+    Silent tables don't exist in TLCP, they are started at once. The
+    WebSocket connects directly, see :func:`proxy_for` to check first.
+    """
+
+    row_decoder = TlcpRowDecoder
+
+    def __init__(self, base_url, *args, **kwargs):
+        super(WsLsClient, self).__init__(base_url, *args, **kwargs)
+        self.log = logging.getLogger("lightstreamer.WsLsClient")
+        self._ws = None
+        self._req_id = 0
+
+    def _open(self, verb, params):
+        """Open a WebSocket and create or bind a session with it, store the
+        session infos sent in CONOK."""
+        ws = WebSocket(
+            websocket_url(self.base_url), TLCP_PROTOCOL, self._get_request_timeout()
+        )
+        try:
+            ws.send("wsok")
+            ws.send("%s\r\n%s" % (verb, encode_params(params)))
+
+            while True:
+                message = ws.recv()
+                if message is None:
+                    raise TransientError("WebSocket closed during %s" % verb)
+
+                for line in message.split("\r\n"):
+                    if line.startswith("CONOK"):
+                        _, session_id, limit, keepalive, control = line.split(",")
+                        self._session.update(
+                            SessionId=session_id,
+                            RequestLimit=limit,
+                            KeepaliveMillis=keepalive,
+                            ControlAddress=control,
+                        )
+                        ws.settimeout(self._get_request_timeout())
+                        return ws
+                    if line.startswith("CONERR"):
+                        _, code, msg = line.split(",", 2)
+                        if verb == "bind_session":
+                            raise SessionExpired("%s: %s" % (code, msg))
+                        raise TransientError(
+                            "%s: %s" % (code, urllib.parse.unquote(msg))
+                        )
+        except BaseException:
+            ws.close()
+            raise
+
+    def _create_session_impl(self, dct):
+        """Worker for create_session()."""
+        assert self._state == STATE_DISCONNECTED
+        self._set_state(STATE_CONNECTING)
+
+        params = {
+            "LS_cid": LS_CID,
+            "LS_user": dct["LS_user"],
+            "LS_password": dct["LS_password"],
+            "LS_requested_max_bandwidth": dct["LS_requested_max_bandwidth"],
+            "LS_keepalive_millis": dct["LS_keepalive_millis"],
+        }
+
+        try:
+            self._ws = self._open("create_session", params)
+        except Exception:
+            self._set_state(STATE_DISCONNECTED)
+            raise
+
+        for table in self._table_map.values():
+            self._enqueue_table_create(table)
+        self._thread = threading.Thread(target=self._recv_main)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _do_recv(self):
+        """Read the WebSocket and dispatch messages until the server tells us
+        to stop or an error occurs. Bind a new WebSocket if needed."""
+        if self._ws is None:
+            self.log.debug("Attempting to connect..")
+            self._set_state(STATE_CONNECTING)
+            self._ws = self._open(
+                "bind_session", {"LS_session": self._session["SessionId"]}
+            )
+
+        self._set_state(STATE_CONNECTED)
+        self._work_queue.push(self._send_control_impl)  # sent while unbound
+
+        try:
+            while True:
+                message = self._ws.recv()
+                if message is None:
+                    raise TransientError("WebSocket closed by server")
+
+                for line in message.split("\r\n"):
+                    status = self._recv_line(line)
+                    if status == self.R_END:
+                        return False
+                    elif status == self.R_RECONNECT:
+                        return True
+        finally:
+            self._ws.close()
+            self._ws = None
+
+    def _recv_line(self, line):
+        """Parse a TLCP line and act accordingly, see LsClient._recv_line."""
+        if not line:
+            return self.R_OK
+        self.on_heartbeat.fire()
+
+        kind, _, args = line.partition(",")
+
+        if kind == "U":
+            self._dispatch_update(args)
+        elif kind == "EOS":
+            table_id, item_id = args.split(",")
+            self._dispatch_table(int(table_id), int(item_id), "EOS")
+        elif kind == "LOOP":
+            self.log.debug("Server asked to rebind; reconnecting.")
+            return self.R_RECONNECT
+        elif kind == "END":
+            code, _, msg = args.partition(",")
+            cause = CAUSE_MAP.get(code, urllib.parse.unquote(msg))
+            self.log.info("Session permanently closed; cause: %r", cause)
+            return self.R_END
+        elif kind == "REQERR" or kind == "ERROR":
+            self.log.error("Request failed: %s", urllib.parse.unquote(line))
+        elif kind == "PROBE":
+            self.log.debug("Received server probe.")
+        # REQOK, SUBOK, UNSUB, SYNC, CONS, SERVNAME, CLIENTIP, NOOP...: nothing to do
+
+        return self.R_OK
+
+    def _dispatch_update(self, args):
+        """Dispatch the fields of a "U,<table>,<item>,<fields>" line."""
+        table_id, item_id, fields = args.split(",", 2)
+        self._dispatch_table(int(table_id), int(item_id), fields.split("|"))
+
+    def _dispatch_table(self, table_id, item_id, item):
+        table = self._table_map.get(table_id)
+        if not table:
+            self.log.debug("Unknown table %r; dropping row", table_id)
+            return
+        run_and_log(table._dispatch_update, item_id, item)
+
+    def _tlcp_request(self, op):
+        """Encode a control request built for the HTTP protocol in TLCP,
+        None if there is nothing to send."""
+        if op.get("LS_op") == OP_START:
+            return None  # table already started
+        if op.get("LS_op") == OP_ADD_SILENT:
+            op = dict(op, LS_op=OP_ADD)
+
+        self._req_id += 1
+        request = {"LS_reqId": self._req_id}
+        for key, value in op.items():
+            request[_TLCP_KEYS.get(key, key)] = value
+        return encode_params(request)
+
+    def _send_control_impl(self):
+        """Worker function for send_control(), requests are sent on the
+        WebSocket. Kept in queue while no WebSocket is bound."""
+        ws = self._ws
+        if ws is None or not self._control_queue:
+            return
+
+        limit = int(self._session.get("RequestLimit", "50000"))
+        bits = []
+        size = 0
+        with self._lock:
+            while self._control_queue:
+                op = self._control_queue[0]
+                op["LS_session"] = self._session["SessionId"]
+                encoded = self._tlcp_request(op)
+                if encoded is not None:
+                    if bits and (size + len(encoded) + 2) > limit:
+                        break
+                    bits.append(encoded)
+                    size += len(encoded) + 2
+                self._control_queue.popleft()
+
+        if bits:
+            ws.send("control\r\n" + "\r\n".join(bits))
+            self.log.debug("Control message sent.")
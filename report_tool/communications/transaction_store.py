@@ -0,0 +1,242 @@
+"""On-disk store of the transactions received from IG.
+
+Transactions are kept per account with the range of days already
+synchronized, so only the missing days are requested again.
+"""
+
+import datetime
+import json
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Final, Iterable, Iterator, List
+
+from report_tool.communications.history_fetcher import (
+    ONE_DAY,
+    DateWindow,
+    fetch_history,
+    parse_date_range,
+)
+from report_tool.communications.ig_rest_api import APIError
+from report_tool.utils.constants import get_database_file
+
+_SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS transactions (
+    account_id TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    reference TEXT NOT NULL,
+    date_utc TEXT,
+    raw TEXT NOT NULL,
+    PRIMARY KEY (account_id, trade_date, position)
+);
+CREATE INDEX IF NOT EXISTS transactions_reference
+    ON transactions (account_id, reference);
+CREATE TABLE IF NOT EXISTS sync_state (
+    account_id TEXT PRIMARY KEY,
+    low TEXT NOT NULL,
+    high TEXT NOT NULL
+);
+"""
+
+
+def trade_date(transaction: Dict[str, Any]) -> datetime.date:
+    """Day of a transaction. IG sends it as ``dd/mm/yy``."""
+    return datetime.datetime.strptime(transaction["date"], "%d/%m/%y").date()
+
+
+class TransactionStore:
+    """SQLite store of raw IG transactions, keyed by account and reference.
+
+    For each account, the days from ``low`` to ``high`` (included) are
+    synchronized. The last synchronized day is always requested again,
+    as it may have been synchronized before it ended.
+    """
+
+    def __init__(self, path: Path | None = None):
+        """
+        Args:
+            path: database file, defaults to ``get_database_file()``.
+        """
+        self._path = path or get_database_file()
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> closing:
+        return closing(sqlite3.connect(self._path))
+
+    def coverage(self, account_id: str) -> DateWindow | None:
+        """Days already synchronized for the account, if any."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT low, high FROM sync_state WHERE account_id = ?",
+                (account_id,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return datetime.date.fromisoformat(row[0]), datetime.date.fromisoformat(row[1])
+
+    def missing_windows(
+        self, account_id: str, start: datetime.date, end: datetime.date
+    ) -> List[DateWindow]:
+        """Windows to request so that ``start`` to ``end`` is synchronized.
+
+        Windows are contiguous with the days already synchronized, so the
+        synchronized days always form a single range.
+        """
+        coverage = self.coverage(account_id)
+
+        if coverage is None:
+            return [(start, end)]
+
+        low, high = coverage
+        windows = []
+
+        if end >= high:
+            windows.append((high, end))
+
+        if start < low:
+            windows.append((start, low - ONE_DAY))
+
+        return windows
+
+    def merge(
+        self,
+        account_id: str,
+        start: datetime.date,
+        end: datetime.date,
+        transactions: Iterable[Dict[str, Any]],
+    ) -> None:
+        """Replace stored transactions of a window with the ones received.
+
+        Transactions dated outside of the window are dropped: their day
+        is not replaced, so they would overwrite unrelated rows stored.
+
+        Args:
+            account_id: account transactions belong to.
+            start: first day of the window requested.
+            end: last day of the window requested.
+            transactions: transactions received, in IG order (newer first).
+        """
+        rows = []
+        positions: Dict[str, int] = {}
+
+        for transaction in transactions:
+            day = trade_date(transaction)
+
+            if not start <= day <= end:
+                continue
+
+            day_key = day.isoformat()
+            position = positions.get(day_key, 0)
+            positions[day_key] = position + 1
+
+            rows.append(
+                (
+                    account_id,
+                    day_key,
+                    position,
+                    transaction["reference"],
+                    transaction.get("dateUtc"),
+                    json.dumps(transaction),
+                )
+            )
+
+        # a day after today can't be synchronized yet
+        synced_end = min(end, datetime.date.today())
+
+        with self._lock, self._connect() as conn, conn:
+            conn.execute(
+                "DELETE FROM transactions"
+                " WHERE account_id = ? AND trade_date BETWEEN ? AND ?",
+                (account_id, start.isoformat(), end.isoformat()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+            if synced_end < start:
+                return
+
+            coverage = conn.execute(
+                "SELECT low, high FROM sync_state WHERE account_id = ?",
+                (account_id,),
+            ).fetchone()
+
+            low, high = start.isoformat(), synced_end.isoformat()
+            if coverage is not None:
+                low, high = min(low, coverage[0]), max(high, coverage[1])
+
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                (account_id, low, high),
+            )
+
+    def load(
+        self, account_id: str, start: datetime.date, end: datetime.date
+    ) -> List[Dict[str, Any]]:
+        """Transactions of the account from ``start`` to ``end``, newer first."""
+        return list(self.iter_load(account_id, start, end))
+
+    def iter_load(
+        self, account_id: str, start: datetime.date, end: datetime.date
+    ) -> Iterator[Dict[str, Any]]:
+        """Same as :meth:`load`, rows are decoded while they are read."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT raw FROM transactions"
+                " WHERE account_id = ? AND trade_date BETWEEN ? AND ?"
+                " ORDER BY trade_date DESC, position",
+                (account_id, start.isoformat(), end.isoformat()),
+            )
+
+            for (raw,) in rows:
+                yield json.loads(raw)
+
+    def clear(self, account_id: str | None = None) -> None:
+        """Forget transactions of an account, or of every account."""
+        with self._lock, self._connect() as conn, conn:
+            if account_id is None:
+                conn.execute("DELETE FROM transactions")
+                conn.execute("DELETE FROM sync_state")
+            else:
+                conn.execute(
+                    "DELETE FROM transactions WHERE account_id = ?", (account_id,)
+                )
+                conn.execute(
+                    "DELETE FROM sync_state WHERE account_id = ?", (account_id,)
+                )
+
+
+def sync_transactions(session, store: TransactionStore, date_range: str, progress=None):
+    """
+    Request the days of date_range missing in store, merge them
+    and return every transaction of date_range like
+    ``IGAPI.get_transactions`` does. Returns an APIError if a
+    request failed, days already merged are kept. Windows received
+    are merged as they are read, transactions returned are read
+    from the store while they are iterated over
+
+    :param session: :any:`IGAPI` instance
+    :param store: TransactionStore
+    :param date_range: string formatted like /dd-MM-yyyy/dd-MM-yyyy
+    :param progress: see :any:`fetch_history`
+    """
+
+    account_id = session._get_account_id()
+    start, end = parse_date_range(date_range)
+
+    for window_start, window_end in store.missing_windows(account_id, start, end):
+        result = fetch_history(session, window_start, window_end, progress)
+
+        if type(result) == APIError:
+            return result
+
+        store.merge(account_id, window_start, window_end, result["transactions"])
+
+    return {"transactions": store.iter_load(account_id, start, end)}
@@ -6,13 +6,14 @@ from decimal import Decimal
 from pathlib import Path
 from typing import Final, Iterable, Literal, TypeVar, cast, overload
 
-from PyQt5.QtWidgets import QTableWidget
+from PyQt5.QtCore import QAbstractItemModel
 
 from report_tool.exports.formats import (
     AccountInfo,
     DataToExport,
     ExportableSummary,
     ExportableTransaction,
+    Summary,
     Transaction,
 )
 from report_tool.utils.constants import get_export_dir
@@ -48,6 +49,14 @@ class ExportToExcel:
         self._data_to_export: DataToExport = data
         self.config: dict = read_config()
 
+    def update_summary(self, summary: Summary) -> None:
+        """Replace the summary to export, e.g. when a deal is folded in.
+
+        Args:
+            summary: summary formatted for the dock.
+        """
+        self._data_to_export["summary"] = summary
+
     @staticmethod
     @overload
     def clean_value(value: str) -> str:
@@ -97,7 +106,7 @@ class ExportToExcel:
         # construct fixed file name
         return f"report tool_{acc_type}_{acc_name}_{what_to_export}_from {dates[0]:%Y-%m-%d} to {dates[-1]:%Y-%m-%d}.txt"
 
-    def export(self, widget_pos: QTableWidget) -> None:
+    def export(self, model: QAbstractItemModel) -> None:
         """Export data to file."""
         config = self.config
         what_to_export: Literal["all", "transactions", "summary"] = config[
@@ -118,7 +127,7 @@ class ExportToExcel:
         if what_to_export in ["all", "transactions"]:
             transactions: list[
                 ExportableTransaction
-            ] = self._get_exportable_transactions(widget_pos)
+            ] = self._get_exportable_transactions(model)
             self.write_comment_transactions(filepath, transactions=transactions)
             self.write_transactions(filepath, transactions, sep=config["separator"])
 
@@ -130,20 +139,14 @@ class ExportToExcel:
             self.write_summary(filepath, summary, sep=config["separator"])
 
     def _get_exportable_transactions(
-        self, widget_pos: QTableWidget
+        self, model: QAbstractItemModel
     ) -> list[ExportableTransaction]:
-        """Get exportable transactions from widget."""
-        nb_row: int = widget_pos.rowCount()
-        nb_col: int = widget_pos.columnCount()
+        """Get exportable transactions, as shown in the transactions table."""
+        nb_row: int = model.rowCount()
+        nb_col: int = model.columnCount()
 
         return [
-            ExportableTransaction(
-                *[
-                    cell.text()
-                    for j in range(nb_col)
-                    if (cell := widget_pos.item(i, j)) is not None
-                ]
-            )
+            ExportableTransaction(*[model.index(i, j).data() for j in range(nb_col)])
             for i in range(nb_row)
         ]
 
@@ -0,0 +1,79 @@
+import logging
+import traceback
+from concurrent.futures import Future
+
+from PyQt5 import QtCore
+
+
+class AsyncCaller(QtCore.QObject):
+
+    """
+    Deliver results of coroutines run by :any:`AsyncIGAPI` to the
+    gui thread. Must be created in the gui thread: the signal is
+    emitted from the event loop thread and queued to the handler
+    """
+
+    result_ready = QtCore.pyqtSignal(object, object)  # handler, future
+
+    def __init__(self, async_session, parent=None):
+        """
+        :param async_session: :any:`AsyncIGAPI` instance
+        """
+
+        super(AsyncCaller, self).__init__(parent)
+
+        self.async_session = async_session
+        self.result_ready.connect(self.on_result)
+        self.closed = False
+
+        self.logger_debug = logging.getLogger("ReportTool_debug.IGAPI")
+
+    def call(self, coro, result_handler):
+        """
+        Run coro without blocking, result_handler is
+        called in gui thread with the reply of request
+
+        :param coro: coroutine of :any:`AsyncIGAPI`
+        :param result_handler: function taking the reply
+        """
+
+        if self.closed:  # session torn down, nothing is sent
+            coro.close()
+            return None
+
+        future = self.async_session.submit(coro)
+        future.add_done_callback(
+            lambda done: self.result_ready.emit(result_handler, done)
+        )
+
+        return future
+
+    def on_result(self, result_handler, future: Future):
+        """
+        Call result_handler with result of future. Exceptions
+        are logged, IG errors are replied as APIError objects
+
+        :param result_handler: function taking the reply
+        :param future: concurrent.futures.Future, done
+        """
+
+        if self.closed:  # reply to a session torn down
+            return
+
+        try:
+            reply = future.result()
+        except Exception:
+            self.logger_debug.log(logging.ERROR, traceback.format_exc())
+            return
+
+        result_handler(reply)
+
+    def close(self):
+        """
+        Close :any:`AsyncIGAPI` when its session is torn down,
+        without waiting for the requests in flight. Replies not
+        handled yet are dropped and nothing is sent anymore
+        """
+
+        self.closed = True
+        self.async_session.close()
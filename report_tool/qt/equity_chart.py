@@ -4,7 +4,13 @@ import numpy as np
 import pyqtgraph as pg
 from PyQt5 import QtCore, QtGui
 
-from report_tool.qt.graphics_items import CustomLinearRegion, DateAxis
+from report_tool.qt.graphics_items import (
+    AnnotationIndex,
+    CustomCurveArrow,
+    CustomLinearRegion,
+    DateAxis,
+    DecimatedCurveItem,
+)
 
 
 class EquityChart(pg.PlotWidget):
@@ -14,13 +20,17 @@ class EquityChart(pg.PlotWidget):
     Inherits from pyqtgraph plotWidget.
     """
 
+    # comments whose trade is at most this many pixels out
+    # of view are laid out, as their text can be in view
+    COMMENTS_MARGIN = 300
+
     def __init__(self, *args, **kwargs):
         """
         Init function. Inherits from pg.PlotWidget.
         Set a title and axes label, using HTML formatting
         """
 
-        date_axis = DateAxis({}, orientation="bottom")
+        date_axis = DateAxis(orientation="bottom")
 
         pg.PlotWidget.__init__(self, axisItems={"bottom": date_axis}, *args, **kwargs)
 
@@ -46,6 +56,7 @@ class EquityChart(pg.PlotWidget):
 
         self._dict_comments_items = {}
         self._deal_id_plotted = []
+        self._annotations = AnnotationIndex()
 
         # self.getAxis("bottom").setLabel(text=kwargs["x_label"])
         # self.getAxis("left").setLabel(text=kwargs["y_label"])
@@ -83,7 +94,9 @@ class EquityChart(pg.PlotWidget):
         return None, costed me 2 days of debug !!!
         """
 
-        curve = self.plot(x=np.array([]), y=np.array([]), pen=equity_pen)
+        # only the points visible at the zoom level are painted
+        curve = DecimatedCurveItem(x=np.array([]), y=np.array([]), pen=equity_pen)
+        self.addItem(curve)
 
         return curve
 
@@ -466,12 +479,8 @@ class EquityChart(pg.PlotWidget):
         if data_plotted[0] is None or data_plotted[0].size == 0:
             return
 
-        deal_id_plotted = self._get_deal_id_plotted()  # get all deal id plotted
-
-        try:
-            point_x = deal_id_plotted.index(deal_id)
-            point_y = data_plotted[1][point_x]
-        except ValueError as VE:
+        point_x = self._annotations.position(deal_id)
+        if point_x is None:  # trade not plotted
             return
 
         # get comments items (arrow and textitem) already set
@@ -488,7 +497,7 @@ class EquityChart(pg.PlotWidget):
         # create a new text item
         if deal_id not in comments_items and text != "":
             # create and configure a arrow item
-            arrow = classCustomGraphicsItems.CustomCurveArrow(curve)
+            arrow = CustomCurveArrow(curve)
             head_len = 25
             tail_len = 60
 
@@ -505,19 +514,7 @@ class EquityChart(pg.PlotWidget):
             arrow.setIndex(point_x)
 
             angle = arrow._get_angle()  # get rotation angle
-            anchor = (0, 0)
-
-            # depending of angle set different anchor
-            if 180 < angle <= 225:
-                anchor = (1, 0.5)
-            if 225 < angle < 270:
-                anchor = (1, 1)
-            if 270 < angle <= 315:
-                anchor = (0, 1)
-            if 315 < angle < 360:
-                anchor = (0, 0.5)
-            if angle == 270 or angle == 90:
-                anchor = (0.5, 1)
+            anchor = self._get_text_anchor(angle)
 
             # create a pg.TextItem
             text_item = pg.TextItem(
@@ -530,6 +527,7 @@ class EquityChart(pg.PlotWidget):
             comments_items.setdefault(deal_id, {})
             comments_items[deal_id]["text_item"] = text_item
             comments_items[deal_id]["arrow"] = arrow
+            self._annotations.add(deal_id)
 
             self._set_comments_items(comments_items)
             self.addItem(arrow)
@@ -573,6 +571,7 @@ class EquityChart(pg.PlotWidget):
                 self.removeItem(arrow)
 
                 comments_items.pop(deal_id, None)  # delete key
+                self._annotations.discard(deal_id)
                 self._set_comments_items(comments_items)  # update dict_comments_items
 
             except KeyError:
@@ -600,7 +599,6 @@ class EquityChart(pg.PlotWidget):
 
         data_plotted = curve.getData()
         comments_items = self._get_comments_items()
-        deal_id_plotted = self._get_deal_id_plotted()
 
         try:  # when user edits a comment
             text = kwargs["text"]
@@ -630,77 +628,110 @@ class EquityChart(pg.PlotWidget):
 
         comments_items = self._get_comments_items()
 
-        # iterate over all comment set
-        for count, deal_id in enumerate(comments_items.keys()):
-            try:
-                idx = deal_id_plotted.index(deal_id)
+        if data_plotted[0] is None or not comments_items:
+            return
 
-            except ValueError as VE:  # means no comment for this deal id
-                continue
+        view_box = self.plotItem.vb
 
-            arrow = comments_items[deal_id]["arrow"]  # get arrow item
-            text_item = comments_items[deal_id]["text_item"]  # get text item
+        if "deal_id" in kwargs:  # only this comment has changed
+            deal_id = kwargs["deal_id"]
+            point_x = self._annotations.position(deal_id)
+            if deal_id not in comments_items or point_x is None:
+                return
 
-            """
-            udpdate arrow pos, trigger event() method and so calculate a
-            new angle see classCustomGraphicsItems arrow.setIndex(idx)
-            """
+            idx, deal_ids = np.array([point_x]), [deal_id]
 
-            arrow.curve = weakref.ref(curve)  # update curve associate to arrow
-            arrow.setIndex(idx)  # udpdate arrow pos
+        else:  # only comments around the visible range are laid out
+            (x_min, x_max) = view_box.viewRange()[0]
+            margin = self.COMMENTS_MARGIN * (x_max - x_min)
+            margin /= max(view_box.width(), 1)
 
-            point_x = arrow.property("pos").toPointF().x()
-            point_y = arrow.property("pos").toPointF().y()
+            idx, deal_ids = self._annotations.in_range(x_min - margin, x_max + margin)
 
-            angle = arrow._get_angle()  # get rotation angle
-            anchor = (0, 0)
-
-            # depending of angle set different anchor
-            if 180 < angle <= 225:
-                anchor = (1, 0.5)
-            if 225 < angle < 270:
-                anchor = (1, 1)
-            if 270 < angle <= 315:
-                anchor = (0, 1)
-            if 315 < angle < 360:
-                anchor = (0, 0.5)
-            if angle == 270 or angle == 90:
-                anchor = (0.5, 1)
-
-            head_len = arrow.arrow.opts["headLen"]  # get dimensions of head arrow
-            tail_len = arrow.arrow.opts["tailLen"]  # get dimensions of tail arrow
-            text_item.anchor = QtCore.QPointF(
-                anchor[0], anchor[1]
-            )  # update text anchor
+        # overview plot shares the items of equity plot, but can't lay them out
+        (x_data, y_data) = data_plotted
+        keep = (idx < len(x_data)) & np.array(
+            [comments_items[d]["arrow"].scene() is self.scene() for d in deal_ids],
+            dtype=bool,
+        )
+        idx, deal_ids = idx[keep], [d for d, ok in zip(deal_ids, keep) if ok]
 
-            """
-            calculate the width and height of the rect containing the arrow.
-            a call to the boundingRect() method does  not give expected results ???
-            """
+        if not len(idx):
+            return
+
+        """
+        Lay out all comments at once. Trades and their neighbours
+        are mapped to scene with the same transform, the angle of
+        each arrow is the one of the curve's tangent at its trade.
+        Same computation as CustomCurvePoint.event(), vectorized
+        """
 
-            arrow_width = np.cos((angle * np.pi) / 180) * (head_len + tail_len)
-            arrow_height = np.sin((angle * np.pi) / 180) * (head_len + tail_len)
+        transform = view_box.childGroup.sceneTransform()
 
-            # get scene coordinates of point trade selected
-            text_scene_coord = self.plotItem.vb.mapViewToScene(
-                QtCore.QPointF(point_x, point_y)
+        def to_scene(x, y):
+            return (
+                transform.m11() * x + transform.m21() * y + transform.dx(),
+                transform.m12() * x + transform.m22() * y + transform.dy(),
             )
 
-            # add the width of arrow to x coordinates
-            text_pos_x = text_scene_coord.x() + arrow_width
+        prev_idx = np.clip(idx - 1, 0, len(x_data) - 1)
+        next_idx = np.clip(idx + 1, 0, len(x_data) - 1)
+
+        (prev_x, prev_y) = to_scene(x_data[prev_idx], y_data[prev_idx])
+        (next_x, next_y) = to_scene(x_data[next_idx], y_data[next_idx])
+        rads = np.arctan2(next_y - prev_y, next_x - prev_x)
+        angles = (180 + rads * 180 / np.pi) + 90  # see CustomCurvePoint
+
+        # text is at the start point of the arrow
+        arrows_len = np.array(
+            [
+                comments_items[deal_id]["arrow"].arrow.opts["headLen"]
+                + comments_items[deal_id]["arrow"].arrow.opts["tailLen"]
+                for deal_id in deal_ids
+            ]
+        )
 
-            # add the height of arrow to y coordinates
-            text_pos_y = text_scene_coord.y() + arrow_height
+        (point_x, point_y) = to_scene(x_data[idx], y_data[idx])
+        text_x = point_x + np.cos(angles * np.pi / 180) * arrows_len
+        text_y = point_y + np.sin(angles * np.pi / 180) * arrows_len
 
-            # get view coordinates of the start point of the arrow
-            text_view_coord = self.plotItem.vb.mapSceneToView(
-                QtCore.QPointF(text_pos_x, text_pos_y)
-            )
+        (inverted, _) = transform.inverted()
+        text_view_x = inverted.m11() * text_x + inverted.m21() * text_y + inverted.dx()
+        text_view_y = inverted.m12() * text_x + inverted.m22() * text_y + inverted.dy()
 
-            # set position of text at the start point of the arrow
-            text_item.setPos(text_view_coord.x(), text_view_coord.y())
+        for i, deal_id in enumerate(deal_ids):
+            arrow = comments_items[deal_id]["arrow"]  # get arrow item
+            text_item = comments_items[deal_id]["text_item"]  # get text item
 
-        self._set_comments_items(comments_items)  # update dict_comments_items
+            arrow.curve = weakref.ref(curve)  # update curve associate to arrow
+            arrow.place((x_data[idx[i]], y_data[idx[i]]), rads[i])
+
+            text_item.setAnchor(self._get_text_anchor(angles[i]))
+            text_item.setPos(text_view_x[i], text_view_y[i])
+
+    def _get_text_anchor(self, angle):
+        """
+        Return anchor of text item, so that text
+        is placed on the side of the arrow's start
+
+        :param angle: float, rotation angle of arrow in degrees
+        """
+
+        anchor = (0, 0)
+
+        # depending of angle set different anchor
+        if 180 < angle <= 225:
+            anchor = (1, 0.5)
+        if 225 < angle < 270:
+            anchor = (1, 1)
+        if 270 < angle <= 315:
+            anchor = (0, 1)
+        if 315 < angle < 360:
+            anchor = (0, 0.5)
+        if angle == 270 or angle == 90:
+            anchor = (0.5, 1)
+
+        return anchor
 
     def _get_comments_items(self):
         """Getter method for dict_comments_items"""
@@ -714,6 +745,12 @@ class EquityChart(pg.PlotWidget):
         :param dict_comments_items: dict with arrow and tex items
         """
 
+        # comments set from another plot, index must be built again
+        if dict_comments_items is not self._dict_comments_items or len(
+            dict_comments_items
+        ) != len(self._annotations):
+            self._annotations.reset(dict_comments_items.keys())
+
         self._dict_comments_items = dict_comments_items
 
     def _get_deal_id_plotted(self):
@@ -728,4 +765,17 @@ class EquityChart(pg.PlotWidget):
         :param deal_id_plotted: list with all deal_id plotted
         """
 
-        self._deal_id_plotted = deal_id_plotted
+        # own copy, deals are appended to each plot, see append_deal_id
+        self._deal_id_plotted = list(deal_id_plotted)
+        self._annotations.set_deal_ids(deal_id_plotted)
+
+    def append_deal_id(self, deal_id):
+        """
+        Add a deal plotted after the others, e.g. a deal
+        closed after the data were plotted
+
+        :param deal_id: string
+        """
+
+        self._deal_id_plotted.append(deal_id)
+        self._annotations.append_deal_id(deal_id, len(self._deal_id_plotted) - 1)
@@ -6,14 +6,14 @@ import logging.config
 import math
 import re
 from copy import deepcopy
+from functools import lru_cache
 
 from PyQt5 import QtCore, QtGui
 
 from report_tool.utils.constants import (
     EMPTY_ACCOUNT,
-    get_comments_file,
     get_credentials_file,
-    get_root_project_dir,
+    get_ig_config_file,
 )
 from report_tool.utils.json_utils import RoundTripDecoder, RoundTripEncoder
 
@@ -48,11 +48,13 @@ def create_graph_args(title="", x_label="", y_label="", *args, **kwargs):
     return graph_options
 
 
+@lru_cache(maxsize=1024)
 def format_market_name(market_name, *args, **kwargs):
     """
     Format market names received to a cleaner one as market
     can be e.g DAX au comptant (converted at xxx) It is use
-    to have the same market name as the conversion rate changes
+    to have the same market name as the conversion rate changes.
+    Results are cached, an account trades few markets
 
     :param market_name: string, raw name received from IG
     """
@@ -66,7 +68,7 @@ def format_market_name(market_name, *args, **kwargs):
 
 def read_ig_config(*args, **kwargs):
     """Read ig_config.json file"""
-    return json.loads((get_root_project_dir() / "ig_config.json").read_text())
+    return json.loads(get_ig_config_file().read_text())
 
 
 def read_credentials(*args, **kwargs):
@@ -130,37 +132,6 @@ def write_credentials(credentials):
         json.dump(credentials, f, cls=RoundTripEncoder, indent=4)
 
 
-def read_comment(*args, **kwargs):
-    """Reads comments files"""
-
-    comment_path = get_comments_file()
-
-    with comment_path.open("r") as f:
-        try:
-            saved_comments = json.load(f, cls=RoundTripDecoder)
-
-        # log error and returns empty dict
-        except Exception as e:
-            msg = "No comments saved for this user"
-            logger_debug.log(logging.ERROR, msg)
-            saved_comments = {}
-
-    return saved_comments
-
-
-def write_comments(comments):
-    """
-    Write credentials
-
-    :param coments: dict of comments to saved
-    """
-
-    comment_path = get_comments_file()
-
-    with comment_path.open("w") as f:
-        json.dump(comments, f, cls=RoundTripEncoder)  # write dict (default or not)
-
-
 def create_dates_list(state_dates, dates_string, key, start_capital):
     """
     Create a dict used to update x_axis values and string.
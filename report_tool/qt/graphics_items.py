@@ -1,8 +1,10 @@
 """ This module holds classes to custom pyqtgraph base graphics items"""
 
+import bisect
+
 import numpy as np
 import pyqtgraph as pg
-from PyQt5 import QtCore, QtWidgets
+from PyQt5 import QtCore, QtGui, QtWidgets
 
 
 class CustomLinearRegion(pg.LinearRegionItem):
@@ -34,34 +36,294 @@ class CustomLinearRegion(pg.LinearRegionItem):
             line.setHoverPen(color=hover_color, width=1.5)
 
 
+class AppendableArray(object):
+
+    """
+    1d array with spare room at its end, so that appending a
+    value doesn't copy the values already set. Room is doubled
+    when full, appending is O(1) amortized. view() returns the
+    values set, without copy
+    """
+
+    def __init__(self, values=(), dtype=None):
+        """
+        :param values: array like, initial values, not copied
+                       when already an array of dtype
+        :param dtype: numpy dtype of values, None keeps the one of values
+        """
+
+        self._data = np.asarray(values, dtype=dtype)
+        self._size = len(self._data)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        return self.view()[idx]
+
+    def __setitem__(self, idx, value):
+        self.view()[idx] = value
+
+    def append(self, value):
+        """Append a value at the end"""
+
+        if self._size == len(self._data):
+            data = np.empty(max(2 * self._size, 16), dtype=self._data.dtype)
+            data[: self._size] = self._data
+            self._data = data
+
+        self._data[self._size] = value
+        self._size += 1
+
+    def view(self):
+        """Return the values set, not a copy"""
+
+        return self._data[: self._size]
+
+
+class AxisLabels(object):
+
+    """
+    Strings shown on x axis at sorted x values. Built once
+    when new data are plotted and shared by the axes of the
+    equity and overview plots of a tab. A string is found in
+    O(1) when x values are consecutive integers (idx of trades),
+    else with a binary search
+    """
+
+    TOLERANCE = 1e-6  # tick values are floats, x values are ints
+
+    def __init__(self, xdict):
+        """
+        :param xdict: dict see funcMisc.create_dates_list
+        """
+
+        x_values = np.fromiter(xdict.keys(), dtype=float, count=len(xdict))
+        order = np.argsort(x_values, kind="stable")
+
+        self._x_values = AppendableArray(x_values[order], float)
+        x_strings = np.array([str(xdict[key]) for key in xdict], dtype=object)
+        self.x_strings = x_strings[order].tolist()
+
+        # length of the longest string, to thin labels on axis
+        self.max_chars = max(map(len, self.x_strings), default=0)
+
+        # x values are 0, 1, 2... when trades are plotted, no search needed
+        count = len(self.x_values)
+        self._first = self.x_values[0] if count else 0.0
+        self._consecutive = count > 0 and np.array_equal(
+            self.x_values, self._first + np.arange(count)
+        )
+
+    def __len__(self):
+        return len(self._x_values)
+
+    @property
+    def x_values(self):
+        return self._x_values.view()
+
+    def append(self, x, string):
+        """
+        Add a string after the last x value, e.g. for
+        a deal closed after the data were plotted
+
+        :param x: float, greater than the last x value
+        :param string: string shown at x
+        """
+
+        count = len(self._x_values)
+        if not count:
+            self._first = x
+            self._consecutive = True
+        elif x != self._first + count:
+            self._consecutive = False
+
+        self._x_values.append(x)
+        self.x_strings.append(str(string))
+        self.max_chars = max(self.max_chars, len(self.x_strings[-1]))
+
+    def lookup(self, values):
+        """
+        Return the strings at values, an empty string
+        when a value is not one of x values
+
+        :param values: list of float
+        """
+
+        count = len(self.x_values)
+        values = np.asarray(values, dtype=float)
+
+        if count == 0 or values.size == 0:
+            return [""] * values.size
+
+        if self._consecutive:
+            idx = np.rint(values - self._first)
+            found = (np.abs(values - self._first - idx) < self.TOLERANCE) & (
+                (idx >= 0) & (idx < count)
+            )
+        else:
+            idx = np.searchsorted(self.x_values, values - self.TOLERANCE)
+            idx = np.minimum(idx, count - 1)
+            found = np.abs(self.x_values[idx] - values) < self.TOLERANCE
+
+        return [self.x_strings[int(i)] if ok else "" for i, ok in zip(idx, found)]
+
+
+class AnnotationIndex(object):
+
+    """
+    Index of the comments shown on an equity plot. Holds the
+    idx of each deal plotted, found in O(1), and the idx of
+    commented deals sorted, so that the comments in a x range
+    are found with a binary search. Comments added or removed
+    one by one are inserted in place, the sorted idx are built
+    again only after a reset or new deals plotted
+    """
+
+    def __init__(self):
+        self.positions = {}  # deal_id: idx of trade
+        self._x_values = []  # idx of comments plotted, sorted
+        self._deal_ids = []  # deal_id of comments, same order
+        self._comments = set()  # deal_id of all comments
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._comments)
+
+    def set_deal_ids(self, deal_id_plotted):
+        """
+        :param deal_id_plotted: list with all deal_id plotted
+        """
+
+        self.positions = {}
+        for idx, deal_id in enumerate(deal_id_plotted):
+            self.positions.setdefault(deal_id, idx)  # first, like list.index
+
+        self._dirty = True
+
+    def append_deal_id(self, deal_id, idx):
+        """
+        Add a deal plotted after the others, e.g. a deal
+        closed after the data were plotted
+
+        :param deal_id: string
+        :param idx: int, idx of trade, greater than the others
+        """
+
+        if deal_id in self.positions:
+            return
+
+        self.positions[deal_id] = idx
+
+        # idx is the greatest, its comment goes last
+        if not self._dirty and deal_id in self._comments:
+            self._x_values.append(idx)
+            self._deal_ids.append(deal_id)
+
+    def position(self, deal_id):
+        """Return idx of a deal plotted, None if not plotted"""
+
+        return self.positions.get(deal_id)
+
+    def reset(self, deal_ids):
+        """
+        :param deal_ids: iterable with deal_id of all comments
+        """
+
+        self._comments = set(deal_ids)
+        self._dirty = True
+
+    def add(self, deal_id):
+        """Add a comment"""
+
+        if deal_id in self._comments:
+            return
+
+        self._comments.add(deal_id)
+
+        idx = self.positions.get(deal_id)
+        if not self._dirty and idx is not None:
+            i = bisect.bisect_right(self._x_values, idx)
+            self._x_values.insert(i, idx)
+            self._deal_ids.insert(i, deal_id)
+
+    def discard(self, deal_id):
+        """Remove a comment, if any"""
+
+        if deal_id not in self._comments:
+            return
+
+        self._comments.discard(deal_id)
+
+        idx = self.positions.get(deal_id)
+        if not self._dirty and idx is not None:
+            i = bisect.bisect_left(self._x_values, idx)
+            while self._deal_ids[i] != deal_id:  # deals at the same idx
+                i += 1
+
+            del self._x_values[i]
+            del self._deal_ids[i]
+
+    def in_range(self, x_min, x_max):
+        """
+        Return idx (array) and deal_id (list) of the comments
+        between x_min and x_max, sorted by idx
+
+        :param x_min: float
+        :param x_max: float
+        """
+
+        if self._dirty:
+            found = sorted(
+                (self.positions[deal_id], deal_id)
+                for deal_id in self._comments
+                if deal_id in self.positions
+            )
+
+            self._x_values = [idx for idx, _ in found]
+            self._deal_ids = [deal_id for _, deal_id in found]
+            self._dirty = False
+
+        start = bisect.bisect_left(self._x_values, x_min)
+        stop = bisect.bisect_right(self._x_values, x_max)
+
+        return (
+            np.array(self._x_values[start:stop], dtype=int),
+            self._deal_ids[start:stop],
+        )
+
+
 class DateAxis(pg.AxisItem):
 
     """
     Class to allows displaying date stringon x axis. Found on
     internet not from me.Just added the function update_axis,
     calledwhen new data are plotted(see update_graph in main class)
-    Ticks String can be either # of trades or dates
+    Ticks String can be either # of trades or dates. Labels are
+    thinned so that they don't overlap
     """
 
-    def __init__(self, xdict, *args, **kwargs):
+    LABEL_PADDING = 10  # pixels between two labels
+
+    def __init__(self, labels=None, *args, **kwargs):
         """
-        :param xdict: dict see funcMisc.create_dates_list
+        :param labels: AxisLabels, None if nothing plotted
         """
 
         pg.AxisItem.__init__(self, *args, **kwargs)
 
-        self.x_values = np.asarray(xdict.keys())
-        self.x_strings = list(xdict.values())
+        self.labels = labels if labels is not None else AxisLabels({})
 
-    def update_axis(self, xdict, *args, **kwargs):
+    def update_axis(self, labels, *args, **kwargs):
         """
-        Update x_values and x_strings. called when new data are plotted
-        :param xdict: dict see funcMisc.create_dates_list
+        Update labels. called when new data are plotted
+
+        :param labels: AxisLabels, shared with the other plot of tab
         """
 
-        self.xdict = xdict
-        self.x_values = np.asarray(self.xdict.keys())
-        self.x_strings = list(self.xdict.values())
+        self.labels = labels
+        self.picture = None  # strings must be computed again
+        self.update()
 
         try:
             show_dates = kwargs["show_dates"]  # means equity_plot called function
@@ -77,27 +339,319 @@ class DateAxis(pg.AxisItem):
         except KeyError:  # means overview_plot called function
             self.setLabel(text=None)  # never set label
 
+    def labels_changed(self):
+        """Draw strings again, called when labels were appended"""
+
+        self.picture = None
+        self.update()
+
+    def _label_step(self, spacing):
+        """
+        Return n, so that one tick on n is labelled
+        and labels don't overlap
+
+        :param spacing: float, spacing between ticks in x units
+        """
+
+        view_width = self.range[1] - self.range[0]
+        if view_width <= 0 or spacing <= 0:
+            return 1
+
+        tick_pixels = spacing * self.geometry().width() / view_width
+        if tick_pixels <= 0:
+            return 1
+
+        font = self.style["tickFont"] or self.font()
+        char_width = QtGui.QFontMetrics(font).averageCharWidth()
+        label_pixels = self.labels.max_chars * char_width + self.LABEL_PADDING
+
+        return max(1, int(np.ceil(label_pixels / tick_pixels)))
+
     def tickStrings(self, values, scale, spacing):
         """Reimplement base method"""
 
-        strings = []
+        # vs are the original tick values
+        strings = self.labels.lookup([v * scale for v in values])
+
+        step = self._label_step(spacing)
+        if step > 1:
+            # keep the same ticks labelled while panning
+            strings = [
+                string if round(v / spacing) % step == 0 else ""
+                for v, string in zip(values, strings)
+            ]
+
+        return strings
+
+
+class MinMaxPyramid(object):
+
+    """
+    Min/max decimation of a curve, computed once per dataset.
+    Level k splits the curve in buckets of 2**k points and
+    holds the idx of the lowest and highest point of each
+    bucket. Drawing these two points in x order for each bucket
+    keeps the shape of the curve, its highs and drawdowns are
+    never dropped whatever the zoom
+    """
+
+    def __init__(self, x, y):
+        """
+        :param x: array of sorted x values
+        :param y: array of y values
+        """
+
+        self._x = AppendableArray(x)
+        self._y = AppendableArray(y)
+        y = self._y.view()
+
+        # level 0 (every point) is not stored, level k is at k-1
+        self._levels = []
+
+        imin = imax = np.arange(len(y))
+        while len(imin) > 1:
+            if len(imin) % 2:  # last bucket is paired with itself
+                imin = np.append(imin, imin[-1])
+                imax = np.append(imax, imax[-1])
+
+            left, right = imin[0::2], imin[1::2]
+            imin = np.where(y[left] <= y[right], left, right)
+
+            left, right = imax[0::2], imax[1::2]
+            imax = np.where(y[left] >= y[right], left, right)
 
-        for v in values:
-            # vs is the original tick value
-            vs = v * scale
+            self._levels.append(
+                (AppendableArray(imin, np.intp), AppendableArray(imax, np.intp))
+            )
 
-            # if we have vs in our values, show the string
-            # otherwise show nothing
-            if vs in self.x_values:
-                # Find the string with x_values closest to vs
-                vstr = self.x_strings[np.abs(self.x_values - vs).argmin()]
+    def __len__(self):
+        return len(self._y)
+
+    @property
+    def x(self):
+        return self._x.view()
+
+    @property
+    def y(self):
+        return self._y.view()
+
+    @property
+    def levels(self):
+        """List of (idx of lowest, idx of highest) of each level"""
+
+        return [(imin.view(), imax.view()) for imin, imax in self._levels]
+
+    def append(self, x, y):
+        """
+        Append a point, x not lower than the last one. Only
+        the bucket holding the point is updated on each level,
+        a level is added when the curve outgrows the top one
 
+        :param x: float
+        :param y: float
+        """
+
+        idx = len(self._y)
+        self._x.append(x)
+        self._y.append(y)
+
+        y_values = self._y.view()
+        imin = imax = idx  # lowest and highest of the bucket of idx
+        level = 1
+
+        while len(y_values) > 1 << (level - 1):
+            if level > len(self._levels):
+                self._levels.append(
+                    (AppendableArray(dtype=np.intp), AppendableArray(dtype=np.intp))
+                )
+
+            level_min, level_max = self._levels[level - 1]
+            bucket = idx >> level
+            child = idx >> (level - 1)
+
+            if bucket < len(level_min):  # idx is in the last child of bucket
+                bucket_min, bucket_max = level_min[bucket], level_max[bucket]
+            elif child % 2:  # new bucket, its first child is full
+                bucket_min, bucket_max = self._bucket(level - 1, child - 1)
             else:
-                vstr = ""
+                bucket_min, bucket_max = imin, imax
 
-            strings.append(vstr)
+            # as when built, the first child wins ties
+            if y_values[imin] < y_values[bucket_min]:
+                bucket_min = imin
+            if y_values[imax] > y_values[bucket_max]:
+                bucket_max = imax
 
-        return strings
+            if bucket < len(level_min):
+                level_min[bucket] = bucket_min
+                level_max[bucket] = bucket_max
+            else:
+                level_min.append(bucket_min)
+                level_max.append(bucket_max)
+
+            imin, imax = bucket_min, bucket_max
+            level += 1
+
+    def _bucket(self, level, bucket):
+        """Return idx of lowest and highest point of a bucket"""
+
+        if level == 0:
+            return bucket, bucket
+
+        level_min, level_max = self._levels[level - 1]
+        return level_min[bucket], level_max[bucket]
+
+    def level_for(self, count, pixels):
+        """
+        Return the level with about one bucket per pixel
+
+        :param count: int, number of points in view
+        :param pixels: float, width of view in pixels
+        """
+
+        if pixels <= 0 or count <= pixels:
+            return 0
+
+        level = int(np.ceil(np.log2(count / pixels)))
+        return min(level, len(self._levels))
+
+    def indices(self, x_min, x_max, pixels):
+        """
+        Return idx of the points to draw between x_min
+        and x_max, one point beyond each side so that the
+        curve reaches the edges of the view
+
+        :param x_min: float, left of view
+        :param x_max: float, right of view
+        :param pixels: float, width of view in pixels
+        """
+
+        count = len(self._y)
+        if count == 0:
+            return np.arange(0)
+
+        first = max(np.searchsorted(self.x, x_min, side="left") - 1, 0)
+        last = min(np.searchsorted(self.x, x_max, side="right") + 1, count)
+        if first >= last:
+            return np.arange(0)
+
+        level = self.level_for(last - first, pixels)
+        if level == 0:
+            return np.arange(first, last)
+
+        # buckets are aligned on 0, so they don't change when panning
+        start, stop = first >> level, ((last - 1) >> level) + 1
+        imin, imax = self._levels[level - 1]
+        imin, imax = imin[start:stop], imax[start:stop]
+
+        extremes = np.empty(2 * len(imin), dtype=imin.dtype)
+        extremes[0::2] = np.minimum(imin, imax)
+        extremes[1::2] = np.maximum(imin, imax)
+
+        # bounds of buckets, so the curve starts and ends at its real values
+        bounds_start = [start << level]
+        bounds_stop = [min(stop << level, count) - 1]
+
+        return np.concatenate((bounds_start, extremes, bounds_stop))
+
+
+class DecimatedCurveItem(pg.PlotDataItem):
+
+    """
+    PlotDataItem drawing the level of a MinMaxPyramid that
+    matches the width of the view. getData() still returns all
+    the points set, decimation only applies to what is painted.
+    Data with x not sorted are drawn as is
+    """
+
+    def __init__(self, *args, **kwargs):
+        """See base class for arguments"""
+
+        self._pyramid = None
+        self._lod_key = None  # (first idx, last idx, count) drawn
+
+        pg.PlotDataItem.__init__(self, *args, **kwargs)
+
+    def setData(self, *args, **kwargs):
+        """Reimplement base method, build pyramid of new data"""
+
+        self._pyramid = None
+        self._lod_key = None
+
+        pg.PlotDataItem.setData(self, *args, **kwargs)
+
+        x, y = self.getOriginalDataset()
+        if x is not None and len(x) > 1 and np.all(np.diff(x) >= 0):
+            self._pyramid = MinMaxPyramid(x, y)
+
+        self.update_lod()
+
+    def append(self, x, y):
+        """
+        Append a point, e.g. a deal closed after the data
+        were set. Points set are not copied, the pyramid is
+        updated in O(log n)
+
+        :param x: float, not lower than the last x value
+        :param y: float
+        """
+
+        if self._pyramid is None or x < self._pyramid.x[-1]:
+            x_data, y_data = self.getOriginalDataset()
+            if x_data is None:
+                x_data, y_data = np.array([]), np.array([])
+
+            self.setData(x=np.append(x_data, x), y=np.append(y_data, y))
+            return
+
+        self._pyramid.append(x, y)
+        self._lod_key = None
+
+        # base method, pyramid is already up to date
+        pg.PlotDataItem.setData(self, x=self._pyramid.x, y=self._pyramid.y)
+
+    def clear(self):
+        """Reimplement base method"""
+
+        self._pyramid = None
+        self._lod_key = None
+
+        pg.PlotDataItem.clear(self)
+
+    def updateItems(self, *args, **kwargs):
+        """Reimplement base method, curve is set with all points"""
+
+        pg.PlotDataItem.updateItems(self, *args, **kwargs)
+
+        self._lod_key = None
+        self.update_lod()
+
+    def viewTransformChanged(self):
+        """Reimplement base method, view was zoomed, panned or resized"""
+
+        pg.PlotDataItem.viewTransformChanged(self)
+        self.update_lod()
+
+    def update_lod(self):
+        """Set the points of the curve for the current view"""
+
+        view_box = self.getViewBox()
+        if self._pyramid is None or view_box is None:
+            return
+
+        pixels = view_box.width()
+        (x_min, x_max) = view_box.viewRange()[0]
+
+        idx = self._pyramid.indices(x_min, x_max, pixels)
+        if not len(idx):
+            return
+
+        key = (idx[0], idx[-1], len(idx))
+        if key == self._lod_key:
+            return
+
+        self._lod_key = key
+        self.curve.setData(x=self._pyramid.x[idx], y=self._pyramid.y[idx])
 
 
 class CustomCurvePoint(pg.CurvePoint):
@@ -170,16 +724,27 @@ class CustomCurvePoint(pg.CurvePoint):
         p2 = self.parentItem().mapToScene(QtCore.QPointF(x[i2], y[i2]))
         ang = np.arctan2(p2.y() - p1.y(), p2.x() - p1.x())  # returns radians
 
+        self.place(newPos, ang)
+
+        return True
+
+    def place(self, pos, ang):
+        """
+        Move the point and rotate it. Lets EquityChart lay
+        out many arrows at once, without an event for each
+
+        :param pos: tuple (x, y) in view coordinates
+        :param ang: float, angle of curve's tangent in radians
+        """
+
         self._set_angle(ang)  # set angle
         self.resetTransform()
 
         if self._rotate:
             # set angle perpendicular to the curve"s tangent
-            self.rotate((180 + ang * 180 / np.pi) + 90)
-
-        QtWidgets.QGraphicsItem.setPos(self, *newPos)
+            self.setRotation(self._angle)
 
-        return True
+        QtWidgets.QGraphicsItem.setPos(self, *pos)
 
     def _get_angle(self):
         """Getter method"""
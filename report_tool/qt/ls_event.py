@@ -1,3 +1,6 @@
+import threading
+import time
+
 from PyQt5 import QtCore
 
 
@@ -47,3 +50,108 @@ class LsEvent(QtCore.QObject):
         """
 
         self.pos_signal.emit(myUpdateField)
+
+
+class CoalescingDispatcher(QtCore.QObject):
+
+    """
+    Sit between a LS table and the gui: keep only the latest
+    update of each item and deliver them at most max_rate
+    times per second. Must be created in the gui thread, LS
+    calls on_update from its own thread.
+
+    Counters: received updates, merged ones (replaced by a
+    newer update before delivery), dropped ones (same fields
+    as the last delivered, so nothing to redraw) and delivered
+    """
+
+    update_ready = QtCore.pyqtSignal(object)  # fields of an item
+    _wake = QtCore.pyqtSignal()  # first pending update, queued to gui thread
+
+    def __init__(self, max_rate, parent=None):
+        """
+        :param max_rate: float, max deliveries per second, 0 for no limit
+        """
+
+        super(CoalescingDispatcher, self).__init__(parent)
+
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+
+        self._lock = threading.Lock()
+        self._pending = {}  # item -> latest fields not delivered yet
+        self._scheduled = False
+        self._last_delivered = {}
+        self._last_flush = 0.0
+
+        self.received = 0
+        self.merged = 0
+        self.dropped = 0
+        self.delivered = 0
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self._wake.connect(self._schedule)
+
+    def on_update(self, item, myUpdateField):
+        """
+        Listener of Table.on_update, called by LS thread
+
+        :param item: string, identify table that sends update
+        :param myUpdateField: list of fields
+        """
+
+        with self._lock:
+            self.received += 1
+            if item in self._pending:
+                self.merged += 1
+            self._pending[item] = myUpdateField
+
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        self._wake.emit()
+
+    def _schedule(self):
+        """Flush now, or when interval has elapsed since last flush"""
+
+        wait = self._last_flush + self.interval - time.monotonic()
+        self._timer.start(max(0, round(wait * 1000)))
+
+    def flush(self):
+        """Emit update_ready for each item updated since last flush"""
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+
+        self._last_flush = time.monotonic()
+
+        for item, fields in pending.items():
+            if self._last_delivered.get(item) == fields:
+                self.dropped += 1
+                continue
+
+            self._last_delivered[item] = fields
+            self.delivered += 1
+            self.update_ready.emit(fields)
+
+    def stop(self):
+        """Stop delivering, pending updates are forgotten"""
+
+        self._timer.stop()
+
+        with self._lock:
+            self._pending.clear()
+            self._scheduled = True  # never scheduled again
+
+    def stats(self):
+        """Return a string with the counters"""
+
+        return "%d updates received, %d merged, %d dropped, %d delivered" % (
+            self.received,
+            self.merged,
+            self.dropped,
+            self.delivered,
+        )
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import json
 import logging
 import os
@@ -7,14 +8,17 @@ import re
 import traceback
 import warnings
 from collections import OrderedDict
-from copy import deepcopy
 from decimal import Decimal
 
 import numpy as np
 import pyqtgraph as pg
 from PyQt5 import QtCore, QtGui, QtWidgets
 
+from report_tool.calculate.classify import get_classifier
+from report_tool.calculate.incremental import IncrementalSummary
+from report_tool.calculate.ledger import FEE_CODES, TradeLedger, TypeCode
 from report_tool.calculate.trades import TradesResults
+from report_tool.communications.async_ig_api import AsyncIGAPI
 from report_tool.communications.ig_lightstreamer import (
     MODE_DISTINCT,
     MODE_MERGE,
@@ -22,7 +26,10 @@ from report_tool.communications.ig_lightstreamer import (
     Table,
 )
 from report_tool.communications.ig_rest_api import IGAPI, APIError
+from report_tool.communications.ls_replay import LsRecorder
+from report_tool.communications.ls_websocket import WsLsClient, proxy_for
 from report_tool.exports.excel import ExportToExcel
+from report_tool.qt.async_caller import AsyncCaller
 from report_tool.qt.dialog_box import (
     AboutWindow,
     ConnectWindow,
@@ -35,14 +42,31 @@ from report_tool.qt.functions import (
     create_dates_list,
     create_graph_args,
     create_status_icons,
+    format_market_name,
     read_credentials,
     read_ig_config,
 )
-from report_tool.qt.ls_event import LsEvent
-from report_tool.qt.thread import TransactionThread, UpdateCommentsThread
+from report_tool.qt.graphics_items import AxisLabels
+from report_tool.qt.ls_event import CoalescingDispatcher, LsEvent
+from report_tool.qt.thread import (
+    LookupComment,
+    LookupComments,
+    SaveComment,
+    TransactionThread,
+    UpdateCommentsThread,
+)
+from report_tool.qt.transactions_model import ProfitLossDelegate, TransactionsModel
 from report_tool.qt.widgets import CustomDockWidget, CustomLabel, CustomLineEdit
+from report_tool.utils.constants import get_logs_dir
 from report_tool.utils.fs_utils import get_icon_path
-from report_tool.utils.settings import read_config, write_config
+from report_tool.utils.settings import (
+    StreamingTransport,
+    config_write_stats,
+    flush_config,
+    get_settings,
+    read_config,
+    write_config,
+)
 
 RE_TEXT_BETWEEN_TAGS = re.compile(r">(.*?)<")
 RE_FLOAT = re.compile(r"[+-]? *(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
@@ -52,6 +76,9 @@ RE_SPACE_START_COLON_END = re.compile(r"(\s.*?[A-z]): ")
 RE_COLON_END = re.compile(r"(.*?[A-z]): ")
 RE_UNDERSCORE_START = re.compile(r"_(.*)")
 
+# ms to wait before requesting transactions of deals that couldn't be folded
+RECONCILE_DELAY = 5000
+
 
 class ReportToolGUI(QtWidgets.QMainWindow):
 
@@ -64,6 +91,27 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
         self.data_exporter: ExportToExcel | None = None
 
+        # ledgers built from local and filtered transactions, keyed by dict id
+        self.ledgers: dict[int, tuple[OrderedDict, int, TradeLedger]] = {}
+
+        # bumped when a dict of transactions is edited in place, see get_ledger
+        self.transactions_version = 0
+
+        # rows of ledgers plotted, keyed by ledger id and include state
+        self.plotted_rows: dict[tuple[int, bool], tuple[TradeLedger, np.ndarray]] = {}
+
+        # running stats of local transactions, see fold_closed_deal
+        self.incremental_summary: IncrementalSummary | None = None
+
+        # open positions by deal id, to fold points of the deals closed
+        self.open_positions: dict[str, dict] = {}
+
+        # deals that couldn't be folded are requested at once, see update_positions
+        self.reconcile_timer = QtCore.QTimer(self)
+        self.reconcile_timer.setSingleShot(True)
+        self.reconcile_timer.setInterval(RECONCILE_DELAY)
+        self.reconcile_timer.timeout.connect(self.update_transactions)
+
         config = read_config()
 
         # load size and state of window
@@ -242,12 +290,31 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
         currency_symbol = config["currency_symbol"]
 
-        # init and configure transaction QTableWidget
-        self.widget_pos = QtWidgets.QTableWidget(1, len(transaction_headers))
+        # key in transactions of each column
+        transaction_columns = [
+            "date",
+            "market_name",
+            "direction",
+            "open_size",
+            "open_level",
+            "final_level",
+            "points",
+            "points_lot",
+            "pnl",
+        ]
+
+        # init and configure transaction table, cells are formatted when shown
+        self.transactions_model = TransactionsModel(
+            transaction_headers, transaction_columns, self
+        )
+        self.transactions_delegate = ProfitLossDelegate(self)
+
+        self.widget_pos = QtWidgets.QTableView()
+        self.widget_pos.setModel(self.transactions_model)
+        self.widget_pos.setItemDelegate(self.transactions_delegate)
 
         self.widget_pos.setObjectName("Transactions")
         self.widget_pos.setMinimumHeight(100)
-        self.widget_pos.setHorizontalHeaderLabels(transaction_headers)
 
         self.widget_pos.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
         self.widget_pos.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
@@ -772,10 +839,13 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             self.ls_client.delete(self.balance_table)
             self.ls_client.delete(self.pos_table)
             self.ls_client.destroy()
+            self.close_acc_dispatcher()
 
         except AttributeError:
             pass
 
+        self.close_async_session()  # requests of previous session
+
         """
         list is the same used to create static labels in
         create_dock_account (and self.dict_account_labels)
@@ -845,7 +915,20 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         self.logger_info.log(logging.INFO, msg)
 
         self.session = IGAPI(connect_dict)
-        connect_reply = self.session.create_session()
+        self.open_async_session()
+
+        # replies are handled by on_session_created
+        self.async_caller.call(
+            self.async_session.create_session(), self.on_session_created
+        )
+
+    def on_session_created(self, connect_reply):
+        """
+        Called with the reply of the connection to API.
+        If connection is successful request user's accounts
+
+        :param connect_reply: reply of :any:`IGAPI.create_session`
+        """
 
         # request failed show error msg
         if type(connect_reply) == APIError:
@@ -854,62 +937,77 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             return
 
         # connection successfull, get user"s accounts
-        else:
-            accounts_reply = self.session.get_user_accounts()
+        self.async_caller.call(
+            self.async_session.get_user_accounts(), self.on_accounts_received
+        )
 
-            # request failed show error msg
-            if type(accounts_reply) == APIError:
-                msg = accounts_reply._get_error_msg()
-                self.statusBar().showMessage(msg)
-                return
+    def on_accounts_received(self, accounts_reply):
+        """
+        Called with user's accounts requested after connection.
+        Update dock account and menu_switch with those accounts,
+        connect to ls and start threads performing requests
 
-            # request successfull, update GUI
-            else:
-                self.user_accounts = accounts_reply
-                for key in list(self.user_accounts.keys()):
-                    if self.user_accounts[key]["preferred"] == True:
-                        self.current_acc = self.user_accounts[key]
+        :param accounts_reply: reply of :any:`IGAPI.get_user_accounts`
+        """
 
-                        # update private attribute of self.session
-                        cash_available = self.current_acc["Cash available: "]
-                        self.session._set_cash_available(cash_available)
+        # request failed show error msg
+        if type(accounts_reply) == APIError:
+            msg = accounts_reply._get_error_msg()
+            self.statusBar().showMessage(msg)
+            return
 
-                        self.update_dock_account(self.current_acc)
+        # request successfull, update GUI
+        self.session.save_currency_symbol(accounts_reply)  # not written by request
+        self.user_accounts = accounts_reply
+        for key in list(self.user_accounts.keys()):
+            if self.user_accounts[key]["preferred"] == True:
+                self.current_acc = self.user_accounts[key]
 
-                    else:
-                        continue
+                # update private attribute of self.session
+                cash_available = self.current_acc["Cash available: "]
+                self.session._set_cash_available(cash_available)
 
-                # display and log a msg
-                msg = "Connected to API"
-                self.logger_info.log(logging.INFO, msg)
-                self.statusBar().showMessage(msg)
+                self.update_dock_account(self.current_acc)
 
-                self.update_menu_switch()
+            else:
+                continue
 
-                ls_endpoint = self.session._get_ls_endpoint()
-                self.connect_to_ls(ls_endpoint)
+        # display and log a msg
+        msg = "Connected to API"
+        self.logger_info.log(logging.INFO, msg)
+        self.statusBar().showMessage(msg)
 
-                # create threads to perform requests
-                self.transaction_queue = queue.Queue()
-                self.transaction_thread = TransactionThread(
-                    self.session, self.transaction_queue, self.update_results
-                )
+        self.update_menu_switch()
 
-                # thread for comments
-                self.comments_queue = queue.Queue()
-                self.comments_thread = UpdateCommentsThread(
-                    self.comments_queue, self.update_comments
-                )
+        ls_endpoint = self.session._get_ls_endpoint()
+        self.connect_to_ls(ls_endpoint)
+
+        self.request_open_positions()
+
+        # create threads to perform requests
+        self.transaction_queue = queue.Queue()
+        self.transaction_thread = TransactionThread(
+            self.session, self.transaction_queue, self.update_results
+        )
+        self.transaction_thread.transaction_progress.connect(
+            self.statusBar().showMessage
+        )
+
+        # thread for comments
+        self.comments_queue = queue.Queue()
+        self.comments_thread = UpdateCommentsThread(
+            self.comments_queue, self.update_comments
+        )
 
-                self.comments_thread.start()
-                self.transaction_thread.start()
+        self.comments_thread.start()
+        self.transaction_thread.start()
 
-                # init dict that will hold results received
-                self.local_transactions = OrderedDict()
-                self.filtered_dict = OrderedDict()
+        # init dict that will hold results received
+        self.local_transactions = OrderedDict()
+        self.filtered_dict = OrderedDict()
 
-                self.set_gui_enabled(True)  # enable interactions
-                self.update_options(None)
+        self.set_gui_enabled(True)  # enable interactions
+        self.update_options(None)
 
     def connect_to_ls(self, ls_endpoint, *args, **kwargs):
         """
@@ -919,8 +1017,30 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         :param ls_endpoint: string private attribute of :any:`IGAPI`.
         """
 
-        self.ls_client = LsClient(ls_endpoint + "/lightstreamer/")
         req_args = self.session._get_req_args()
+        ls_url = ls_endpoint + "/lightstreamer/"
+        proxies = req_args["proxies"]
+
+        # transport is chosen per session, updates are the same.
+        # WebSocket can't go through a proxy, use HTTP behind one
+        use_websocket = get_settings()["ls_transport"] == StreamingTransport.WEBSOCKET
+
+        if use_websocket and proxy_for(ls_url, proxies) is not None:
+            self.logger_info.log(
+                logging.INFO, "Proxy set, streaming over HTTP instead of WebSocket"
+            )
+            use_websocket = False
+
+        if use_websocket:
+            self.ls_client = WsLsClient(ls_url)
+        else:
+            self.ls_client = LsClient(ls_url, proxies=proxies)
+
+            # keep the stream to replay it offline, see ls_replay
+            if get_settings()["record_stream"] == 2:
+                now = datetime.datetime.now()
+                name = f"lightstreamer_{now:%Y%m%d_%H%M%S}.lsrec.gz"
+                self.ls_client.recorder = LsRecorder(get_logs_dir() / name)
 
         # get name of current account
         for action in self.menu_switch.actions():
@@ -963,10 +1083,11 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             schema="CONFIRMS",
         )
 
-        # configure account event
-        self.acc_update_sig = LsEvent()
-        self.balance_table.on_update.listen(self.acc_update_sig.acc_update_event)
-        self.acc_update_sig.acc_signal.connect(self.update_account)
+        # configure account event, ticks are coalesced to spare the gui
+        max_rate = get_settings()["max_refresh_rate"]
+        self.acc_dispatcher = CoalescingDispatcher(max_rate, self)
+        self.balance_table.on_update.listen(self.acc_dispatcher.on_update)
+        self.acc_dispatcher.update_ready.connect(self.update_account)
 
         # configure positions event
         self.pos_update_sig = LsEvent()
@@ -988,6 +1109,39 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         status_icon = create_status_icons(connected_color)
         self.lbl_status.setPixmap(status_icon)
 
+    def close_acc_dispatcher(self):
+        """
+        Stop delivering account updates of the
+        LS session closed and log the counters
+        """
+
+        self.acc_dispatcher.stop()
+
+        msg = "Account updates: " + self.acc_dispatcher.stats()
+        self.logger_debug.log(logging.DEBUG, msg)
+
+        self.acc_dispatcher.deleteLater()
+        del self.acc_dispatcher
+
+    def open_async_session(self):
+        """Send requests of self.session without blocking gui"""
+
+        self.async_session = AsyncIGAPI(self.session)
+        self.async_caller = AsyncCaller(self.async_session, self)
+
+    def close_async_session(self):
+        """
+        Stop sending requests without blocking gui when the
+        session or account changes, replies are dropped
+        """
+
+        if not hasattr(self, "async_caller"):
+            return
+
+        self.async_caller.close()
+        self.async_caller.deleteLater()
+        del self.async_caller, self.async_session
+
     def switch_account(self):
         """Switch to account selected by user"""
 
@@ -999,6 +1153,8 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         self.ls_client.delete(self.balance_table)
         self.ls_client.delete(self.pos_table)
         self.ls_client.destroy()
+        self.close_acc_dispatcher()
+        self.close_async_session()
 
         # update status icons
         disconnected_color = QtGui.QColor("#F51616")
@@ -1034,9 +1190,22 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
         switch_body = json.dumps({"accountId": acc_id, "defaultAccount": ""})
 
-        switch_reply = self.session.switch_account(acc_id, acc_name)
+        # replies are handled by on_account_switched
+        self.open_async_session()
+        self.async_caller.call(
+            self.async_session.switch_account(acc_id, acc_name),
+            functools.partial(self.on_account_switched, acc_name, key),
+        )
 
-        # method returns a msg even if request is succesfull display it
+    def on_account_switched(self, acc_name, key, switch_reply):
+        """
+        Called with the reply of the switch to an account.
+        If successful update dock account and connect to ls
+
+        :param acc_name: string, name of account switched to
+        :param key: key of account in self.user_accounts
+        :param switch_reply: reply of :any:`IGAPI.switch_account`
+        """
 
         # request failed
         if type(switch_reply) == APIError:
@@ -1045,31 +1214,31 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             return
 
         # request is successfull update GUI
-        else:
-            new_account = self.user_accounts[key]
-            ls_endpoint = self.session._get_ls_endpoint()
+        new_account = self.user_accounts[key]
+        ls_endpoint = self.session._get_ls_endpoint()
 
-            # update private attribute of self.session
-            cash_available = new_account["Cash available: "]
-            self.session._set_cash_available(cash_available)
+        # update private attribute of self.session
+        cash_available = new_account["Cash available: "]
+        self.session._set_cash_available(cash_available)
 
-            # update dock with new account and connect to ls
-            self.update_dock_account(new_account)
-            self.connect_to_ls(ls_endpoint)
+        # update dock with new account and connect to ls
+        self.update_dock_account(new_account)
+        self.connect_to_ls(ls_endpoint)
+        self.request_open_positions()
 
-            # log msg
-            msg = "Connected to %s" % acc_name
-            self.statusBar().showMessage(msg)
-            self.logger_info.log(logging.INFO, msg)
+        # log msg
+        msg = "Connected to %s" % acc_name
+        self.statusBar().showMessage(msg)
+        self.logger_info.log(logging.INFO, msg)
 
-            self.set_gui_enabled(True)  # enable interactions
+        self.set_gui_enabled(True)  # enable interactions
 
-            self.update_options(None)
+        self.update_options(None)
 
-            # update status infos
-            connected_color = QtGui.QColor("#23A627")
-            status_icon = create_status_icons(connected_color)
-            self.lbl_status.setPixmap(status_icon)
+        # update status infos
+        connected_color = QtGui.QColor("#23A627")
+        status_icon = create_status_icons(connected_color)
+        self.lbl_status.setPixmap(status_icon)
 
     def update_menu_switch(self):
         """
@@ -1314,7 +1483,7 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
         profit_loss = Decimal(profit_loss)
 
-        config = read_config()
+        config = get_settings()
         label_pnl = self.dict_account_labels["Profit/loss: "]
 
         currency_symbol = config["currency_symbol"]
@@ -1359,30 +1528,27 @@ class ReportToolGUI(QtWidgets.QMainWindow):
                     pos_status = pos_report["affectedDeals"][0]["status"]
 
                     if pos_status == "FULLY_CLOSED" or pos_status == "PARTIALLY_CLOSED":
-                        self.update_transactions()
-
-                        # get user accounts to get cash available and update dock account
-                        self.user_accounts = self.session.get_user_accounts()
+                        """
+                        show the deal right away. transactions are requested
+                        only if it can't be folded, once for deals closed
+                        within RECONCILE_DELAY
+                        """
 
-                        # find the name of current account
-                        for action in self.menu_switch.actions():
-                            action_name = action.text().replace("&", "")
+                        if not self.fold_closed_deal(pos_report):
+                            self.reconcile_timer.start()
 
-                            if action.isChecked():
-                                acc_name = action_name
-                            else:
-                                continue
+                        if pos_status == "FULLY_CLOSED":
+                            position_id = pos_report["affectedDeals"][0]["dealId"]
+                            self.open_positions.pop(position_id, None)
 
-                        # search for the account corresponding to acc_name
-                        for idx in list(self.user_accounts.keys()):
-                            name = self.user_accounts[idx]["Account name: "]
+                        # get user accounts to get cash available and update dock account
+                        self.async_caller.call(
+                            self.async_session.get_user_accounts(),
+                            self.refresh_current_account,
+                        )
 
-                            if name == acc_name:
-                                self.current_acc = self.user_accounts[idx]
-                                self.update_dock_account(self.current_acc)
-                                break
-                            else:
-                                continue
+                    elif pos_status == "OPENED" and deal_status == "ACCEPTED":
+                        self.request_open_positions()  # to know its open level
 
                     elif deal_status == "REJECTED":  # deal rejected
                         msg = deal_status + " " + reason
@@ -1399,6 +1565,177 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             self.statusBar().showMessage(msg)
             self.logger_debug.log(logging.ERROR, traceback.format_exc())
 
+    def refresh_current_account(self, accounts_reply):
+        """
+        Called with user accounts requested when a position
+        is closed, update dock account with current account
+
+        :param accounts_reply: reply of :any:`IGAPI.get_user_accounts`
+        """
+
+        # request failed show error msg
+        if type(accounts_reply) == APIError:
+            msg = accounts_reply._get_error_msg()
+            self.statusBar().showMessage(msg)
+            return
+
+        self.session.save_currency_symbol(accounts_reply)  # not written by request
+        self.user_accounts = accounts_reply
+
+        # find the name of current account
+        for action in self.menu_switch.actions():
+            action_name = action.text().replace("&", "")
+
+            if action.isChecked():
+                acc_name = action_name
+            else:
+                continue
+
+        # search for the account corresponding to acc_name
+        for idx in list(self.user_accounts.keys()):
+            name = self.user_accounts[idx]["Account name: "]
+
+            if name == acc_name:
+                self.current_acc = self.user_accounts[idx]
+                self.update_dock_account(self.current_acc)
+                break
+            else:
+                continue
+
+    def request_open_positions(self):
+        """Request open positions, see update_open_positions"""
+
+        self.async_caller.call(
+            self.async_session.get_positions(), self.update_open_positions
+        )
+
+    def update_open_positions(self, positions_reply):
+        """
+        Called with open positions requested at login or when
+        a position is opened. Open levels are used to calculate
+        the points of deals closed, see fold_closed_deal
+
+        :param positions_reply: reply of :any:`IGAPI.get_positions`
+        """
+
+        # request failed, deals closed will be requested
+        if type(positions_reply) == APIError:
+            msg = positions_reply._get_error_msg()
+            self.logger_debug.log(logging.ERROR, msg)
+            return
+
+        self.open_positions = positions_reply
+
+    def fold_closed_deal(self, pos_report):
+        """
+        Fold a deal closed intraday in transactions, summary, table
+        and equity curves without requesting transactions again.
+        Points are calculated with the open level of the position,
+        as TransactionThread does.
+
+        Returns False when transactions must be requested to show
+        the deal: a filter is set, there is nothing to fold in or
+        the position closed is unknown
+
+        :param pos_report: dict, confirm sent by lightstreamer
+        """
+
+        config = get_settings()
+
+        # a filter is set or there is nothing to fold in
+        if self.incremental_summary is None or config["all"] != 2:
+            return False
+
+        # confirm date is like 2015-06-19T10:15:00.000
+        date = datetime.datetime.strptime(pos_report["date"][:19], "%Y-%m-%dT%H:%M:%S")
+
+        # deal is out of the dates shown, nothing to update
+        if date.date() > self.end_date.date().toPyDate():
+            return True
+
+        position_id = pos_report["affectedDeals"][0]["dealId"]
+        position = self.open_positions.get(position_id)
+        profit = pos_report.get("profit")
+
+        if position is None or profit is None:
+            return False
+
+        classifier = get_classifier()
+
+        market_name = format_market_name(position["market_name"])
+        direction = position["direction"]
+        open_level = position["open_level"]
+        final_level = Decimal(str(pos_report["level"]))
+        size = Decimal(str(pos_report["size"]))
+
+        points = self.transaction_thread.calculate_pnl(
+            open_level, final_level, size, direction, market_name
+        )
+
+        try:
+            points_lot = round(points / abs(size), 2)
+        except ArithmeticError:  # size of 0
+            points_lot = "-"
+
+        trade = {
+            "type": classifier.kw_order[0],
+            "date": date.strftime("%d/%m/%y"),
+            "market_name": market_name,
+            "direction": direction,
+            "open_size": -size if direction == "SELL" else size,
+            "open_level": open_level,
+            "final_level": final_level,
+            "points": points,
+            "points_lot": points_lot,
+            "pnl": Decimal(str(profit)),
+        }
+
+        deal_id = pos_report["dealId"] + "_0"
+
+        curves = self.incremental_summary.curves
+        markers_before = {key: curve.markers_key for key, curve in curves.items()}
+
+        # set growth of trade, then show it
+        appended = self.incremental_summary.add(trade)
+        self.local_transactions[deal_id] = trade
+        self.transactions_changed()
+        self.transactions_model.append_transaction(deal_id)
+
+        summary_dict = self.incremental_summary.summary(False, config)
+        self.update_summary_labels(summary_dict, self.combobox_options.currentText())
+
+        if self.data_exporter is not None:
+            self.data_exporter.update_summary(summary_dict)
+
+        state_dates = config["what_to_show"]["state_dates"]
+
+        # append new points to equity curves
+        for key, points_appended in appended.items():
+            equity_plot = self.graph_dict[key]["equity_plot"]
+            overview_plot = self.graph_dict[key]["overview_plot"]
+            axis_labels = equity_plot.getAxis("bottom").labels
+
+            for x, y in points_appended:
+                plotted_id = deal_id if x else ""  # first point is not a trade
+                axis_labels.append(x, trade["date"] if state_dates == 2 else x)
+
+                for plot, curve_name in [
+                    (equity_plot, "equity_curve"),
+                    (overview_plot, "overview_curve"),
+                ]:
+                    self.graph_dict[key]["curve"][curve_name].append(x, y)
+                    plot.append_deal_id(plotted_id)
+
+            equity_plot.getAxis("bottom").labels_changed()
+            overview_plot.getAxis("bottom").labels_changed()
+
+            # highs, depths and max dd are set again only if changed
+            if curves[key].markers_key != markers_before[key]:
+                for scatter_type, xy_value in curves[key].markers().items():
+                    self.update_markers(key, scatter_type, xy_value, config)
+
+        return True
+
     def update_status(self, state):
         """
         Update status bar label according to state received
@@ -1473,8 +1810,6 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         Update the GUI with results emit by transactions_thread
         or with a saved result dict if the users modifies options
         that don't need new request or when taking screenshot.
-        pos_transaction_headers is a list with items same
-        as the result dict used
 
         :param transactions: OrderedDict() with transactions
 
@@ -1498,20 +1833,7 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
         self.statusBar().showMessage("Updating transactions...")
 
-        pos_transaction_headers = [
-            "date",
-            "market_name",
-            "direction",
-            "open_size",
-            "open_level",
-            "final_level",
-            "points",
-            "points_lot",
-            "pnl",
-            "growth",
-        ]
-
-        config = read_config()  # read options
+        config = get_settings()  # read options
 
         start_capital = config["start_capital"]
         currency_symbol = config["currency_symbol"]
@@ -1521,19 +1843,13 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         state_details = config["what_to_show"]["state_details"]
         all_state = config["all"]  # all markets or filter set
 
-        ig_config = read_ig_config()
-
         """
         ig sends keywords to identify transactions type known
         keywords ares stored in ig_config.json
         if transaction type is unknown log it
         """
 
-        kw_order = ig_config["keyword"]["ORDER"]
-        kw_fees = ig_config["keyword"]["FEES"]
-        kw_cashin = ig_config["keyword"]["CASH_IN"]
-        kw_cashout = ig_config["keyword"]["CASH_OUT"]
-        kw_transfer = ig_config["keyword"]["TRANSFER"]
+        classifier = get_classifier()
 
         # Depending of caller use a local transactions or the one sent by thread
         try:
@@ -1558,8 +1874,9 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         self.logger_info.log(logging.INFO, "Calculating summary...")
 
         try:
+            ledger = self.get_ledger(transactions, classifier.codes)
             dict_results = summary.calculate_result(
-                transactions, start_capital, cash_available, screenshot
+                transactions, start_capital, cash_available, screenshot, ledger
             )
 
         except Exception:
@@ -1575,6 +1892,15 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         transactions = dict_results["transactions"]
         curves_dict = dict_results["curves_dict"]
 
+        # keep running stats of all transactions to fold deals closed later
+        if transactions is self.local_transactions:
+            self.incremental_summary = None
+
+            if dict_results["stats"] is not None:
+                self.incremental_summary = IncrementalSummary(
+                    ledger, start_capital, config, classifier.codes
+                )
+
         data_to_save = {
             "transactions": transactions,
             "summary": summary_dict,
@@ -1620,148 +1946,45 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             # show profit on dock pos details
             self.dock_pos_details.show_profit_loss()
 
-        summary_headers = [
-            "Points won",
-            "Trades won",
-            "Points lost",
-            "Trades lost",
-            "Total points",
-            "Trades flat",
-            "Total trades",
-            "Avg trade",
-            "Profit Factor",
-            "Avg win",
-            "Capital growth",
-            "Avg loss",
-            "Max drawdown",
-            "Avg drawdown",
-            "Consec. wins",
-            "Consec. losses",
-            "Interests",
-            "Fees",
-            "Cash in/out",
-            "Transfers",
-        ]  # same list as the one used to create dock
-
-        # update summary labels
-        for count, key in enumerate(summary_dict.keys()):
-            label_text = self.dict_summary_labels[key].text()
-
-            if count == 4:
-                # get only 'points' if result in 'points/lot'
-                try:
-                    result_in = RE_BEFORE_SLASH_HYPHEN.search(result_in).group(1)
-                except AttributeError:
-                    pass
-
-                static_text = RE_SPACE_START.search(label_text).group(0)
-                static_text = f"{static_text}{result_in.lower()}: "
-
-            elif count == 0 or count == 2:
-                # get only "points" if result in "points/lot"
-                try:
-                    result_in = RE_BEFORE_SLASH_HYPHEN.search(result_in).group(1)
-                except AttributeError:
-                    pass
-
-                static_text = RE_SPACE_START_COLON_END.search(label_text).group(0)
-                static_text = f"{result_in}{static_text}"
-
-            else:
-                static_text = RE_COLON_END.search(label_text).group(0)
-
-            text_to_set = f"{static_text}{summary_dict[key]}"
-            self.dict_summary_labels[key].setText(text_to_set)
-
-        # update transactions table
-        for i in range(self.widget_pos.rowCount()):
-            self.widget_pos.removeRow(0)  # remove all rows
+        self.update_summary_labels(summary_dict, result_in)
 
-        deal_id_plotted = []
-        new_row = 0
+        # update transactions table, account transactions are never showed
+        if config["include"] == 2:
+            table_codes = (TypeCode.ORDER, *FEE_CODES)
+        else:  # skip dividend interest
+            table_codes = (TypeCode.ORDER,)
 
-        # iterate over deal_id from older to newer pos
-        for count, deal_id in enumerate(transactions.keys()):
-            transaction_type = transactions[deal_id]["type"]
+        table_ledger = self.get_ledger(transactions, classifier.codes)
 
-            # skip dividend interest
-            if config["include"] != 2 and transaction_type in kw_fees:
-                continue
-
-            elif transaction_type in ["CASHIN", "TRANSFER", "CASHOUT", "UNDEFINED"]:
-                continue  # account transaction are never showed
-
-            else:
-                nb_row = self.widget_pos.rowCount()
-                self.widget_pos.insertRow(nb_row)
+        """
+        if screenshot is being taken, hide lot size
+        and/or pnl if user wants to
+        """
 
-                """
-                fill transactions table. if screenshot is being
-                taken ,hide lot size and/or pnl if user wants to
-                """
+        hide_size = state_size == "Always" or (
+            state_size == "Only for screenshot" and screenshot
+        )
+        hide_pnl = result_in != currency_symbol and (
+            state_infos == "Always"
+            or state_infos == "Only for screenshot"
+            and screenshot
+        )
 
-                # add deal_id item at first column
-                # item = QtWidgets.QTableWidgetItem()
-                # item.setTextAlignment(QtCore.Qt.AlignCenter)
-                # try:
-                #     ig_deal_id = RE_UNDERSCORE_START.search(deal_id).groups()[0]
-                # except Exception as e:
-                #     ig_deal_id = deal_id
-
-                # item.setText(ig_deal_id)
-                # self.widget_pos.setItem(nb_row, 0, item)
-
-                for idx, header in enumerate(pos_transaction_headers):
-                    item = QtWidgets.QTableWidgetItem()
-                    item.setTextAlignment(QtCore.Qt.AlignCenter)
-
-                    if header == "pnl":
-                        if (
-                            state_infos == "Always"
-                            and result_in != currency_symbol
-                            or state_infos == "Only for screenshot"
-                            and screenshot == True
-                            and result_in != currency_symbol
-                        ):
-                            item.setText(f"-- {currency_symbol}")  # hide profit/loss
-                        else:
-                            item.setText(
-                                f"{transactions[deal_id][header]}{currency_symbol}"
-                            )  # show profit/loss
-
-                    elif header == "open_size":
-                        if (
-                            state_size == "Always"
-                            or state_size == "Only for screenshot"
-                            and screenshot == True
-                        ):  # screenshot is being taken
-                            item.setText("-")  # hide lot size
-                            self.dock_pos_details.hide_lot_size()
-                        else:  # show lot_size
-                            item.setText(f"{transactions[deal_id][header]}")
-
-                    elif header == "growth":
-                        continue  # don"t show growth in table
+        if hide_size:
+            self.dock_pos_details.hide_lot_size()
 
-                    else:
-                        item.setText(f"{transactions[deal_id][header]}")
-
-                    profit_color = config["profit_color"]
-                    flat_color = config["flat_color"]
-                    loss_color = config["loss_color"]
-                    pnl = transactions[deal_id]["pnl"]
-
-                    # set line color according to profit/loss
-                    color = (
-                        loss_color
-                        if pnl < 0
-                        else profit_color
-                        if pnl > 0
-                        else flat_color
-                    )
-                    item.setForeground(QtGui.QColor(color))
+        # set line color according to profit/loss
+        self.transactions_delegate.set_colors(
+            config["profit_color"], config["flat_color"], config["loss_color"]
+        )
 
-                    self.widget_pos.setItem(nb_row, idx, item)
+        self.transactions_model.set_masks(hide_size, hide_pnl)
+        self.transactions_model.set_transactions(
+            transactions,
+            table_ledger.deal_ids,
+            table_ledger.rows(*table_codes),
+            currency_symbol,
+        )
 
         """
         If user changes the "units" of summary or what to
@@ -1946,7 +2169,7 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             self.statusBar().showMessage(msg)
 
         except KeyError:
-            if self.widget_pos.rowCount() == 0:
+            if self.transactions_model.rowCount() == 0:
                 self.statusBar().showMessage("No transactions received")
                 self.btn_export.setEnabled(False)
                 self.btn_export.setStatusTip("No data to export")
@@ -1956,6 +2179,46 @@ class ReportToolGUI(QtWidgets.QMainWindow):
                 self.btn_export.setEnabled(True)
                 self.btn_export.setStatusTip("Export data")
 
+    def update_summary_labels(self, summary_dict, result_in):
+        """
+        Update labels of dock summary
+
+        :param summary_dict: OrderedDict() summary formatted
+                             by TradesResults.format_summary
+
+        :param result_in: string, unit results are displayed in
+        """
+
+        # update summary labels
+        for count, key in enumerate(summary_dict.keys()):
+            label_text = self.dict_summary_labels[key].text()
+
+            if count == 4:
+                # get only 'points' if result in 'points/lot'
+                try:
+                    result_in = RE_BEFORE_SLASH_HYPHEN.search(result_in).group(1)
+                except AttributeError:
+                    pass
+
+                static_text = RE_SPACE_START.search(label_text).group(0)
+                static_text = f"{static_text}{result_in.lower()}: "
+
+            elif count == 0 or count == 2:
+                # get only "points" if result in "points/lot"
+                try:
+                    result_in = RE_BEFORE_SLASH_HYPHEN.search(result_in).group(1)
+                except AttributeError:
+                    pass
+
+                static_text = RE_SPACE_START_COLON_END.search(label_text).group(0)
+                static_text = f"{result_in}{static_text}"
+
+            else:
+                static_text = RE_COLON_END.search(label_text).group(0)
+
+            text_to_set = f"{static_text}{summary_dict[key]}"
+            self.dict_summary_labels[key].setText(text_to_set)
+
     def update_graph(self, *args, **kwargs):
         """Update equity curves and scatter plot for all graphs."""
 
@@ -1967,22 +2230,15 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
         state_details = config["what_to_show"]["state_details"]
         state_dates = config["what_to_show"]["state_dates"]
-        states_dd = config["what_to_show"]  # get what to show
 
         result_in = self.combobox_options.currentText()
-        ig_config = read_ig_config()
-
         """
         ig sends keywords to identify transactions type known
         keywords ares stored in ig_config.json
         if transaction type is unknown log it
         """
 
-        kw_order = ig_config["keyword"]["ORDER"]
-        kw_fees = ig_config["keyword"]["FEES"]
-        kw_cashin = ig_config["keyword"]["CASH_IN"]
-        kw_cashout = ig_config["keyword"]["CASH_OUT"]
-        kw_transfer = ig_config["keyword"]["TRANSFER"]
+        classifier = get_classifier()
 
         """
         following listes are build to update classsEquityChart
@@ -2003,14 +2259,14 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         trades_plotted = [
             deal_id
             for deal_id in transactions.keys()
-            if transactions[deal_id]["type"] in kw_order
+            if classifier.is_order(transactions[deal_id]["type"])
         ]
 
         # build a list with only dates when a trades occurs
         dates_plotted = [
             transactions[deal_id]["date"]
             for deal_id in transactions.keys()
-            if transactions[deal_id]["type"] in kw_order
+            if classifier.is_order(transactions[deal_id]["type"])
         ]
 
         # build a list with all dates except when accounts fund transfer
@@ -2068,11 +2324,12 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             overview_curve = self.graph_dict[key]["curve"]["overview_curve"]
             equity_curve = self.graph_dict[key]["curve"]["equity_curve"]
 
-            # update x axis values/string
+            # update x axis values/string, same labels for both plots
+            axis_labels = AxisLabels(xaxis_dict)
             equity_plot.getAxis("bottom").update_axis(
-                xaxis_dict, show_dates=state_dates
+                axis_labels, show_dates=state_dates
             )
-            overview_plot.getAxis("bottom").update_axis(xaxis_dict)
+            overview_plot.getAxis("bottom").update_axis(axis_labels)
 
             for scatter_type in curves_dict[key].keys():
                 # Scatter type can be equity_curve dd, maxdd or depth
@@ -2099,42 +2356,9 @@ class ReportToolGUI(QtWidgets.QMainWindow):
                     )  # update overview curve
 
                 else:
-                    scatter_args = {}
-
-                    # get state of scatter (show it or not)
-                    state_dd = states_dd[scatter_type]
-
-                    if state_dd == 0:
-                        scatter_item = self.graph_dict[key]["curve"][scatter_type]
-
-                        # get data to diplay
-                        xy_value = curves_dict[key][scatter_type]
-                        scatter_args["clear"] = True
-                        equity_plot.update_scatter(
-                            scatter_item, np.array([]), np.array([]), **scatter_args
-                        )
-
-                    else:
-                        # create list with keys corresponding to scatter to update
-                        keys_config = [
-                            key_config
-                            for key_config in config.keys()
-                            if scatter_type in key_config
-                        ]
-
-                        for option in keys_config:
-                            scatter_args[option] = config[option]
-
-                        scatter_args["dd_size"] = config["dd_size"]
-
-                        scatter_item = self.graph_dict[key]["curve"][scatter_type]
-
-                        # get data to diplay
-                        xy_value = curves_dict[key][scatter_type]
-
-                        equity_plot.update_scatter(
-                            scatter_item, xy_value[0], xy_value[1], **scatter_args
-                        )
+                    self.update_markers(
+                        key, scatter_type, curves_dict[key][scatter_type], config
+                    )
 
             # When new data are plotted set vline_pos are the middle
             vline_pos = len(transactions) // 2
@@ -2171,13 +2395,52 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
             if state_details == 2 and screenshot == False:
                 equity_plot.remove_text_item("", all_comments=True)
-                self.comments_queue.put(deal_id_list)
+                self.comments_queue.put(LookupComments(deal_id_list))
 
             elif screenshot == False:  # user don't want to show comments
                 equity_plot.remove_text_item("", all_comments=True)
 
                 self.dock_pos_details.hide()  # hide dock
 
+    def update_markers(self, key, scatter_type, xy_value, config):
+        """
+        Update a scatter plot of highs, depths or max dd
+        on an equity plot, clear it if user hides it
+
+        :param key: string, name of the graph
+        :param scatter_type: string, "high", "depth" or "maxdd"
+        :param xy_value: tuple of arrays, x and y of markers
+        :param config: dict with config saved
+        """
+
+        equity_plot = self.graph_dict[key]["equity_plot"]
+        scatter_item = self.graph_dict[key]["curve"][scatter_type]
+        scatter_args = {}
+
+        # get state of scatter (show it or not)
+        state_dd = config["what_to_show"][scatter_type]
+
+        if state_dd == 0:
+            scatter_args["clear"] = True
+            equity_plot.update_scatter(
+                scatter_item, np.array([]), np.array([]), **scatter_args
+            )
+
+        else:
+            # create list with keys corresponding to scatter to update
+            keys_config = [
+                key_config for key_config in config.keys() if scatter_type in key_config
+            ]
+
+            for option in keys_config:
+                scatter_args[option] = config[option]
+
+            scatter_args["dd_size"] = config["dd_size"]
+
+            equity_plot.update_scatter(
+                scatter_item, xy_value[0], xy_value[1], **scatter_args
+            )
+
     def update_comments(self, object_send):
         """
         Update comments on dock_pos_details
@@ -2321,7 +2584,7 @@ class ReportToolGUI(QtWidgets.QMainWindow):
                              is being taken
         """
 
-        config = read_config()
+        config = get_settings()
 
         """
         ordered dict with Label title as keys and values
@@ -2380,46 +2643,15 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
         # get correct dictionnary to search
         if all_state == 2:  # filter off
-            dict_to_search = deepcopy(self.local_transactions)  # use default dict
-        else:
-            dict_to_search = deepcopy(self.filtered_dict)  # use filtered dict
-
-        """
-        if exclude interest or active graph is points build
-        a dict without fees/interest  else delete transactions
-        about account maybe there is a cleaner way to do that
-        """
-
-        if include != 2 or active_tab_name == "Points":
-            for key in dict_to_search.keys():
-                if (
-                    dict_to_search[key]["type"] == "WITH"
-                    or dict_to_search[key]["type"] == "DEPO"
-                    or dict_to_search[key]["type"] == "DIVIDEND"
-                    or dict_to_search[key]["type"] == "CHART"
-                    or dict_to_search[key]["type"] == "CASHIN"
-                    or dict_to_search[key]["type"] == "CASHOUT"
-                    or dict_to_search[key]["type"] == "TRANSFER"
-                ):
-                    dict_to_search.pop(key, None)
-
-                else:
-                    continue
-
+            dict_to_search = self.local_transactions  # use default dict
         else:
-            for key in dict_to_search.keys():
-                if (
-                    dict_to_search[key]["type"] == "CASHIN"
-                    or dict_to_search[key]["type"] == "CASHOUT"
-                    or dict_to_search[key]["type"] == "TRANSFER"
-                    or dict_to_search[key]["type"] == "TRANSFER"
-                ):
-                    dict_to_search.pop(key, None)
+            dict_to_search = self.filtered_dict  # use filtered dict
 
-                else:
-                    continue
+        # points graph never show interest/dividend, see update_graph
+        with_fees = include == 2 and active_tab_name != "Points"
+        ledger, rows = self.get_plotted_rows(dict_to_search, with_fees)
 
-        if not dict_to_search:  # no trades found
+        if not len(rows):  # no trades found
             # update vertical line pos for each plot
             for key in self.graph_dict.keys():
                 # set a default vline position
@@ -2430,10 +2662,6 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             self.dock_pos_details.empty_labels(pos_details_headers)
             return
 
-        else:
-            # create a list all trade number available
-            list_count_pos = [i + 1 for i in range(len(dict_to_search))]
-
         """
         If function is called by keyPressEvent the index of pos
         is directly send, don"t need to map the mouse click
@@ -2446,17 +2674,8 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             # x value (trade number) under mouse click
             x_value_clicked = plot_widget.plotItem.vb.mapSceneToView(mouse_pos).x()
 
-        if x_value_clicked < 0.5:  # no trade number equals to 0
-            x_value_clicked = 1  # force trade number to be 1
-
-        # no trade number > last trade force trade number to be = the last trade
-        elif x_value_clicked > list_count_pos[-1]:
-            x_value_clicked = list_count_pos[-1]
-
-        # find closest trade number to mouse click
-        closest_x = min(
-            list_count_pos, key=lambda x: abs(x - round(x_value_clicked, 0))
-        )
+        # closest trade number to mouse click, between 1 and the last trade
+        closest_x = int(min(max(round(x_value_clicked, 0), 1), len(rows)))
 
         # get mouse click coordinates in px
         x_coord = plot_widget.plotItem.vb.mapViewToScene(
@@ -2474,12 +2693,12 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         to search a comment for this trade
         """
 
-        # FIXME: dict .keys() order was not deterministic prior to 3.6. Reviewing is needed
-        self.deal_id_clicked = list(dict_to_search.keys())[closest_x - 1]
-        self.comments_queue.put(str(self.deal_id_clicked))
+        self.deal_id_clicked = ledger.deal_ids[rows[closest_x - 1]]
+        self.comments_queue.put(LookupComment(str(self.deal_id_clicked)))
 
         # set deal_id row as active row in table
-        self.widget_pos.setCurrentCell(closest_x - 1, 0)
+        row_index = self.transactions_model.index(closest_x - 1, 0)
+        self.widget_pos.setCurrentIndex(row_index)
 
         dock_args = {
             "pos_details_headers": pos_details_headers,
@@ -2499,13 +2718,10 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
     def write_comments(self, *args, **kwargs):
         """
-        Called when user edit comments. Build a dict whith deal_id
-        to comment as key and comment to save as value and put it
+        Called when user edit comments. Put the comment to save
         in comments_queue. see updateCommentsThread class
         """
 
-        dict_to_save = {}
-
         comment_to_write = str(self.text_edit_comment.toPlainText())
         show_on_graph = self.checkbox_showongraph.checkState()
 
@@ -2538,8 +2754,74 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             comments_items = equity_plot._get_comments_items()
             overview_plot._set_comments_items(comments_items)
 
-            dict_to_save[self.deal_id_clicked] = comment_to_write
-            self.comments_queue.put(dict_to_save)
+        self.comments_queue.put(SaveComment(self.deal_id_clicked, comment_to_write))
+
+    def get_ledger(self, transactions, codes):
+        """
+        Return the ledger of transactions. It is built once for
+        each dict received from thread or from filter, so
+        changing options doesn't parse transactions again. A dict
+        edited in place must be signaled with transactions_changed
+
+        :param transactions: OrderedDict() with transactions
+
+        :param codes: dict, code of each type of transactions
+        """
+
+        key = id(transactions)
+        cached = self.ledgers.get(key)
+
+        if (
+            cached is None
+            or cached[0] is not transactions
+            or cached[1] != self.transactions_version
+        ):
+            ledger = TradeLedger.from_transactions(transactions, codes)
+
+            # keep only ledgers of dicts still in use
+            in_use = (id(self.local_transactions), id(self.filtered_dict))
+            self.ledgers = {k: v for k, v in self.ledgers.items() if k in in_use}
+            self.ledgers[key] = (transactions, self.transactions_version, ledger)
+
+        return self.ledgers[key][2]
+
+    def transactions_changed(self):
+        """
+        Call when local or filtered transactions are edited
+        in place (e.g. a deal folded), so their ledgers and
+        plotted rows are built again on next request
+        """
+
+        self.transactions_version += 1
+
+    def get_plotted_rows(self, transactions, with_fees):
+        """
+        Return the ledger of transactions and the rows of the
+        trades plotted: trade number n on x axis is at row
+        rows[n - 1]. Rows are read-only and built once per
+        ledger and include state, a click is a lookup
+
+        :param transactions: OrderedDict() with transactions
+        :param with_fees: boolean, interest/dividend are plotted
+        """
+
+        ledger = self.get_ledger(transactions, get_classifier().codes)
+        key = (id(ledger), with_fees)
+
+        if key not in self.plotted_rows or self.plotted_rows[key][0] is not ledger:
+            if with_fees:  # all but funds transfers, see deal_id_plotted
+                rows = ledger.rows(TypeCode.ORDER, TypeCode.UNDEFINED, *FEE_CODES)
+            else:  # only trades, see trades_plotted
+                rows = ledger.rows(TypeCode.ORDER)
+
+            # keep only rows of ledgers still in use
+            in_use = [id(kept) for _, _, kept in self.ledgers.values()]
+            self.plotted_rows = {
+                k: v for k, v in self.plotted_rows.items() if k[0] in in_use
+            }
+            self.plotted_rows[key] = (ledger, rows)
+
+        return self.plotted_rows[key]
 
     def update_filter(self, filtered_dict):
         """
@@ -2601,7 +2883,7 @@ class ReportToolGUI(QtWidgets.QMainWindow):
 
         if result == 1:
             try:
-                self.data_exporter.export(self.widget_pos)
+                self.data_exporter.export(self.transactions_model)
                 self.statusBar().showMessage("Data successfully exported")
 
             except Exception as e:
@@ -3103,6 +3385,16 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         config["gui_pos"] = (self.pos().x(), self.pos().y())
 
         write_config(config)
+        flush_config()  # write now, app is about to quit
+
+        # let comments thread save last edits, it waits for commands forever
+        comments_thread = getattr(self, "comments_thread", None)
+        if comments_thread is not None and comments_thread.isRunning():
+            comments_thread.stop()
+
+        requested, done = config_write_stats()
+        msg = "Config written %d times for %d changes" % (done, requested)
+        self.logger_debug.log(logging.DEBUG, msg)
 
         self.close()
 
@@ -3116,20 +3408,30 @@ class ReportToolGUI(QtWidgets.QMainWindow):
         self.ls_client.delete(self.pos_table)
 
         self.ls_client.destroy()
+        self.close_acc_dispatcher()
 
         del (
             self.balance_table,
             self.pos_table,
             self.ls_client,
             self.pos_update_sig,
-            self.acc_update_sig,
         )
 
         msg = "Logging out..."
         self.logger_info.log(logging.INFO, msg)
 
-        # request a logout
-        logout_reply = self.session.logout()
+        # request a logout, requests pending are dropped
+        self.close_async_session()
+        self.open_async_session()
+        self.async_caller.call(self.async_session.logout(), self.on_logged_out)
+
+    def on_logged_out(self, logout_reply):
+        """
+        Called with the reply of the logout. If
+        successful clear GUI and disable interaction
+
+        :param logout_reply: reply of :any:`IGAPI.logout`
+        """
 
         # request failed
         if type(logout_reply) == APIError:
@@ -3138,13 +3440,17 @@ class ReportToolGUI(QtWidgets.QMainWindow):
             return
 
         else:
+            self.close_async_session()  # nothing is sent after logout
+            self.reconcile_timer.stop()
+            self.comments_thread.stop()
+            self.session.close()
+
             # display and log a msg
             msg = "Not connected"
             self.logger_info.log(logging.INFO, msg)
             self.statusBar().showMessage(msg)
 
-            for i in range(self.widget_pos.rowCount()):
-                self.widget_pos.removeRow(0)  ## remove rows
+            self.transactions_model.clear()  ## remove rows
 
             for key in self.dict_summary_labels.keys():
                 self.dict_summary_labels[key].setText(key + ": ")  ## clear labels
@@ -1,37 +1,55 @@
 import logging
 import re
-import time
+import sqlite3
 import traceback
-from collections import OrderedDict, defaultdict
-from decimal import Decimal, DivisionByZero
-from typing import Dict, List, Text
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Final, List, Sequence
 
 from PyQt5 import QtCore
 
+from report_tool.calculate.classify import get_classifier
+from report_tool.communications.history_fetcher import fetch_history, parse_date_range
 from report_tool.communications.ig_rest_api import APIError
-from report_tool.qt.functions import (
-    format_market_name,
-    read_comment,
-    read_ig_config,
-    write_comments,
+from report_tool.communications.transaction_store import (
+    TransactionStore,
+    sync_transactions,
 )
-from report_tool.utils.settings import read_config
+from report_tool.qt.functions import format_market_name
+from report_tool.utils.comment_store import CommentStore
+from report_tool.utils.settings import get_settings, subscribe_config
 
 RE_FLOAT = re.compile(r"[+-]? *(?:\d+(?:\.|,\d*)?\.*\d+)(?:[eE][+-]?\d+)?")
 RE_DATE = re.compile(r"/(.*?)$")
 
 
+def parse_pnl(str_pnl):
+    """
+    Extract the amount of a pnl sent by IG, e.g "E-1,234.5"
+
+    :param str_pnl: string, alphanumeric pnl
+    """
+
+    return Decimal(RE_FLOAT.search(str_pnl).group().replace(",", ""))
+
+
 class TransactionThread(QtCore.QThread):
 
     """Create a thread for get the transaction of the given period"""
 
     transaction_received = QtCore.pyqtSignal(object)  # create a finish signal
+    transaction_progress = QtCore.pyqtSignal(str)  # progress of requests
 
-    def __init__(self, session, transaction_queue, result_handler, parent=None):
+    def __init__(
+        self, session, transaction_queue, result_handler, parent=None, store_path=None
+    ):
         """
         :param session: :any:`IGAPI` instance
         :param transaction_queue: Queue
         :result_handler: classMainWindow.update_results
+        :param store_path: Path of the transactions store,
+                           see :any:`TransactionStore`
         """
 
         QtCore.QThread.__init__(self, parent)
@@ -45,6 +63,28 @@ class TransactionThread(QtCore.QThread):
         self.logger_debug = logging.getLogger("ReportTool_debug.IGAPI")
         self.logger_info = logging.getLogger("ReportTool_info.IGAPI")
 
+        # transactions already received, opened on first request
+        self._store_path = store_path
+        self._store = None
+        self._store_unusable = False
+
+    @property
+    def store(self):
+        """
+        Store of the transactions already received, so that
+        only missing days are requested. Opened on first use,
+        None if it can't be opened
+        """
+
+        if self._store is None and not self._store_unusable:
+            try:
+                self._store = TransactionStore(self._store_path)
+            except (OSError, sqlite3.Error):
+                self.logger_debug.log(logging.ERROR, traceback.format_exc())
+                self._store_unusable = True
+
+        return self._store
+
     def run(self):
         """
         Send a request for the choosen dates in transactions dict.
@@ -65,7 +105,7 @@ class TransactionThread(QtCore.QThread):
             msg = "Retrieving transactions from %s to %s..." % (start, end)
             self.logger_info.log(logging.INFO, msg)
 
-            transactions_result = self.session.get_transactions(date_range)
+            transactions_result = self.fetch_transactions(date_range)
 
             # requests failed
             if type(transactions_result) == APIError:
@@ -73,10 +113,6 @@ class TransactionThread(QtCore.QThread):
                 return
 
             else:
-                nb_transactions = len(transactions_result["transactions"])
-                msg = "Received %d transactions" % (nb_transactions)
-
-                self.logger_info.log(logging.INFO, msg)
                 self.logger_info.log(logging.INFO, "Treating data...")
 
                 try:
@@ -86,6 +122,37 @@ class TransactionThread(QtCore.QThread):
                     self.transaction_received.emit("An error occured: see log file")
         return
 
+    def fetch_transactions(self, date_range):
+        """
+        Get transactions of date_range. Only days missing in
+        store are requested, if account is known
+
+        :param date_range: string formatted like /dd-MM-yyyy/dd-MM-yyyy
+        """
+
+        if self.store is not None and self.session._get_account_id():
+            try:
+                return sync_transactions(
+                    self.session, self.store, date_range, self.report_progress
+                )
+            except sqlite3.Error:  # store unusable, request everything
+                self.logger_debug.log(logging.ERROR, traceback.format_exc())
+
+        start, end = parse_date_range(date_range)
+        return fetch_history(self.session, start, end, self.report_progress)
+
+    def report_progress(self, nb_done, nb_windows):
+        """
+        Emit a message each time a window of history is received.
+        Called from the requests threads, signal is queued to gui
+
+        :param nb_done: int, number of windows received
+        :param nb_windows: int, number of windows requested
+        """
+
+        msg = "Retrieving transactions: %d/%d months received" % (nb_done, nb_windows)
+        self.transaction_progress.emit(msg)
+
     def treat_data(self, transactions_result):
         """
         Treat the dict received from IG and build a more
@@ -104,7 +171,8 @@ class TransactionThread(QtCore.QThread):
                         ....
                         }
 
-        :param transactions_result: dict returns by IG
+        :param transactions_result: dict returns by IG, transactions
+                                    can be any iterable
         """
 
         dict_transaction_headers = [
@@ -120,15 +188,9 @@ class TransactionThread(QtCore.QThread):
             "pnl",
         ]
 
-        # load initial capital and config
-        config = read_config()
-        start_capital = Decimal(config["start_capital"])
-        symbol = config["currency_symbol"]
-        auto_calculate = config["auto_calculate"]
+        # load config
+        config = get_settings()
         aggregate = config["aggregate"]
-        capital = start_capital
-
-        ig_config = read_ig_config()
 
         """
         ig sends keywords to identify transactions type known
@@ -136,75 +198,56 @@ class TransactionThread(QtCore.QThread):
         if transaction type is unknown log it
         """
 
-        kw_order = ig_config["keyword"]["ORDER"]
-        kw_fees = ig_config["keyword"]["FEES"]
-        kw_cashin = ig_config["keyword"]["CASH_IN"]
-        kw_cashout = ig_config["keyword"]["CASH_OUT"]
-        kw_transfer = ig_config["keyword"]["TRANSFER"]
+        classifier = get_classifier()
 
         """
         fill a "buffer" dict with dealId as key. each key is
-        a list with all transactions attached to that dealId
+        a list with all transactions attached to that dealId.
+        transactions are read once, they can be streamed
         """
 
-        transactions_dict2 = defaultdict(list)
-        for transaction in transactions_result["transactions"]:
-            deal_ref = transaction["reference"]
-            transactions_dict2[deal_ref].append(transaction)
-
         transactions_dict = OrderedDict()
+        nb_transactions = 0
         for transaction in transactions_result["transactions"]:
-            deal_ref = transaction["reference"]
-
-            if deal_ref not in transactions_dict:
-                transactions_dict.setdefault(deal_ref, [{}])  # build dict
-                transactions_dict[deal_ref][0] = transaction
+            transactions_dict.setdefault(transaction["reference"], []).append(
+                transaction
+            )
+            nb_transactions += 1
 
-            else:
-                transactions_dict[deal_ref].append(transaction)
+        msg = "Received %d transactions" % (nb_transactions)
+        self.logger_info.log(logging.INFO, msg)
 
         result_dict = OrderedDict()
 
-        # FIXME: dict .keys() order was not deterministic prior to 3.6. Reviewing is needed
         # iterate over each deal_ref from older to newer
         for deal_ref in reversed(transactions_dict.keys()):
+            deal_transactions = transactions_dict[deal_ref]
+
             total_pnl = Decimal()
             total_points = Decimal()
             total_size = Decimal()
 
             # iterate over each event that concerns deal_ref
-            for count, deal_transaction in enumerate(transactions_dict[deal_ref]):
+            for count, deal_transaction in enumerate(deal_transactions):
                 # get the transaction type (order, fees...)
-                transaction_type = transactions_dict[deal_ref][count]["transactionType"]
-
-                market = transactions_dict[deal_ref][count]["instrumentName"]
+                transaction_type = deal_transaction["transactionType"]
+                market_name = format_market_name(deal_transaction["instrumentName"])
+                date = deal_transaction["date"]
 
-                market_name = format_market_name(market)
-
-                if transaction_type in kw_order:  # transaction is a trade
-                    # TODO: create sub-methods
-                    open_level = Decimal(
-                        transactions_dict[deal_ref][count]["openLevel"]
-                    )
-                    close_level = Decimal(
-                        transactions_dict[deal_ref][count]["closeLevel"]
-                    )
-                    size = Decimal(transactions_dict[deal_ref][count]["size"])
-                    str_pnl = transactions_dict[deal_ref][count]["profitAndLoss"]
-
-                    # as the pnl is an alphanumeric value extract the float part
-                    pnl = Decimal(RE_FLOAT.findall(str_pnl)[0].replace(",", ""))
+                if classifier.is_order(transaction_type):  # transaction is a trade
+                    open_level = Decimal(deal_transaction["openLevel"])
+                    close_level = Decimal(deal_transaction["closeLevel"])
+                    size = Decimal(deal_transaction["size"])
+                    pnl = parse_pnl(deal_transaction["profitAndLoss"])
 
                     direction = "SELL" if size < 0 else "BUY"
 
-                    date = transactions_dict[deal_ref][count]["date"]
-
                     """
                     we suppose that the first close level
                     in the list is the last that occurred
                     """
 
-                    final_level = Decimal(transactions_dict[deal_ref][0]["closeLevel"])
+                    final_level = Decimal(deal_transactions[0]["closeLevel"])
 
                     """
                     calculate points won/lost. it"s done according to
@@ -218,7 +261,7 @@ class TransactionThread(QtCore.QThread):
                     )
 
                     # if aggregate cumulate size, points, pnl
-                    if aggregate == 2:  # FIXME: Nani???
+                    if aggregate == 2:
                         total_points += points
                         total_pnl += pnl
                         total_size += size
@@ -228,28 +271,17 @@ class TransactionThread(QtCore.QThread):
                         total_pnl = pnl
                         total_size = size
 
-                elif transaction_type in kw_fees:  # TODO: create sub-methods
+                elif classifier.is_fee(transaction_type):
                     """
                     depending of market name change
                     transaction type for a clearer one
                     """
 
-                    if True in [kw in market_name.lower() for kw in kw_cashin]:
-                        transaction_type = "CASHIN"
-
-                    elif True in [kw in market_name.lower() for kw in kw_cashout]:
-                        transaction_type = "CASHOUT"
-
-                    elif True in [kw in market_name.lower() for kw in kw_transfer]:
-                        transaction_type = "TRANSFER"
-
-                    else:
-                        transaction_type = transaction_type
+                    transaction_type = (
+                        classifier.funds_type(market_name) or transaction_type
+                    )
 
-                    date = transactions_dict[deal_ref][count]["date"]
-                    str_pnl = transactions_dict[deal_ref][count]["profitAndLoss"]
-                    re_float = r"[+-]? *(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"
-                    total_pnl = Decimal(RE_FLOAT.findall(str_pnl)[0])
+                    total_pnl = parse_pnl(deal_transaction["profitAndLoss"])
 
                     direction = "-"
                     open_level = "-"
@@ -257,56 +289,10 @@ class TransactionThread(QtCore.QThread):
                     final_level = "-"
                     total_points = "-"
 
-                # elif transaction_type in kw_cashin and\
-                # True in [kw in market_name.lower() for kw in kw_cashin]:
-                #         date      = transactions_dict[deal_ref][count]["date"]
-                #         str_pnl   = transactions_dict[deal_ref][count]["profitAndLoss"]
-                #         re_float  = r"[+-]? *(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"
-                #         total_pnl = float(RE_FLOAT.findall(str_pnl)[0])
-
-                #         direction        = "-"
-                #         open_level       = "-"
-                #         total_size       = "-"
-                #         final_level      = "-"
-                #         total_points     = "-"
-                #         transaction_type = "CASHIN"    # change transaction type with clearer one
-
-                # elif transaction_type in kw_cashout and\
-                # True in [kw in market_name.lower() for kw in kw_cashout]:
-                #         date      = transactions_dict[deal_ref][count]["date"]
-                #         str_pnl   = transactions_dict[deal_ref][count]["profitAndLoss"]
-                #         re_float  = r"[+-]? *(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"
-                #         total_pnl = float(RE_FLOAT.findall(str_pnl)[0])
-
-                #         direction        = "-"
-                #         open_level       = "-"
-                #         total_size       = "-"
-                #         final_level      = "-"
-                #         total_points     = "-"
-                #         transaction_type = "CASHOUT"    # change transaction type with clearer one
-
-                # elif transaction_type in kw_transfer and\
-                # True in [kw in market_name.lower() for kw in kw_transfer]:
-                #         date      = transactions_dict[deal_ref][count]["date"]
-                #         str_pnl   = transactions_dict[deal_ref][count]["profitAndLoss"]
-                #         re_float  = r"[+-]? *(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"
-                #         total_pnl = float(RE_FLOAT.findall(str_pnl)[0])
-
-                #         direction        = "-"
-                #         open_level       = "-"
-                #         total_size       = "-"
-                #         final_level      = "-"
-                #         total_points     = "-"
-                #         transaction_type = "TRANSFER"    # change transaction type with clearer one
-
-                else:  # TODO: create sub-methods
+                else:
                     msg = "%s is undefined type" % transaction_type
                     self.logger_debug.log(logging.ERROR, msg)
 
-                    date = transactions_dict[deal_ref][count]["date"]
-
-                    str_pnl = "-"
-                    re_float = "-"
                     total_pnl = "-"
                     direction = "-"
                     open_level = "-"
@@ -319,10 +305,8 @@ class TransactionThread(QtCore.QThread):
                     )
 
                 try:
-                    # TODO: work on types so total_size can only be Decimal or int.
-                    #       Can currently be str('-').
                     points_lot = round(total_points / abs(total_size), 2)
-                except DivisionByZero:
+                except (TypeError, ArithmeticError):  # "-" or size of 0
                     points_lot = "-"
 
                 infos_list = [
@@ -343,25 +327,13 @@ class TransactionThread(QtCore.QThread):
                 of transaction to the deal_ref this is done to simulate
                 a different key. Therefore the results dict will contains
                 a key for each transaction even if it concerns the same trade.
+                If aggregate, the last transaction holds the totals
                 """
 
-                if aggregate != 2:
-                    deal_ref_nb = deal_ref + "_" + str(count)
-                    result_dict.setdefault(deal_ref_nb, {})
-
-                    for count, header in enumerate(
-                        dict_transaction_headers
-                    ):  # fill dict
-                        result_dict[deal_ref_nb][header] = infos_list[count]
-
-                else:
-                    deal_ref_nb = deal_ref + "_0"  # don"t increment deal ref
-                    result_dict.setdefault(deal_ref_nb, {})
-
-                    for count, header in enumerate(
-                        dict_transaction_headers
-                    ):  # fill dict
-                        result_dict[deal_ref_nb][header] = infos_list[count]
+                deal_ref_nb = deal_ref + "_" + str(count if aggregate != 2 else 0)
+                result_dict[deal_ref_nb] = dict(
+                    zip(dict_transaction_headers, infos_list)
+                )
 
         msg = "Done"
         self.logger_info.log(logging.INFO, msg)
@@ -413,24 +385,49 @@ class TransactionThread(QtCore.QThread):
         return points
 
 
-class UpdateCommentsThread(QtCore.QThread):
+@dataclass(frozen=True, slots=True)
+class LookupComment:
+    """Send the comment of a trade clicked on graph, empty if none."""
+
+    deal_id: str
+
+
+@dataclass(frozen=True, slots=True)
+class LookupComments:
+    """Send the comments found for the trades plotted, by deal id."""
+
+    deal_ids: Sequence[str]
+
+
+@dataclass(frozen=True, slots=True)
+class SaveComment:
+    """Create, update or delete (if its text is empty) a comment."""
+
+    deal_id: str
+    comment: List  # [text, state of "show on graph" checkbox]
 
-    """
-    Thread to update comment. It runs continuously
-    as soon as app is started. Read comment file and
-    wait for item in queue. Comments are stored as list, e.g
-    comment = ["blabla", 0], the second index (int) is used
-    to show(if = 2) or not(if = 0) the comment on graph
 
+_STOP_COMMENTS: Final = object()  # put in queue by UpdateCommentsThread.stop
 
-    --If item is a string (when user click on graph) looks for a
-    comment matching the deal_id. if nothing found send an empty
+
+class UpdateCommentsThread(QtCore.QThread):
+
+    """
+    Thread to update comment. It runs as soon as user is
+    connected and blocks until a command is put in queue,
+    comments are read and saved in a :any:`CommentStore`.
+    Comments are stored as list, e.g comment = ["blabla", 0],
+    the second index (int) is used to show(if = 2) or
+    not(if = 0) the comment on graph
+
+    --:class:`LookupComment` (when user click on graph) looks for
+    a comment matching the deal_id. if nothing found send an empty
     string else send comment found.
-    --If item is a dict means that user is editing comment,
-    update or create key and save file.
-    --If item is a list, means that new dta has been plotted.
-    list contains all new deal id. For each deal_id search
-    for a comment. send a dict with all comments found
+    --:class:`SaveComment` means that user is editing comment,
+    update, create or delete the comment.
+    --:class:`LookupComments` means that new data has been plotted.
+    For each deal_id search for a comment. send a dict with all
+    comments found
 
     See update_trade_details and update_comments functions
     in classReportToolGUI to see how thread is managed.
@@ -438,107 +435,99 @@ class UpdateCommentsThread(QtCore.QThread):
 
     comment_found = QtCore.pyqtSignal(object)  # signal use to send comment
 
-    def __init__(self, queue, result_handler, parent=None):
+    def __init__(self, queue, result_handler, parent=None, store=None):
         """
-        :param transaction_queue: Queue
+        :param queue: Queue of commands
         :param result_handler: classMainWindow.update_comments
+        :param store: :any:`CommentStore`, the default one if None
         """
 
         QtCore.QThread.__init__(self, parent)
         self.comments_queue = queue
         self.comment_found.connect(result_handler)
+        self.store = store if store is not None else CommentStore()
 
-    def run(self):
-        """
-        Thread is continuously running. maybe set it as deamon
-        Waiting element in queue and depending of type received
-        update comments. see in line comments below
+        self.logger_debug = logging.getLogger("ReportTool_debug.IGAPI")
+
+        self.handlers = {
+            LookupComment: self.lookup_comment,
+            LookupComments: self.lookup_comments,
+            SaveComment: self.save_comment,
+        }
+
+        # follow user changes instead of reading config in loop
+        self.last_usr = get_settings()["last_usr"]
+        self.unsubscribe_config = subscribe_config(["last_usr"], self.on_config_changed)
+
+    def on_config_changed(self, changes):
         """
+        Called when a subscribed key of config changes
 
-        config = read_config()
-        last_usr = config["last_usr"]
+        :param changes: dict with new values of changed keys
+        """
 
-        while True:
-            while not self.comments_queue.empty():  # run until queue is empty
-                comments = read_comment()  # read saved comments
+        self.last_usr = changes["last_usr"]
 
-                # pop empty user key, when first start or error while loading
-                try:
-                    comments.pop("", None)  #
-                except KeyError:
-                    pass
+    def lookup_comment(self, command):
+        """
+        User has clicked on graph. We know which deal_id is
+        concerned so just send the comment as list
 
-                try:
-                    usr_comments = comments[last_usr]
-                    for deal_id in usr_comments.keys():  # delete empty comments
-                        if usr_comments[deal_id][0] == "":
-                            usr_comments.pop(deal_id, None)
+        :param command: LookupComment
+        """
 
-                except KeyError:
-                    usr_comments = {}  # no comment yet for this user
+        saved_comment = self.store.get(self.last_usr, command.deal_id)
 
-                object_in_queue = self.comments_queue.get()  # get item in queue
+        if saved_comment is None:  # no comment found
+            saved_comment = ["", 0]
 
-                if isinstance(object_in_queue, Text):  # means it a deal_id
-                    """
-                    when thread reveives a string it means the user
-                    has clicked on graph. We know which deal_id is
-                    concerned so just send the comment as list
-                    """
+        self.comment_found.emit(saved_comment)
 
-                    # search for comment at this deal_id
-                    try:
-                        saved_comment = usr_comments[object_in_queue]
-                        self.comment_found.emit(saved_comment)  # emit comment found
+    def lookup_comments(self, command):
+        """
+        Result has been updated, sends a dict with all
+        deal_id found as keys and comment as values.
 
-                    except KeyError:  # no comment found
-                        self.comment_found.emit(["", 0])  # emit empty string
+        :param command: LookupComments
+        """
 
-                # means new data plotted, show all comments found
-                elif isinstance(object_in_queue, List):
-                    """
-                    When thread reveives a list it means result has
-                    been updated, so for each deal id plotted try to
-                    found a comment. if success sends a dict with all
-                    deal_id found as keys and comment as values.
-                    """
+        dict_to_send = self.store.get_many(self.last_usr, command.deal_ids)
+        self.comment_found.emit(dict_to_send)
 
-                    dict_to_send = {}
+    def save_comment(self, command):
+        """
+        User is editing a comment or creating a new one
 
-                    for deal_id in object_in_queue:
-                        # dict_to_send[deal_id] = ['']z
+        :param command: SaveComment
+        """
 
-                        # search for comment at this deal_id
-                        try:
-                            saved_comment = usr_comments[deal_id]
-                            comment_to_send = {deal_id: saved_comment}
-                            dict_to_send[deal_id] = saved_comment
+        self.store.put(self.last_usr, command.deal_id, command.comment)
 
-                        except KeyError as KE:  # no comment found
-                            # print(KE)
-                            # comment_to_send = {deal_id : ['', 0]}
-                            # dict_to_send[deal_id] = ['', 0]
-                            continue
+    def run(self):
+        """
+        Wait for commands in queue and run them until
+        :meth:`stop` is called. A failing command is
+        logged and does not stop the thread
+        """
 
-                    self.comment_found.emit(dict_to_send)
+        while True:
+            command = self.comments_queue.get()  # blocks until a command comes
 
-                # means a new comment has to be saved
-                elif isinstance(object_in_queue, Dict):
-                    """
-                    When thread received a dict, user is
-                    editing a comment or creating a new one
-                    """
+            if command is _STOP_COMMENTS:
+                break
 
-                    # FIXME: dict .keys() order was not deterministic prior to 3.6. Reviewing is needed
-                    # get deal_id and comment
-                    deal_id_to_save = str(list(object_in_queue.keys())[0])
-                    comment_to_save = object_in_queue[deal_id_to_save]
+            try:
+                self.handlers[type(command)](command)
 
-                    usr_comments[
-                        deal_id_to_save
-                    ] = comment_to_save  # build dict to save
-                    comments[last_usr] = usr_comments
+            except Exception:
+                self.logger_debug.log(logging.ERROR, traceback.format_exc())
 
-                    write_comments(comments)
+    def stop(self):
+        """
+        Run the commands already queued, then stop
+        the thread and wait for it to finish
+        """
 
-            time.sleep(0.05)
+        self.comments_queue.put(_STOP_COMMENTS)
+        self.wait()
+        self.unsubscribe_config()
@@ -0,0 +1,191 @@
+""" Model and delegate of the transactions table"""
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+# role of the sign of a transaction's pnl (-1, 0 or 1), used for colors
+PNL_SIGN_ROLE = QtCore.Qt.UserRole
+
+
+class TransactionsModel(QtCore.QAbstractTableModel):
+
+    """
+    Read-only model of the transactions shown in the table. Holds
+    the transactions dict and the rows of its ledger to show, cells
+    are formatted only when the view asks for them, so only the
+    visible rows are formatted. Lot size and pnl can be masked
+    (screenshot)
+    """
+
+    def __init__(self, headers, columns, parent=None):
+        """
+        :param headers: list of string, title of columns
+        :param columns: list of string, key in transactions of each column
+        :param parent: QObject
+        """
+
+        super(TransactionsModel, self).__init__(parent)
+
+        self._headers = list(headers)
+        self._columns = list(columns)
+
+        self._transactions = {}
+        self._deal_ids = ()  # deal_id of all transactions
+        self._rows = []  # idx in deal_ids of each row
+        self._appended = []  # deal_id of rows appended, see append_transaction
+        self._currency_symbol = ""
+
+        self.hide_size = False
+        self.hide_pnl = False
+
+    def set_transactions(self, transactions, deal_ids, rows, currency_symbol):
+        """
+        Replace the transactions shown
+
+        :param transactions: OrderedDict() with transactions
+        :param deal_ids: tuple, deal_id of transactions, see TradeLedger
+        :param rows: array of int, idx in deal_ids of each row to show
+        :param currency_symbol: string, symbol added to pnl
+        """
+
+        self.beginResetModel()
+        self._transactions = transactions
+        self._deal_ids = deal_ids
+        self._rows = rows
+        self._appended = []
+        self._currency_symbol = currency_symbol
+        self.endResetModel()
+
+    def append_transaction(self, deal_id):
+        """
+        Add a row after the others, e.g. for a deal closed
+        after the transactions were set. The transaction must
+        already be in the transactions dict
+
+        :param deal_id: string
+        """
+
+        row = self.rowCount()
+
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._appended.append(deal_id)
+        self.endInsertRows()
+
+    def clear(self):
+        """Remove all rows"""
+
+        self.set_transactions({}, (), [], self._currency_symbol)
+
+    def set_masks(self, hide_size, hide_pnl):
+        """
+        Mask or show lot size and pnl. Only the masked
+        columns are repainted, nothing is formatted again
+
+        :param hide_size: boolean, show "-" instead of lot size
+        :param hide_pnl: boolean, show "--" instead of pnl
+        """
+
+        if (hide_size, hide_pnl) == (self.hide_size, self.hide_pnl):
+            return
+
+        self.hide_size = hide_size
+        self.hide_pnl = hide_pnl
+
+        if self.rowCount():
+            for column in ("open_size", "pnl"):
+                idx = self._columns.index(column)
+                self.dataChanged.emit(
+                    self.index(0, idx),
+                    self.index(self.rowCount() - 1, idx),
+                    [QtCore.Qt.DisplayRole],
+                )
+
+    def deal_id(self, row):
+        """Return deal_id of a row"""
+
+        if row < len(self._rows):
+            return self._deal_ids[self._rows[row]]
+
+        return self._appended[row - len(self._rows)]
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """Reimplement base method"""
+
+        return 0 if parent.isValid() else len(self._rows) + len(self._appended)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        """Reimplement base method"""
+
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """Reimplement base method"""
+
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return self._headers[section]
+
+        return super(TransactionsModel, self).headerData(section, orientation, role)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Reimplement base method, format the cell asked"""
+
+        if not index.isValid():
+            return None
+
+        if role == QtCore.Qt.TextAlignmentRole:
+            return QtCore.Qt.AlignCenter
+
+        if role not in (QtCore.Qt.DisplayRole, PNL_SIGN_ROLE):
+            return None
+
+        transaction = self._transactions[self.deal_id(index.row())]
+
+        if role == PNL_SIGN_ROLE:
+            pnl = transaction["pnl"]
+            return -1 if pnl < 0 else 1 if pnl > 0 else 0
+
+        column = self._columns[index.column()]
+
+        if column == "pnl":
+            if self.hide_pnl:
+                return f"-- {self._currency_symbol}"
+            return f"{transaction[column]}{self._currency_symbol}"
+
+        elif column == "open_size" and self.hide_size:
+            return "-"
+
+        return f"{transaction[column]}"
+
+
+class ProfitLossDelegate(QtWidgets.QStyledItemDelegate):
+
+    """
+    Paint the text of a row with the profit, flat
+    or loss color, according to the sign of its pnl
+    """
+
+    def __init__(self, parent=None):
+        super(ProfitLossDelegate, self).__init__(parent)
+
+        self._colors = {}  # pnl sign: QColor
+
+    def set_colors(self, profit_color, flat_color, loss_color):
+        """
+        :param profit_color: string, color of winning trades
+        :param flat_color: string, color of trades at breakeven
+        :param loss_color: string, color of losing trades
+        """
+
+        self._colors = {
+            1: QtGui.QColor(profit_color),
+            0: QtGui.QColor(flat_color),
+            -1: QtGui.QColor(loss_color),
+        }
+
+    def initStyleOption(self, option, index):
+        """Reimplement base method"""
+
+        super(ProfitLossDelegate, self).initStyleOption(option, index)
+
+        color = self._colors.get(index.data(PNL_SIGN_ROLE))
+        if color is not None:
+            option.palette.setColor(QtGui.QPalette.Text, color)
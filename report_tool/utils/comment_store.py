@@ -0,0 +1,151 @@
+"""On-disk store of the comments users write about their trades.
+
+Comments are kept per user and deal id in SQLite, a change writes a
+single row instead of rewriting every comment of every user. Comments
+of comments.json, where they used to be saved, are imported once.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Final, Iterable, List
+
+from report_tool.utils.constants import get_comments_file, get_database_file
+from report_tool.utils.json_utils import RoundTripDecoder
+
+# a comment is [text, state of the "show on graph" checkbox (0 or 2)]
+Comment = List
+
+_SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS comments (
+    user TEXT NOT NULL,
+    deal_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    show_on_graph INTEGER NOT NULL,
+    PRIMARY KEY (user, deal_id)
+);
+CREATE TABLE IF NOT EXISTS comment_imports (
+    source TEXT PRIMARY KEY
+);
+"""
+
+logger = logging.getLogger("ReportTool_debug.IGAPI")
+
+
+class CommentStore:
+    """SQLite store of comments, keyed by user and deal id.
+
+    Comments of a user are loaded in memory the first time they are
+    looked up, then lookups don't touch the database. An empty comment
+    is not stored.
+    """
+
+    def __init__(self, path: Path | None = None, legacy_file: Path | None = None):
+        """
+        Args:
+            path: database file, defaults to ``get_database_file()``.
+            legacy_file: json file to import comments from, defaults
+                to ``get_comments_file()``.
+        """
+        self._path = path or get_database_file()
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Comment]] = {}
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+        self._import_json(legacy_file or get_comments_file())
+
+    def _connect(self) -> closing:
+        return closing(sqlite3.connect(self._path))
+
+    def _import_json(self, legacy_file: Path) -> None:
+        """Import comments of a json file, once.
+
+        The file is left as is, so it can be kept as a backup.
+        """
+        source = str(legacy_file.resolve())
+
+        with self._lock, self._connect() as conn, conn:
+            imported = conn.execute(
+                "SELECT 1 FROM comment_imports WHERE source = ?", (source,)
+            ).fetchone()
+
+            if imported is not None or not legacy_file.exists():
+                return
+
+            try:
+                with legacy_file.open("r") as f:
+                    saved_comments = json.load(f, cls=RoundTripDecoder)
+            except (OSError, ValueError):
+                logger.log(logging.ERROR, f"Cannot import comments of {source}")
+                saved_comments = {}
+
+            rows = [
+                (user, str(deal_id), str(comment[0]), int(comment[1]))
+                for user, usr_comments in saved_comments.items()
+                if user  # empty user key, when first start or error while loading
+                for deal_id, comment in usr_comments.items()
+                if comment[0] != ""
+            ]
+
+            # comments already in the store are more recent
+            conn.executemany("INSERT OR IGNORE INTO comments VALUES (?, ?, ?, ?)", rows)
+            conn.execute("INSERT INTO comment_imports VALUES (?)", (source,))
+
+    def _user_comments(self, user: str) -> Dict[str, Comment]:
+        """Comments of a user by deal id, loaded at first call."""
+        try:
+            return self._index[user]
+        except KeyError:
+            pass
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT deal_id, text, show_on_graph FROM comments WHERE user = ?",
+                (user,),
+            ).fetchall()
+
+        usr_comments = {deal_id: [text, state] for deal_id, text, state in rows}
+        return self._index.setdefault(user, usr_comments)
+
+    def get(self, user: str, deal_id: str) -> Comment | None:
+        """Comment of a deal, None if there is none."""
+        with self._lock:
+            comment = self._user_comments(user).get(deal_id)
+
+        return None if comment is None else list(comment)
+
+    def get_many(self, user: str, deal_ids: Iterable[str]) -> Dict[str, Comment]:
+        """Comments found for a list of deals, keyed by deal id."""
+        with self._lock:
+            usr_comments = self._user_comments(user)
+
+            return {
+                deal_id: list(usr_comments[deal_id])
+                for deal_id in deal_ids
+                if deal_id in usr_comments
+            }
+
+    def put(self, user: str, deal_id: str, comment: Comment) -> None:
+        """Create, update or delete (if its text is empty) a comment."""
+        text, state = str(comment[0]), int(comment[1])
+
+        with self._lock, self._connect() as conn, conn:
+            usr_comments = self._user_comments(user)
+
+            if text == "":
+                conn.execute(
+                    "DELETE FROM comments WHERE user = ? AND deal_id = ?",
+                    (user, deal_id),
+                )
+                usr_comments.pop(deal_id, None)
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?)",
+                    (user, deal_id, text, state),
+                )
+                usr_comments[deal_id] = [text, state]
@@ -83,3 +83,15 @@ def get_export_dir() -> Path:
 def get_config_file() -> Path:
     """Get the config file."""
     return get_root_project_dir() / "config.json"
+
+
+@lru_cache()
+def get_ig_config_file() -> Path:
+    """Get the IG config file, with urls and transaction keywords."""
+    return get_root_project_dir() / "ig_config.json"
+
+
+@lru_cache()
+def get_database_file() -> Path:
+    """Get the database file, where transactions are stored."""
+    return get_root_project_dir() / "report_tool.db"
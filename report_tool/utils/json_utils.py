@@ -1,9 +1,10 @@
+import codecs
 import json
 import logging
 from datetime import date, datetime, time
 from decimal import Decimal
 from pathlib import Path, PosixPath
-from typing import Any, Callable, Mapping, TypedDict, TypeVar
+from typing import Any, Callable, Iterable, Iterator, Mapping, TypedDict, TypeVar
 
 from PyQt5.QtCore import QByteArray
 
@@ -107,6 +108,126 @@ class RoundTripDecoder(json.JSONDecoder):
         return obj
 
 
+class _JsonStream:
+    """Text decoded from chunks, read with ``json.JSONDecoder.raw_decode``."""
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, chunks: Iterable[bytes | str]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        # json.loads shares equal keys within a document, raw_decode only
+        # within a value: keep one copy of each key for the whole stream
+        keys: dict[str, str] = {}
+        self._decoder = json.JSONDecoder(
+            object_pairs_hook=lambda pairs: {
+                keys.setdefault(key, key): value for key, value in pairs
+            }
+        )
+        self._buffer = ""
+        self._pos = 0
+        self._ended = False
+
+    def _read_more(self) -> bool:
+        """Append the next chunk to the buffer, dropping what was consumed."""
+        if self._ended:
+            return False
+
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            chunk, self._ended = b"", True
+
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk, final=self._ended)
+
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non whitespace character, ``""`` at the end of the stream."""
+        while True:
+            while self._pos < len(self._buffer):
+                if self._buffer[self._pos] not in self._WHITESPACE:
+                    return self._buffer[self._pos]
+                self._pos += 1
+
+            if not self._read_more():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(
+                f"Expecting {char!r}, found {found!r}", self._buffer, self._pos
+            )
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the next value, reading chunks until it is complete.
+
+        A value at the very end of the buffer might be truncated (a number
+        cut in two chunks), it's only accepted once the stream has ended.
+        """
+        self.peek()
+
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+
+            if end < len(self._buffer) or not self._read_more():
+                self._pos = end
+                return obj
+
+
+def iter_json_array(chunks: Iterable[bytes | str], key: str) -> Iterator[Any]:
+    """Yield items of the array ``key`` of a JSON object, one at a time.
+
+    The document is read from chunks as they come, so only the current
+    item and one chunk are held in memory, never the whole text. Values
+    of other keys are decoded and discarded, reading stops once the
+    array is done.
+
+    Args:
+        chunks: parts of the document, bytes (utf-8) or str.
+        key: name of the array, at the top level of the document.
+
+    Raises:
+        json.JSONDecodeError: the document is not valid JSON.
+        KeyError: the document has no ``key``.
+    """
+    stream = _JsonStream(chunks)
+    stream.expect("{")
+
+    while stream.peek() != "}":
+        name = stream.value()
+        stream.expect(":")
+
+        if name != key:
+            stream.value()
+        else:
+            stream.expect("[")
+            if stream.peek() == "]":
+                return
+
+            while True:
+                yield stream.value()
+
+                if stream.peek() == "]":
+                    return
+                stream.expect(",")
+
+        if stream.peek() == ",":
+            stream.expect(",")
+
+    raise KeyError(key)
+
+
 if __name__ == "__main__":
     data = {
         "name": "Report O'Toole",
@@ -1,11 +1,16 @@
 """Module for settings."""
 
+import atexit
+import logging
+import os
+import threading
 from datetime import date, datetime, time
 from decimal import Decimal
 from enum import StrEnum
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Any, Literal
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Literal, Mapping
 
 from pydantic import BaseModel, Field, validator
 from PyQt5.QtCore import QByteArray
@@ -20,6 +25,10 @@ DATE_FORMAT = "%Y-%m-%d"
 TIME_FORMAT = "%H:%M:%S.%f"
 DATETIME_FORMAT = f"{DATE_FORMAT} {TIME_FORMAT}"
 
+WRITE_DELAY = 0.5  # seconds without write before saving config
+
+logger = logging.getLogger(__name__)
+
 Symbol = Literal["x", "d", "o", "t", "+", "s"]
 
 
@@ -40,6 +49,13 @@ class ScreenshotPrintOptions(StrEnum):
     GRAPH = "Graph"
 
 
+class StreamingTransport(StrEnum):
+    """Enum for the transport of the Lightstreamer session."""
+
+    HTTP = "HTTP"
+    WEBSOCKET = "WebSocket"
+
+
 class WhatToShow(BaseModel):
     """Details about the ``what_to_show`` field."""
 
@@ -93,6 +109,16 @@ class Settings(BaseModel):
     last_usr: str = ""
     dir_out: Path = Field(default_factory=get_screenshots_dir)
 
+    # ------------------ Connection options ------------------
+    pool_size: int = Field(4, description="Connections kept alive")
+    max_retries: int = Field(3, description="Retries on server errors")
+    request_timeout: float = Field(30.0, description="Request timeout (s)")
+    ls_transport: StreamingTransport = Field(
+        default=StreamingTransport.HTTP, description="Streaming transport"
+    )
+    max_refresh_rate: float = Field(10.0, description="Max refreshes per second")
+    record_stream: int = Field(0, description="Record streaming sessions")
+
     # ------------------ Screenshot options ------------------
     shortcut: str = "Enter shortcut"
 
@@ -139,18 +165,209 @@ class Settings(BaseModel):
         }
 
 
+ConfigCallback = Callable[[dict[str, Any]], None]
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only view of a config value, nested dicts included."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _copy(value: Any) -> Any:
+    """Copy dicts and lists of a config, other values are never modified."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+class ConfigService:
+    """Process wide cache of the config file.
+
+    The file is parsed once, then again only when its modification time
+    or size changes (a ``stat`` per access). Components can subscribe to
+    some keys and are called with the new values when they change.
+
+    Writes update the cache at once and are saved ``write_delay`` seconds
+    after the last one, by a timer thread: a burst of writes is a single
+    atomic write of the file.
+    """
+
+    def __init__(self, write_delay: float = WRITE_DELAY) -> None:
+        self._lock = threading.RLock()
+        self._stamp: tuple[int, int] | None = None
+        self._config: dict[str, Any] = {}
+        self._snapshot: Mapping[str, Any] = MappingProxyType({})
+        self._subscribers: list[tuple[frozenset[str], ConfigCallback]] = []
+
+        self._write_delay = write_delay
+        self._write_lock = threading.Lock()  # one thread writes the file
+        self._pending: Settings | None = None
+        self._timer: threading.Timer | None = None
+
+        self.writes_requested = 0
+        self.writes_done = 0
+
+    @staticmethod
+    def _get_stamp() -> tuple[int, int] | None:
+        try:
+            stat = get_config_file().stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _parse(self) -> dict[str, Any]:
+        try:
+            return Settings.parse_file(get_config_file()).dict()
+        except (JSONDecodeError, FileNotFoundError):
+            return Settings().dict()
+
+    def _update(self, stamp: tuple[int, int] | None, config: dict[str, Any]) -> None:
+        """Replace the cached config and notify subscribers of changed keys."""
+        with self._lock:
+            previous = self._config
+            self._stamp = stamp
+            self._config = config
+            self._snapshot = _freeze(config)
+            subscribers = list(self._subscribers)
+
+        if not previous:
+            return
+
+        changed = {key for key in config if config[key] != previous.get(key)}
+        for keys, callback in subscribers:
+            if keys & changed:
+                callback({key: self._snapshot[key] for key in keys & changed})
+
+    def snapshot(self) -> Mapping[str, Any]:
+        """Read-only config, shared by every caller until the file changes."""
+        stamp = self._get_stamp()
+
+        with self._lock:
+            # cache is newer than the file until pending write is saved
+            if self._config and (
+                self._pending is not None
+                or (stamp is not None and stamp == self._stamp)
+            ):
+                return self._snapshot
+
+        self._update(stamp, self._parse())
+        return self._snapshot
+
+    def read(self) -> dict[str, Any]:
+        """Config as a dict the caller can modify and write back."""
+        self.snapshot()
+        with self._lock:
+            return _copy(self._config)
+
+    def write(self, config: dict[str, Any]) -> None:
+        """Update the config, the file is saved later, see :meth:`flush`."""
+        settings = Settings(**config)  # invalid config raises now
+
+        with self._lock:
+            self.writes_requested += 1
+            self._pending = settings
+
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self._write_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+            stamp = self._stamp
+
+        self._update(stamp, settings.dict())
+
+    def flush(self) -> None:
+        """Save the pending config, if any, to a temporary file then
+        rename it over the config file, so it's never half written."""
+        with self._write_lock:
+            with self._lock:
+                settings, self._pending = self._pending, None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+
+            if settings is None:
+                return
+
+            config_file = get_config_file()
+            tmp_file = config_file.with_suffix(".json.tmp")
+            tmp_file.write_text(settings.json(indent=4))
+            os.replace(tmp_file, config_file)
+
+            with self._lock:
+                self.writes_done += 1
+                self._stamp = self._get_stamp()
+
+            logger.debug(
+                f"Config saved, {self.writes_requested - self.writes_done} "
+                f"of {self.writes_requested} writes coalesced."
+            )
+
+    def subscribe(
+        self, keys: Iterable[str], callback: ConfigCallback
+    ) -> Callable[[], None]:
+        """Call ``callback`` with the new values of ``keys`` when they change.
+
+        Callbacks run in the thread that writes the config or notices the
+        file changed, Qt objects should forward them with a signal.
+
+        Returns:
+            A function removing the subscription.
+        """
+        subscriber = (frozenset(keys), callback)
+
+        with self._lock:
+            self._subscribers.append(subscriber)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+
+_CONFIG_SERVICE = ConfigService()
+atexit.register(_CONFIG_SERVICE.flush)  # timer threads don't outlive the app
+
+
+def get_settings() -> Mapping[str, Any]:
+    """Read-only config, for callers that don't modify it. Cheap to call."""
+    return _CONFIG_SERVICE.snapshot()
+
+
 def read_config() -> dict[str, Any]:
     """Read the config file."""
-    try:
-        return Settings.parse_file(get_config_file()).dict()
-    except (JSONDecodeError, FileNotFoundError):
-        return Settings().dict()
+    return _CONFIG_SERVICE.read()
 
 
 def write_config(config: dict[str, Any]) -> None:
-    """Write the config file."""
-    json_str = Settings(**config).json(indent=4)
-    get_config_file().write_text(json_str)
+    """Write the config file, shortly after. See :meth:`ConfigService.write`."""
+    _CONFIG_SERVICE.write(config)
+
+
+def flush_config() -> None:
+    """Write the config file now if a write is pending."""
+    _CONFIG_SERVICE.flush()
+
+
+def config_write_stats() -> tuple[int, int]:
+    """Number of config writes requested and of writes of the file."""
+    return _CONFIG_SERVICE.writes_requested, _CONFIG_SERVICE.writes_done
+
+
+def subscribe_config(
+    keys: Iterable[str], callback: ConfigCallback
+) -> Callable[[], None]:
+    """See :meth:`ConfigService.subscribe`."""
+    return _CONFIG_SERVICE.subscribe(keys, callback)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+"""Local stand-in for the IG REST API, serving a recorded history.
+
+Used by the tests and the benchmarks to check the transaction fetching
+without a connection to IG: point ``base_url`` of an :any:`IGAPI` to
+``RestReplayServer.base_url``.
+"""
+
+import datetime
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+from report_tool.communications.history_fetcher import parse_date_range
+from report_tool.communications.transaction_store import trade_date
+
+HISTORY_PATH = "/history/transactions/ALL"
+
+
+def load_history(path: Path) -> List[Dict[str, Any]]:
+    """Load transactions recorded from ``/history/transactions``."""
+    return json.loads(Path(path).read_text())["transactions"]
+
+
+def fake_history(
+    start: datetime.date, end: datetime.date, per_day: int = 5, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Build a history looking like the one IG sends, newer first."""
+    rnd = random.Random(seed)
+    transactions = []
+    day = end
+
+    while day >= start:
+        for count in range(per_day):
+            pnl = rnd.randint(-5000, 5000) / 100
+            size = rnd.choice([1, 2, -1, -3])
+            open_level = rnd.randint(9000, 11000)
+            transactions.append(
+                {
+                    "date": day.strftime("%d/%m/%y"),
+                    "instrumentName": "DAX 30 Cash (1€)",
+                    "period": "-",
+                    "profitAndLoss": f"€{pnl}",
+                    "transactionType": "DEAL",
+                    "reference": f"{day:%y%m%d}{count:04d}",
+                    "openLevel": str(open_level),
+                    "closeLevel": str(open_level + rnd.randint(-50, 50)),
+                    "size": str(size),
+                    "currency": "€",
+                    "cashTransaction": False,
+                }
+            )
+
+        day -= datetime.timedelta(days=1)
+
+    return transactions
+
+
+class RestReplayServer:
+
+    """
+    Serve session, accounts, positions and transactions requests
+    from a recorded history. Every request waits ``latency`` seconds
+    and bodies are sent at ``bandwidth`` bytes/s to simulate the network.
+    Connections are kept alive, like IG does, unless ``keep_alive``
+    is False. Requests received are counted by path
+    """
+
+    def __init__(
+        self,
+        transactions: List[Dict[str, Any]],
+        latency: float = 0.0,
+        bandwidth: float | None = None,
+        keep_alive: bool = True,
+    ):
+        self.transactions = transactions
+        self._dates = [trade_date(transaction) for transaction in transactions]
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests: Counter[str] = Counter()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" if keep_alive else "HTTP/1.0"
+
+            def log_message(self, *args):  # keep the console quiet
+                pass
+
+            def _read_body(self):
+                # left unread, the body would be taken for the next request
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _reply(self, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+
+                if server.bandwidth:
+                    time.sleep(len(data) / server.bandwidth)
+                self.wfile.write(data)
+
+            def do_GET(self):
+                server.requests[self.path] += 1
+                time.sleep(server.latency)
+
+                if self.path.startswith(HISTORY_PATH):
+                    self._reply(server.history(self.path[len(HISTORY_PATH) :]))
+                elif self.path == "/accounts":
+                    self._reply(server.accounts())
+                elif self.path == "/positions":
+                    self._reply({"positions": []})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                server.requests[self.path] += 1
+                self._read_body()
+                self._reply(
+                    {"lightstreamerEndpoint": "", "currentAccountId": "REPLAY"},
+                    {"X-SECURITY-TOKEN": "token", "CST": "cst"},
+                )
+
+            def do_PUT(self):
+                server.requests[self.path] += 1
+                self._read_body()
+                self._reply({}, {"X-SECURITY-TOKEN": "token"})
+
+            def do_DELETE(self):
+                server.requests[self.path] += 1
+                self._read_body()
+                self._reply({})
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def history(self, date_range: str) -> Dict[str, Any]:
+        start, end = parse_date_range(date_range)
+        return {
+            "transactions": [
+                transaction
+                for transaction, day in zip(self.transactions, self._dates)
+                if start <= day <= end
+            ]
+        }
+
+    @staticmethod
+    def accounts() -> Dict[str, Any]:
+        return {
+            "accounts": [
+                {
+                    "accountId": "REPLAY",
+                    "accountType": "CFD",
+                    "accountName": "Replay",
+                    "currency": "EUR",
+                    "preferred": True,
+                    "balance": {"balance": 1000, "available": 1000, "profitLoss": 0},
+                }
+            ]
+        }
+
+    def __enter__(self) -> "RestReplayServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,83 @@
+"""CommentStore keeps comments per user and deal id in SQLite."""
+
+import json
+
+import pytest
+
+from report_tool.utils.comment_store import CommentStore
+
+
+@pytest.fixture
+def legacy_file(tmp_path):
+    path = tmp_path / "comments.json"
+    path.write_text(
+        json.dumps(
+            {
+                "": {"DIAAAA0": ["no user", 2]},
+                "alice": {"DIAAAA1": ["first", 2], "DIAAAA2": ["", 0]},
+                "bob": {"DIAAAA1": ["other user", 0]},
+            }
+        )
+    )
+    return path
+
+
+@pytest.fixture
+def store(tmp_path, legacy_file):
+    return CommentStore(tmp_path / "store.db", legacy_file)
+
+
+def test_json_imported_once(tmp_path, legacy_file, store):
+    assert store.get("alice", "DIAAAA1") == ["first", 2]
+    assert store.get("bob", "DIAAAA1") == ["other user", 0]
+    assert store.get("alice", "DIAAAA2") is None  # empty comments are not kept
+    assert store.get("", "DIAAAA0") is None
+
+    store.put("alice", "DIAAAA1", ["edited", 0])
+    store.put("bob", "DIAAAA1", ["", 0])
+
+    # the file is left as is, importing it again would revert the edits
+    reopened = CommentStore(tmp_path / "store.db", legacy_file)
+
+    assert reopened.get("alice", "DIAAAA1") == ["edited", 0]
+    assert reopened.get("bob", "DIAAAA1") is None
+    assert json.loads(legacy_file.read_text())["alice"]["DIAAAA1"] == ["first", 2]
+
+
+def test_missing_json(tmp_path):
+    store = CommentStore(tmp_path / "store.db", tmp_path / "missing.json")
+
+    assert store.get("alice", "DIAAAA1") is None
+
+
+def test_upsert_and_delete(tmp_path, store):
+    store.put("alice", "DIAAAA3", ["new", 2])
+    assert store.get("alice", "DIAAAA3") == ["new", 2]
+
+    store.put("alice", "DIAAAA3", ["updated", 0])
+    assert store.get("alice", "DIAAAA3") == ["updated", 0]
+
+    # comments returned are copies, editing them changes nothing
+    store.get("alice", "DIAAAA3")[0] = "changed outside"
+    assert store.get("alice", "DIAAAA3") == ["updated", 0]
+
+    store.put("alice", "DIAAAA3", ["", 2])
+    assert store.get("alice", "DIAAAA3") is None
+
+    # deleting a comment that doesn't exist is fine
+    store.put("alice", "DIAAAA4", ["", 0])
+
+    # changes are written, not only in the index
+    reopened = CommentStore(tmp_path / "store.db", tmp_path / "missing.json")
+    assert reopened.get("alice", "DIAAAA1") == ["first", 2]
+    assert reopened.get("alice", "DIAAAA3") is None
+
+
+def test_get_many(store):
+    store.put("alice", "DIAAAA5", ["five", 0])
+
+    comments = store.get_many("alice", ["DIAAAA5", "UNKNOWN", "DIAAAA1", "DIAAAA2"])
+
+    assert comments == {"DIAAAA5": ["five", 0], "DIAAAA1": ["first", 2]}
+    assert store.get_many("alice", []) == {}
+    assert store.get_many("nobody", ["DIAAAA1"]) == {}
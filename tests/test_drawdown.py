@@ -0,0 +1,109 @@
+"""segment_drawdowns against the loop create_curves used before."""
+
+import numpy as np
+import pytest
+
+from report_tool.calculate.drawdown import DrawdownStats, drawdown, segment_drawdowns
+
+
+def loop_segments(pnl_cumsum):
+    """Highs, depths and max dd found as create_curves did before."""
+    dd_array = np.maximum.accumulate(pnl_cumsum) - pnl_cumsum
+    idx_high = [count for count in range(len(dd_array)) if dd_array[count] == 0]
+    list_high = [pnl_cumsum[idx] for idx in idx_high]
+
+    # del the first idx, not a trade
+    if 0 in idx_high:
+        del idx_high[0]
+        del list_high[0]
+
+    list_depth = []
+    idx_depth = []
+    j = 0
+
+    for _ in dd_array:
+        try:
+            dd = dd_array[j]
+        except IndexError:
+            break
+
+        if dd == 0.0:
+            j += 1
+        else:
+            try:
+                i = 1
+                while dd != 0:
+                    dd = dd_array[j + i]
+                    i += 1
+
+                current_depth = pnl_cumsum[j : j + i - 1]
+                list_depth.append(min(current_depth))
+                idx_depth.append(np.argmin(current_depth) + j)
+                j = j + i
+
+            except IndexError:
+                break
+
+    try:
+        idx_max_dd = [np.argmax(dd_array)]
+        max_dd = pnl_cumsum[idx_max_dd]
+    except ValueError:
+        idx_max_dd = []
+        max_dd = np.array([])
+
+    return idx_high, list_high, idx_depth, list_depth, idx_max_dd, max_dd
+
+
+def random_curve(rng, size):
+    """Cumulated pnl with ties: flat trades, equal highs and equal depths."""
+    pnl = rng.integers(-5, 6, size).astype(float)
+    return np.cumsum(np.insert(pnl, 0, 0))
+
+
+def assert_same_segments(curve):
+    segments = segment_drawdowns(curve)
+    idx_high, high, idx_depth, depth, idx_max_dd, max_dd = loop_segments(curve)
+
+    np.testing.assert_array_equal(segments.idx_high, idx_high)
+    np.testing.assert_array_equal(segments.high, high)
+    np.testing.assert_array_equal(segments.idx_depth, idx_depth)
+    np.testing.assert_array_equal(segments.depth, depth)
+    np.testing.assert_array_equal(segments.idx_max_dd, idx_max_dd)
+    np.testing.assert_array_equal(segments.max_dd, max_dd)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_segments_match_loop(seed):
+    rng = np.random.default_rng(seed)
+    curve = random_curve(rng, int(rng.integers(0, 300)))
+
+    assert_same_segments(curve)
+
+
+@pytest.mark.parametrize(
+    "curve",
+    [
+        [],
+        [0.0],
+        [0.0, 1.0, 2.0, 3.0],  # never in drawdown
+        [0.0, -1.0, -2.0, -3.0],  # never recovered
+        [0.0, -1.0, 0.0, -1.0, 0.0],  # recovers to equal highs
+        [0.0, 2.0, -1.0, -1.0, 3.0],  # depth reached twice, first kept
+    ],
+)
+def test_segments_edge_cases(curve):
+    assert_same_segments(np.array(curve))
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_stats_from_pnl(seed):
+    rng = np.random.default_rng(seed)
+    pnl = rng.integers(-500, 501, int(rng.integers(1, 300))) / 100
+
+    stats = DrawdownStats.from_pnl(pnl)
+    dd_array = drawdown(np.cumsum(np.insert(pnl, 0, 0)))
+    dd_list = [round(dd, 2) for dd in dd_array if round(dd, 2) > 0]
+
+    assert stats.max_dd == max(dd_array)
+    assert stats.dd_count == len(dd_list)
+    assert stats.dd_sum == pytest.approx(sum(dd_list))
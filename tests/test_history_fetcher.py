@@ -0,0 +1,106 @@
+"""fetch_history against a local stand-in of the IG REST API."""
+
+import datetime
+import queue
+import time
+
+import pytest
+from rest_replay import HISTORY_PATH, RestReplayServer, fake_history
+
+from report_tool.communications.history_fetcher import (
+    RateLimiter,
+    fetch_history,
+    format_date_range,
+    split_months,
+)
+from report_tool.communications.ig_rest_api import IGAPI
+from report_tool.qt.thread import TransactionThread
+
+START = datetime.date(2020, 1, 15)
+END = datetime.date(2020, 6, 10)
+
+
+@pytest.fixture
+def replay():
+    with RestReplayServer(fake_history(START, END, per_day=3)) as server:
+        yield server
+
+
+@pytest.fixture
+def session(replay):
+    session = IGAPI(
+        {"base_url": replay.base_url, "headers": {}, "proxies": {}, "payload": "{}"}
+    )
+    session.create_session()
+    return session
+
+
+def test_split_months():
+    assert split_months(START, END) == [
+        (datetime.date(2020, 6, 1), END),
+        (datetime.date(2020, 5, 1), datetime.date(2020, 5, 31)),
+        (datetime.date(2020, 4, 1), datetime.date(2020, 4, 30)),
+        (datetime.date(2020, 3, 1), datetime.date(2020, 3, 31)),
+        (datetime.date(2020, 2, 1), datetime.date(2020, 2, 29)),
+        (START, datetime.date(2020, 1, 31)),
+    ]
+
+    # grouped two by two to stay under the max number of windows
+    assert split_months(START, END, max_windows=3) == [
+        (datetime.date(2020, 5, 1), END),
+        (datetime.date(2020, 3, 1), datetime.date(2020, 4, 30)),
+        (START, datetime.date(2020, 2, 29)),
+    ]
+
+
+def test_fetch_history_monthly(replay, session):
+    progress = []
+    unlimited = RateLimiter(rate=1e6, burst=1000)
+
+    result = fetch_history(
+        session,
+        START,
+        END,
+        progress=lambda done, total: progress.append((done, total)),
+        rate_limiter=unlimited,
+    )
+
+    assert list(result["transactions"]) == replay.transactions
+
+    # one request per month, none for the whole range
+    history_requests = {
+        path: count
+        for path, count in replay.requests.items()
+        if path.startswith(HISTORY_PATH)
+    }
+    assert history_requests == {
+        HISTORY_PATH + format_date_range(*window): 1
+        for window in split_months(START, END)
+    }
+    assert sorted(progress) == [(done, 6) for done in range(1, 7)]
+
+
+def test_fetch_history_rate_limited(replay, session):
+    limiter = RateLimiter(rate=20, burst=2)
+
+    begin = time.monotonic()
+    result = fetch_history(session, START, END, rate_limiter=limiter)
+    duration = time.monotonic() - begin
+
+    assert len(list(result["transactions"])) == len(replay.transactions)
+    # 2 requests at once, then 4 more at 20 per second
+    assert duration >= 4 / 20 * 0.9
+
+
+def test_thread_opens_store_on_first_fetch(replay, session, tmp_path):
+    store_path = tmp_path / "report_tool.db"
+    thread = TransactionThread(
+        session, queue.Queue(), lambda result: None, store_path=store_path
+    )
+
+    assert not store_path.exists()
+
+    result = thread.fetch_transactions(format_date_range(START, END))
+
+    assert list(result["transactions"]) == replay.transactions
+    assert store_path.exists()
@@ -0,0 +1,123 @@
+"""IGAPI keeps connections alive and counts them per request."""
+
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+from PyQt5 import QtCore
+from rest_replay import RestReplayServer
+
+from report_tool.communications.async_ig_api import AsyncIGAPI
+from report_tool.communications.ig_rest_api import (
+    IGAPI,
+    CountingAdapter,
+    opened_connections,
+)
+from report_tool.qt.async_caller import AsyncCaller
+
+
+@pytest.fixture(params=[True, False], ids=["keep_alive", "close"])
+def keep_alive(request):
+    return request.param
+
+
+@pytest.fixture
+def session(keep_alive):
+    with RestReplayServer([], latency=0.05, keep_alive=keep_alive) as replay:
+        session = IGAPI(
+            {"base_url": replay.base_url, "headers": {}, "proxies": {}, "payload": "{}"}
+        )
+        yield session
+        session.close()
+
+
+def test_connections_counted_per_thread(session, keep_alive):
+    url = session._connect_dict["base_url"] + "/accounts"
+
+    def request_twice(_):
+        counts = [opened_connections()]
+        for _ in range(2):
+            session.send_request(url, "get", "Unable to get accounts: ")
+            counts.append(opened_connections())
+        return [after - before for before, after in zip(counts, counts[1:])]
+
+    # requests in flight at once don't count connections of each other
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        opened = list(pool.map(request_twice, range(4)))
+
+    # a connection closed by the server is opened again
+    expected = [1, 0] if keep_alive else [1, 1]
+    assert opened == [expected] * 4
+
+
+def test_connections_counted_through_session_calls(session, keep_alive):
+    before = opened_connections()
+
+    session.create_session()
+    session.get_user_accounts(save_currency=False)
+    session.logout()
+
+    expected = 1 if keep_alive else 3
+    assert opened_connections() - before == expected
+
+
+def test_proxy_pools_count_connections():
+    adapter = CountingAdapter()
+    manager = adapter.proxy_manager_for("http://127.0.0.1:3128")
+
+    # the manager is kept by the adapter, its pools are wrapped once
+    assert adapter.proxy_manager_for("http://127.0.0.1:3128") is manager
+    for pool_cls in manager.pool_classes_by_scheme.values():
+        assert pool_cls.__name__ == "CountingPool"
+        assert pool_cls.__base__.__name__ != "CountingPool"
+
+
+def test_async_close_cancels_requests(session):
+    async_session = AsyncIGAPI(session, max_workers=1)
+    futures = [async_session.submit(async_session.get_positions()) for _ in range(4)]
+    time.sleep(0.02)  # first request in flight, others queued
+
+    async_session.close()
+
+    for future in futures:
+        with pytest.raises(CancelledError):
+            future.result(timeout=0)
+
+
+def test_async_close_does_not_wait():
+    with RestReplayServer([], latency=0.5) as replay:
+        session = IGAPI(
+            {"base_url": replay.base_url, "headers": {}, "proxies": {}, "payload": "{}"}
+        )
+        async_session = AsyncIGAPI(session)
+        future = async_session.submit(async_session.get_positions())
+        time.sleep(0.05)  # request in flight
+
+        begin = time.monotonic()
+        async_session.close()
+
+        assert time.monotonic() - begin < 0.1
+        assert future.cancelled()
+
+
+def test_caller_replies_in_gui_thread(session):
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    caller = AsyncCaller(AsyncIGAPI(session))
+    replies = []
+
+    # chained like the login, accounts are requested once connected
+    def handle(reply):
+        replies.append((reply, threading.current_thread()))
+        caller.call(caller.async_session.get_user_accounts(), replies.append)
+
+    caller.call(caller.async_session.create_session(), handle)
+
+    deadline = time.monotonic() + 5
+    while len(replies) < 2 and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    caller.close()
+
+    assert replies[0] == (None, threading.main_thread())
+    assert replies[1][0]["Account ID: "] == "REPLAY"  # accounts by count
@@ -0,0 +1,135 @@
+"""IncrementalSummary folding deals one at a time against calculate_result."""
+
+from collections import OrderedDict
+from copy import deepcopy
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import report_tool.calculate.trades as trades
+from report_tool.calculate.incremental import IncrementalSummary
+from report_tool.calculate.ledger import TradeLedger, type_codes
+from report_tool.utils.settings import Settings
+
+CODES = type_codes(["ORDRE", "DEAL", "TRANS"])
+
+
+def history(rng, size):
+    """Transactions like TransactionThread builds, fees between the trades."""
+    transactions = OrderedDict()
+
+    for i in range(size):
+        if rng.random() < 0.15:
+            kind = str(rng.choice(["CHART", "WITH", "DEPO", "DIVIDEND", "CASHIN"]))
+            transactions[f"F{i}_0"] = {
+                "type": kind,
+                "date": "01/02/15",
+                "open_size": "-",
+                "points": "-",
+                "points_lot": "-",
+                "pnl": Decimal(int(rng.integers(-3000, 3000))) / 100,
+            }
+            continue
+
+        size = Decimal(int(rng.choice([1, 2, -1, -3])))
+        points = Decimal(int(rng.integers(-500, 500))) / 10
+        transactions[f"DIAAAA{i}_0"] = {
+            "type": str(rng.choice(["ORDRE", "DEAL", "TRANS"])),
+            "date": "01/02/15",
+            "open_size": size,
+            "points": points,
+            "points_lot": round(points / abs(size), 2),
+            "pnl": Decimal(int(rng.choice([rng.integers(-5000, 5000), 0]))) / 100,
+        }
+
+    return transactions
+
+
+def assert_same_curves(curves, expected):
+    assert curves.keys() == expected.keys()
+
+    for graph in expected:
+        assert curves[graph].keys() == expected[graph].keys()
+
+        for name, values in expected[graph].items():
+            if isinstance(values, tuple):  # markers, (x, y)
+                np.testing.assert_array_equal(curves[graph][name][0], values[0])
+                np.testing.assert_allclose(curves[graph][name][1], values[1])
+            else:
+                np.testing.assert_allclose(curves[graph][name], values)
+
+
+@pytest.mark.parametrize("include", [0, 2])
+@pytest.mark.parametrize("result_in", ["Points", "Points/lot", "%", "currency"])
+@pytest.mark.parametrize("start_capital", [Decimal(0), Decimal(1000)])
+@pytest.mark.parametrize("seeded", [0, 600])
+@pytest.mark.parametrize("seed", range(3))
+def test_fold_matches_full_calculation(
+    monkeypatch, seed, seeded, start_capital, result_in, include
+):
+    config = dict(
+        Settings().dict(), result_in=result_in, include=include, auto_calculate=0
+    )
+    monkeypatch.setattr(trades, "get_settings", lambda: config)
+
+    transactions = history(np.random.default_rng(seed), 1200)
+    items = list(deepcopy(transactions).items())
+
+    # seed with the deals already summarized, fold the others
+    ledger = TradeLedger.from_transactions(OrderedDict(items[:seeded]), CODES)
+    incremental = IncrementalSummary(ledger, start_capital, config, CODES)
+
+    growth = []
+    for _, trade in items[seeded:]:
+        incremental.add(trade)
+        growth.append(trade["growth"])
+
+    full = trades.TradesResults().calculate_result(
+        transactions,
+        start_capital,
+        Decimal(0),
+        False,
+        TradeLedger.from_transactions(transactions, CODES),
+    )
+
+    stats, expected = incremental.stats(), full["stats"]
+
+    # sums are exact, drawdowns are summed as floats
+    for name in (
+        "money_won",
+        "money_lost",
+        "points_won",
+        "points_lost",
+        "points_lot_won",
+        "points_lot_lost",
+        "nb_won",
+        "nb_lost",
+        "nb_flat",
+        "total_pnl",
+        "total_interest",
+        "total_fee",
+        "total_cashin",
+        "total_cashout",
+        "total_transfer",
+    ):
+        assert getattr(stats, name) == getattr(expected, name), name
+
+    for name in ("dd_points", "dd_points_lot", "dd_pnl"):
+        dd, expected_dd = getattr(stats, name), getattr(expected, name)
+        assert dd.max_dd == pytest.approx(expected_dd.max_dd), name
+        assert dd.dd_sum == pytest.approx(expected_dd.dd_sum), name
+        assert dd.dd_count == expected_dd.dd_count, name
+
+    assert stats.streaks == expected.streaks == full["streaks"]
+    assert incremental.summary(False, config) == full["summary"]
+    assert_same_curves(incremental.curves_dict(), full["curves_dict"])
+
+    expected_growth = [trade["growth"] for trade in transactions.values()]
+    if start_capital:
+        np.testing.assert_allclose(
+            np.array(growth, dtype=float),
+            np.array(expected_growth[seeded:], dtype=float),
+        )
+    else:
+        assert growth == expected_growth[seeded:]
@@ -0,0 +1,80 @@
+"""iter_json_array decoding documents received in chunks."""
+
+import json
+
+import pytest
+
+from report_tool.utils.json_utils import iter_json_array
+
+
+def split(text, *cuts):
+    """Encode text and cut it at the given byte offsets."""
+    data = text.encode()
+    bounds = [0, *cuts, len(data)]
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def test_number_split_across_chunks():
+    text = '{"transactions": [12345, 6.5e3]}'
+    cut = text.index("345")
+
+    assert list(iter_json_array(split(text, cut), "transactions")) == [12345, 6500.0]
+
+
+def test_number_at_the_end_of_a_chunk():
+    # "12" could be complete, it is only accepted with what follows
+    chunks = [b'{"transactions": [12', b"34]}"]
+
+    assert list(iter_json_array(chunks, "transactions")) == [1234]
+
+
+def test_multibyte_character_split_across_chunks():
+    text = '{"transactions": [{"profitAndLoss": "€-11.02"}]}'
+    euro = text.encode().index("€".encode())
+
+    for cut in (euro + 1, euro + 2):  # inside the 3 bytes of the euro sign
+        items = list(iter_json_array(split(text, cut), "transactions"))
+        assert items == [{"profitAndLoss": "€-11.02"}]
+
+
+def test_empty_array():
+    assert list(iter_json_array([b'{"transactions": [ ]}'], "transactions")) == []
+    assert list(iter_json_array([b'{"transactions": [', b"]}"], "transactions")) == []
+
+
+def test_missing_key():
+    chunks = [b'{"metadata": {"size": 0}', b', "other": []}']
+
+    with pytest.raises(KeyError):
+        list(iter_json_array(chunks, "transactions"))
+
+
+def test_nested_objects_and_arrays():
+    document = {
+        "metadata": {"paging": {"size": 2, "pages": [1, [2, 3]]}},
+        "transactions": [
+            {"reference": "A", "legs": [{"size": 1}, {"size": [2, {"x": None}]}]},
+            [[], {}, [{"deep": [True, False]}]],
+            "string with ] and } and , inside",
+        ],
+        "after": {"transactions": "not this one"},
+    }
+    data = json.dumps(document).encode()
+
+    # every chunk size, down to one byte at a time
+    for size in (1, 2, 7, 64, len(data)):
+        chunks = [data[i : i + size] for i in range(0, len(data), size)]
+        items = list(iter_json_array(chunks, "transactions"))
+
+        assert items == document["transactions"]
+
+
+def test_str_chunks():
+    chunks = ['{"transactions"', ': [{"a": 1}', ', {"a": 2}]}']
+
+    assert list(iter_json_array(chunks, "transactions")) == [{"a": 1}, {"a": 2}]
+
+
+def test_invalid_document():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array([b'{"transactions": [1 2]}'], "transactions"))
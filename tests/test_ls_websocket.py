@@ -0,0 +1,158 @@
+"""WsLsClient against a local stand-in of Lightstreamer speaking TLCP."""
+
+import socketserver
+import threading
+import time
+import urllib.parse
+
+import pytest
+
+from report_tool.communications.ig_lightstreamer import (
+    MODE_MERGE,
+    STATE_CONNECTED,
+    STATE_CONNECTING,
+    STATE_DISCONNECTED,
+    Table,
+)
+from report_tool.communications.ls_websocket import (
+    OPCODE_CLOSE,
+    OPCODE_TEXT,
+    WsLsClient,
+    accept_key,
+    encode_frame,
+    proxy_for,
+    read_frame,
+)
+
+UPDATE_COUNT = 2_000
+
+
+class LightstreamerStandIn(socketserver.StreamRequestHandler):
+    """Answer TLCP over WebSocket: a session, its subscriptions, then
+    UPDATE_COUNT updates for each subscription."""
+
+    connections = 0
+
+    def send(self, message):
+        self.wfile.write(encode_frame(OPCODE_TEXT, message.encode(), mask=False))
+
+    def handle(self):
+        LightstreamerStandIn.connections += 1
+        headers = {}
+        self.rfile.readline()
+        while (line := self.rfile.readline().strip()) != b"":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+
+        self.wfile.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept_key(headers['sec-websocket-key'])}\r\n"
+                f"Sec-WebSocket-Protocol: {headers['sec-websocket-protocol']}\r\n\r\n"
+            ).encode()
+        )
+
+        while True:
+            _, opcode, payload = read_frame(self.rfile.read)
+            if opcode == OPCODE_CLOSE:
+                return
+            verb, _, body = payload.decode().partition("\r\n")
+
+            if verb == "wsok":
+                self.send("WSOK")
+            elif verb in ("create_session", "bind_session"):
+                self.send("CONOK,S1,50000,5000,*\r\nSERVNAME,Stand-in")
+            elif verb == "control":
+                for request in body.split("\r\n"):
+                    params = dict(urllib.parse.parse_qsl(request))
+                    self.send("REQOK," + params["LS_reqId"])
+
+                    if params["LS_op"] == "add":
+                        sub = params["LS_subId"]
+                        self.send("SUBOK,%s,1,3\r\nEOS,%s,1" % (sub, sub))
+                        self.send("U,%s,1,0.5|1%%25|Caf%%C3%%A9" % sub)
+                        for index in range(1, UPDATE_COUNT):
+                            fields = "^2" if index % 2 else "|#"
+                            self.send("U,%s,1,%d.5|%s" % (sub, index, fields))
+                    elif params["LS_op"] == "destroy":
+                        self.send("END,31,destroyed")
+                        return
+
+
+@pytest.fixture
+def stand_in():
+    LightstreamerStandIn.connections = 0
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), LightstreamerStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:%d/lightstreamer/" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_accept_key():
+    # example of RFC 6455
+    assert accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+
+def test_proxy_for(monkeypatch):
+    url = "https://apd.marketdatasystems.com/lightstreamer/"
+    for name in ("HTTPS_PROXY", "https_proxy", "ALL_PROXY", "all_proxy"):
+        monkeypatch.delenv(name, raising=False)
+
+    assert proxy_for(url, None) is None
+    assert proxy_for(url, {"https": ""}) is None  # proxy left empty in settings
+    assert proxy_for(url, {"https": "http://proxy:3128"}) == "http://proxy:3128"
+    assert proxy_for(url, {"http": "http://proxy:3128"}) is None
+
+    monkeypatch.setenv("HTTPS_PROXY", "http://env-proxy:3128")
+    assert proxy_for(url, None) == "http://env-proxy:3128"
+    assert proxy_for(url, {"https": "http://proxy:3128"}) == "http://proxy:3128"
+
+    monkeypatch.setenv("NO_PROXY", "marketdatasystems.com")
+    assert proxy_for(url, None) is None
+
+
+@pytest.mark.parametrize("size", [0, 125, 126, 65535, 65536])
+@pytest.mark.parametrize("mask", [True, False])
+def test_frame_round_trip(size, mask):
+    payload = bytes(index % 251 for index in range(size))
+    frame = memoryview(encode_frame(OPCODE_TEXT, payload, mask=mask))
+    position = 0
+
+    def read(count):
+        nonlocal position
+        position += count
+        return bytes(frame[position - count : position])
+
+    assert read_frame(read) == (True, OPCODE_TEXT, payload)
+    assert position == len(frame)
+
+
+def test_session_over_one_websocket(stand_in):
+    client = WsLsClient(stand_in)
+    states = []
+    client.on_state.listen(states.append)
+    table = Table(client, "MARKET:X", mode=MODE_MERGE, schema="BID OFFER NAME")
+    rows = []
+    table.on_update.listen(lambda item_ids, fields: rows.append(fields))
+
+    start = time.perf_counter()
+    client.create_session(username="user", password="password", adapter_set="")
+    while len(rows) < UPDATE_COUNT and time.perf_counter() - start < 10:
+        time.sleep(0.01)
+
+    client.destroy()
+    client.join()
+
+    assert len(rows) == UPDATE_COUNT
+    assert LightstreamerStandIn.connections == 1
+    # fields are unquoted, then unchanged (^2) or emptied (#) like MERGE does
+    assert rows[:3] == [
+        ["0.5", "1%", "Café"],
+        ["1.5", "1%", "Café"],
+        ["2.5", "1%", None],
+    ]
+    assert rows[-1] == ["1999.5", "1%", None]
+    assert states == [STATE_CONNECTING, STATE_CONNECTED, STATE_DISCONNECTED]
@@ -0,0 +1,38 @@
+"""MinMaxPyramid extended point by point against a pyramid built at once."""
+
+import numpy as np
+import pytest
+
+from report_tool.qt.graphics_items import MinMaxPyramid
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_append_matches_build(seed):
+    rng = np.random.default_rng(seed)
+    count = int(rng.integers(0, 300))
+    seeded = int(rng.integers(0, count + 1))
+
+    # few distinct values, so buckets have ties
+    x = np.arange(count)
+    y = rng.integers(-3, 4, count).astype(float)
+
+    pyramid = MinMaxPyramid(x[:seeded], y[:seeded])
+    for i in range(seeded, count):
+        pyramid.append(x[i], y[i])
+
+    expected = MinMaxPyramid(x, y)
+
+    np.testing.assert_array_equal(pyramid.x, x)
+    np.testing.assert_array_equal(pyramid.y, y)
+    assert len(pyramid.levels) == len(expected.levels)
+
+    for (imin, imax), (expected_min, expected_max) in zip(
+        pyramid.levels, expected.levels
+    ):
+        np.testing.assert_array_equal(imin, expected_min)
+        np.testing.assert_array_equal(imax, expected_max)
+
+    for pixels in (1, 7, 50, 1000):
+        np.testing.assert_array_equal(
+            pyramid.indices(0, count, pixels), expected.indices(0, count, pixels)
+        )
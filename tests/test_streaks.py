@@ -0,0 +1,164 @@
+"""streak_stats against the loop calculate_result used before."""
+
+from collections import OrderedDict
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from report_tool.calculate.ledger import TradeLedger, type_codes
+from report_tool.calculate.streaks import StreakStats, run_lengths, streak_stats
+from report_tool.calculate.trades import TradesResults
+
+
+def loop_streaks(pnl_currency_list):
+    """Longest win and loss streaks found as calculate_result did before."""
+    i = 0
+    j = 0
+    conseq_won_list = [0]
+    conseq_loss_list = [0]
+
+    for _ in pnl_currency_list:
+        conseq_loss = 0
+        conseq_won = 0
+        j = 0
+
+        try:
+            pnl = pnl_currency_list[i]  # get pnl
+        except IndexError:
+            break
+
+        if pnl > 0:
+            try:
+                while pnl > 0:
+                    conseq_won += 1  # increment conseq wons
+                    j += 1
+                    pnl = pnl_currency_list[i + j]  # get next pnl
+                conseq_won_list.append(conseq_won)
+                i += j  # get pnl after last won
+
+            except IndexError:
+                conseq_won_list.append(conseq_won)  # r eached end of list
+                i = j - 1
+
+        elif pnl < 0:
+            try:
+                while pnl < 0:
+                    conseq_loss += 1  # increment conseq losses
+                    j += 1
+                    pnl = pnl_currency_list[i + j]  # get next pnl
+                conseq_loss_list.append(conseq_loss)
+                i += j  # get pnl after last loss
+
+            except IndexError:
+                conseq_loss_list.append(conseq_loss)  # reached end of list
+                i = j - 1
+
+        elif pnl == 0:
+            i += 1  # trade flat get next one
+
+    return max(conseq_won_list), max(conseq_loss_list)
+
+
+def history(rng, size):
+    """Transactions like TransactionThread builds, fees between the trades."""
+    transactions = OrderedDict()
+
+    for i in range(size):
+        if rng.random() < 0.15:
+            kind = str(rng.choice(["CHART", "WITH", "DEPO", "DIVIDEND"]))
+            transactions[f"F{i}_0"] = {
+                "type": kind,
+                "date": "01/02/15",
+                "open_size": "-",
+                "points": "-",
+                "points_lot": "-",
+                "pnl": Decimal(int(rng.integers(-3000, 3000))) / 100,
+            }
+            continue
+
+        # flat trades are frequent, closed at the open level
+        pnl = int(rng.choice([rng.integers(-5000, 5000), 0]))
+        transactions[f"DIAAAA{i}_0"] = {
+            "type": str(rng.choice(["ORDRE", "DEAL", "TRANS"])),
+            "date": "01/02/15",
+            "open_size": "1",
+            "points": Decimal(pnl) / 50,
+            "points_lot": Decimal(pnl) / 50,
+            "pnl": Decimal(pnl) / 100,
+        }
+
+    return transactions
+
+
+def test_empty():
+    assert streak_stats(np.array([])) == StreakStats(0, 0, 0.0, 0.0, {}, {})
+
+
+def test_all_wins():
+    stats = streak_stats(np.array([1.0, 2.5, 0.1, 3.0]))
+
+    assert stats == StreakStats(4, 0, 4.0, 0.0, {4: 1}, {})
+
+
+def test_all_losses():
+    stats = streak_stats(np.array([-1.0, -2.5, -0.1]))
+
+    assert stats == StreakStats(0, 3, 0.0, 3.0, {}, {3: 1})
+
+
+def test_alternating():
+    stats = streak_stats(np.array([1.0, -1.0] * 5))
+
+    assert stats == StreakStats(1, 1, 1.0, 1.0, {1: 5}, {1: 5})
+
+
+def test_flat_trades_end_streaks():
+    # a flat trade ends a streak and starts none
+    pnl = np.array([1.0, 1.0, 0.0, 1.0, -1.0, 0.0, 0.0, -1.0, -1.0, -1.0, 0.0])
+    stats = streak_stats(pnl)
+
+    assert stats == StreakStats(2, 3, 1.5, 2.0, {1: 1, 2: 1}, {1: 1, 3: 1})
+    assert streak_stats(np.zeros(5)) == StreakStats(0, 0, 0.0, 0.0, {}, {})
+
+
+def test_run_lengths():
+    values, lengths = run_lengths(np.array([1, 1, 0, -1, -1, -1, 1]))
+
+    np.testing.assert_array_equal(values, [1, 0, -1, 1])
+    np.testing.assert_array_equal(lengths, [2, 1, 3, 1])
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_longest_match_loop(seed):
+    rng = np.random.default_rng(seed)
+    pnl = rng.integers(-2, 3, int(rng.integers(0, 300))).astype(float)
+
+    stats = streak_stats(pnl)
+
+    assert (stats.longest_win, stats.longest_loss) == loop_streaks(pnl.tolist())
+
+    # every win and loss is in one streak
+    wins = stats.win_distribution
+    losses = stats.loss_distribution
+    assert sum(length * count for length, count in wins.items()) == sum(pnl > 0)
+    assert sum(length * count for length, count in losses.items()) == sum(pnl < 0)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_history_match_loop(seed):
+    rng = np.random.default_rng(seed)
+    transactions = history(rng, 1200)
+    ledger = TradeLedger.from_transactions(
+        transactions, type_codes(["ORDRE", "DEAL", "TRANS"])
+    )
+
+    # the loop ran on the pnl of trades only, fees skipped
+    pnl_list = [
+        float(trade["pnl"])
+        for trade in transactions.values()
+        if trade["type"] in ("ORDRE", "DEAL", "TRANS")
+    ]
+    streaks = TradesResults.build_stats(ledger).streaks
+
+    assert (streaks.longest_win, streaks.longest_loss) == loop_streaks(pnl_list)
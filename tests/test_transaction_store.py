@@ -0,0 +1,50 @@
+"""TransactionStore keeps each synchronized day as IG sent it."""
+
+import datetime
+
+from rest_replay import fake_history
+
+from report_tool.communications.transaction_store import TransactionStore
+
+DAY = datetime.timedelta(days=1)
+
+
+def test_merge_drops_rows_out_of_window(tmp_path):
+    store = TransactionStore(tmp_path / "store.db")
+    january = fake_history(datetime.date(2020, 1, 1), datetime.date(2020, 1, 31))
+    february = fake_history(
+        datetime.date(2020, 2, 1), datetime.date(2020, 2, 29), seed=1
+    )
+
+    store.merge("ACC", datetime.date(2020, 1, 1), datetime.date(2020, 1, 31), january)
+
+    # IG also sent a transaction of the last day of january
+    store.merge(
+        "ACC",
+        datetime.date(2020, 2, 1),
+        datetime.date(2020, 2, 29),
+        february + [dict(february[0], date="31/01/20", reference="LATE")],
+    )
+
+    loaded = store.load("ACC", datetime.date(2020, 1, 1), datetime.date(2020, 2, 29))
+
+    assert loaded == february + january
+    assert store.coverage("ACC") == (
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 2, 29),
+    )
+
+
+def test_missing_windows_extend_coverage(tmp_path):
+    store = TransactionStore(tmp_path / "store.db")
+    start, end = datetime.date(2020, 3, 1), datetime.date(2020, 3, 31)
+
+    assert store.missing_windows("ACC", start, end) == [(start, end)]
+
+    store.merge("ACC", start, end, fake_history(start, end))
+
+    # last day synchronized is requested again, days before are added
+    assert store.missing_windows("ACC", start - 10 * DAY, end + DAY) == [
+        (end, end + DAY),
+        (start - 10 * DAY, start - DAY),
+    ]